@@ -0,0 +1,331 @@
+import json
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from dotenv import load_dotenv
+
+import pricing_core
+from excel_reader import UNREADABLE_WORKBOOK_ERRORS
+from offering_evaluator import apply_margin
+from offering_review import REVIEW_GENERATION_CONFIG, REVIEW_OUTPUT_INSTRUCTIONS
+from price_researcher import extract_product_name
+from pricing_core import build_prompt_prefix, get_prefix_model
+
+# Alamat layanan API
+API_HOST = os.getenv("API_HOST", "127.0.0.1")
+API_PORT = int(os.getenv("API_PORT", "8600"))
+
+# Jumlah koneksi yang dilayani bersamaan; koneksi lain menunggu di antrean
+API_WORKERS = int(os.getenv("API_WORKERS", "8"))
+
+# Batas waktu satu permintaan (scraping, evaluasi, setiap potongan jawaban LLM)
+API_TIMEOUT_S = float(os.getenv("API_TIMEOUT_S", "120"))
+
+# Koneksi keep-alive yang tidak mengirim permintaan baru selama ini ditutup agar worker kembali ke pool
+API_IDLE_TIMEOUT_S = float(os.getenv("API_IDLE_TIMEOUT_S", "5"))
+
+# Ukuran body permintaan maksimum (JSON atau file penawaran .xlsx)
+MAX_BODY_BYTES = 20 * 1024 * 1024
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+class ApiError(Exception):
+    """Error returned to the client as a JSON body with an HTTP status"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class PooledHTTPServer(ThreadingHTTPServer):
+    """HTTP server that handles connections on a bounded thread pool"""
+
+    def __init__(self, server_address, handler_class, workers=API_WORKERS):
+        super().__init__(server_address, handler_class)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-conn")
+        # Pekerjaan berat dijalankan terpisah agar bisa dihentikan menunggu setelah timeout
+        self.jobs = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-job")
+        # Pekerjaan yang melewati timeout tetap berjalan sampai selesai dan tetap memegang slotnya,
+        # sehingga jumlah pekerjaan tidak bertambah tanpa batas; permintaan lain mendapat 503
+        self.job_slots = threading.BoundedSemaphore(workers)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self.process_request_thread, request, client_address)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        self.jobs.shutdown(wait=False, cancel_futures=True)
+
+def _records(df):
+    # to_json mengubah NaN menjadi null
+    return json.loads(df.to_json(orient='records'))
+
+def _json_object(body):
+    # Body .xlsx hanya diterima oleh /evaluate
+    if not isinstance(body, dict):
+        raise ApiError(400, "This endpoint expects a JSON object body")
+    return body
+
+def _parse_margin(value):
+    try:
+        margin = float(value)
+    except (TypeError, ValueError):
+        raise ApiError(400, "margin must be a number")
+    if not 0 <= margin <= 1:
+        raise ApiError(400, "margin must be between 0 and 1")
+    return margin
+
+def health():
+    """Service status and size of the loaded knowledge base"""
+    knowledge_base = pricing_core.get_knowledge_base()
+    return {'status': "ok", 'kb_products': len(knowledge_base['products']), 'kb_version': knowledge_base['version']}
+
+def search_knowledge_base(query):
+    """Knowledge base products matching a product name"""
+    if not query:
+        raise ApiError(400, "query parameter 'q' is required")
+    return {'products': pricing_core.find_kb_products(pricing_core.get_knowledge_base(), query)}
+
+def research_price(body):
+    """Highest price of a product across e-commerce platforms and the knowledge base"""
+    body = _json_object(body)
+    product_name = body.get('product_name')
+    if not product_name:
+        raise ApiError(400, "'product_name' is required")
+    margin = _parse_margin(body.get('margin', 0.2))
+    return {'result': pricing_core.research_max_price(product_name, margin)}
+
+def evaluate_offering(body, margin=None):
+    """Evaluate offering lines given as JSON or as an offering workbook
+
+    Args:
+        body (dict or bytes): {'products': [...], 'margin': float} or the
+            content of an offering workbook
+        margin (str, optional): Margin from the query string, overrides the body
+    """
+    if margin is None:
+        margin = body.get('margin', 0.2) if isinstance(body, dict) else 0.2
+    margin = _parse_margin(margin)
+    knowledge_base = pricing_core.get_knowledge_base()
+    if isinstance(body, bytes):
+        try:
+            resolved = pricing_core.resolve_offering_workbook(body, knowledge_base)
+        except ValueError as e:
+            raise ApiError(400, str(e))
+        except UNREADABLE_WORKBOOK_ERRORS as e:
+            raise ApiError(400, f"Unreadable offering workbook: {str(e)}")
+        evaluated = apply_margin(resolved, margin)
+    else:
+        products = body.get('products')
+        if not isinstance(products, list) or not products:
+            raise ApiError(400, "'products' must be a non-empty list")
+        try:
+            evaluated = pricing_core.evaluate_offering_lines(products, margin, knowledge_base)
+        except ValueError as e:
+            raise ApiError(400, str(e))
+    return {'lines': _records(evaluated)}
+
+def stream_chat(body):
+    """Stream the answer of a chat turn as text chunks
+
+    Args:
+        body (dict): 'prompt', optional 'role', 'project' and 'history'
+            (list of {'role', 'content'})
+
+    Yields:
+        str: Text chunks of the answer
+    """
+    # Prompt dibangun dengan fungsi yang sama dengan aplikasi Streamlit
+    body = _json_object(body)
+    prompt = body.get('prompt')
+    role = body.get('role', "Price Researcher")
+    project = body.get('project', "API")
+    if not prompt:
+        raise ApiError(400, "'prompt' is required")
+    if role not in pricing_core.ROLE:
+        raise ApiError(400, f"'role' must be one of: {', '.join(pricing_core.ROLE)}")
+
+    knowledge_base = pricing_core.get_knowledge_base()
+    kb_version = knowledge_base.get('version', 0)
+    prefix = build_prompt_prefix(pricing_core.ROLE[role]["system_prompt"], project, kb_version, knowledge_base)
+    model, _ = get_prefix_model(pricing_core.DEFAULT_MODEL, role, project, kb_version, prefix)
+
+    turn_context = []
+    product_name = extract_product_name(prompt)
+    if product_name:
+        turn_context.append(f"=== PRODUCT NAME ===\n{product_name}")
+    context_info = pricing_core.build_kb_context(knowledge_base, product_name, ["Summary Solution"])
+    if context_info:
+        turn_context.append(f"IMPORTANT CONTEXT INFORMATION:\n{' '.join(context_info)}")
+    send_options = {'request_options': {'timeout': API_TIMEOUT_S}}
+    if role == "Offering Reviewer":
+        turn_context.append(REVIEW_OUTPUT_INSTRUCTIONS)
+        send_options['generation_config'] = REVIEW_GENERATION_CONFIG
+    turn_message = "\n\n".join(turn_context + [f"User question: {prompt}"])
+
+    history = [
+        {'role': "user" if msg.get('role') == "user" else "model", 'parts': [str(msg.get('content', ''))]}
+        for msg in body.get('history', [])
+    ]
+    chat = model.start_chat(history=history)
+    for chunk in chat.send_message(turn_message, stream=True, **send_options):
+        if getattr(chunk, "text", None):
+            yield chunk.text
+
+class ApiHandler(BaseHTTPRequestHandler):
+    """JSON endpoints for price research, knowledge base lookup and offering evaluation
+
+    GET  /health                 status and knowledge base size
+    GET  /kb/search?q=<name>     knowledge base products matching a name
+    POST /price                  {"product_name", "margin"} -> highest market price
+    POST /evaluate?margin=<m>    {"products": [...]} or an offering workbook (.xlsx)
+    POST /chat                   {"prompt", "role", "project", "history"} -> NDJSON stream
+    """
+
+    protocol_version = "HTTP/1.1"
+    # Timeout socket: klien yang lambat mengirim atau membaca diputus
+    timeout = API_TIMEOUT_S
+
+    def handle_one_request(self):
+        # Menunggu permintaan berikutnya memakai timeout idle yang lebih pendek
+        self.connection.settimeout(API_IDLE_TIMEOUT_S)
+        super().handle_one_request()
+
+    def parse_request(self):
+        # Baris permintaan sudah diterima; header, body dan respons memakai timeout penuh
+        self.connection.settimeout(self.timeout)
+        return super().parse_request()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path == "/health":
+            self._respond_job(health)
+        elif url.path == "/kb/search":
+            self._respond_job(search_knowledge_base, query.get('q', [""])[0])
+        else:
+            self._send_json(404, {'error': f"Unknown endpoint: {url.path}"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        try:
+            body = self._read_body()
+            if url.path == "/price":
+                self._respond_job(research_price, body)
+            elif url.path == "/evaluate":
+                self._respond_job(evaluate_offering, body, query.get('margin', [None])[0])
+            elif url.path == "/chat":
+                self._stream_ndjson(stream_chat(body))
+            else:
+                self._send_json(404, {'error': f"Unknown endpoint: {url.path}"})
+        except ApiError as e:
+            self._send_json(e.status, {'error': str(e)})
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY_BYTES:
+            raise ApiError(413, f"Request body larger than {MAX_BODY_BYTES} bytes")
+        data = self.rfile.read(length)
+        if self.headers.get('Content-Type', "").startswith(XLSX_CONTENT_TYPE):
+            return data
+        try:
+            body = json.loads(data or b"{}")
+        except json.JSONDecodeError as e:
+            raise ApiError(400, f"Invalid JSON body: {str(e)}")
+        if not isinstance(body, dict):
+            raise ApiError(400, "JSON body must be an object")
+        return body
+
+    def _respond_job(self, func, *args):
+        """Run a job on the server's job pool and send its result, or 504 after the timeout"""
+        if not self.server.job_slots.acquire(blocking=False):
+            self._send_json(503, {'error': "Server busy, try again later"})
+            return
+        try:
+            future = self.server.jobs.submit(func, *args)
+        except RuntimeError:
+            # Pool sudah dimatikan (server berhenti)
+            self.server.job_slots.release()
+            raise
+        future.add_done_callback(lambda _: self.server.job_slots.release())
+        try:
+            self._send_json(200, future.result(timeout=API_TIMEOUT_S))
+        except TimeoutError:
+            future.cancel()
+            self._send_json(504, {'error': f"Request timed out after {API_TIMEOUT_S:g}s"})
+        except ApiError as e:
+            self._send_json(e.status, {'error': str(e)})
+        except Exception as e:
+            self.log_error("Request failed: %s", e)
+            self._send_json(500, {'error': str(e)})
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', "application/json; charset=utf-8")
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, payload):
+        data = (json.dumps(payload, ensure_ascii=False) + "\n").encode('utf-8')
+        self.wfile.write(f"{len(data):X}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def _stream_ndjson(self, chunks):
+        """Send text chunks as they arrive, one JSON line per chunk (chunked transfer encoding)"""
+        # Ambil potongan pertama sebelum header dikirim, agar error validasi tetap jadi respons JSON biasa
+        started = time.perf_counter()
+        try:
+            first = next(chunks, None)
+        except ApiError:
+            raise
+        except Exception as e:
+            self.log_error("Chat failed: %s", e)
+            self._send_json(502, {'error': str(e)})
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', "application/x-ndjson; charset=utf-8")
+        self.send_header('Transfer-Encoding', "chunked")
+        self.end_headers()
+        try:
+            if first is not None:
+                self._write_chunk({'text': first})
+            for text in chunks:
+                self._write_chunk({'text': text})
+            self._write_chunk({'done': True, 'elapsed_s': round(time.perf_counter() - started, 3)})
+        except (BrokenPipeError, ConnectionResetError):
+            # Klien menutup koneksi di tengah jawaban
+            return
+        except Exception as e:
+            self.log_error("Chat stream failed: %s", e)
+            self._write_chunk({'error': str(e)})
+        self.wfile.write(b"0\r\n\r\n")
+
+def warm_caches():
+    """Load the knowledge base and its evaluation index before the first request"""
+    knowledge_base = pricing_core.get_knowledge_base()
+    pricing_core.get_kb_index(knowledge_base['version'], knowledge_base['products'])
+    return knowledge_base
+
+def run_server(host=API_HOST, port=API_PORT):
+    """Serve the API until interrupted"""
+    load_dotenv()
+    knowledge_base = warm_caches()
+    server = PooledHTTPServer((host, port), ApiHandler)
+    print(f"Pricing API listening on http://{host}:{port} ({len(knowledge_base['products'])} knowledge base products)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    run_server()
@@ -0,0 +1,289 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from excel_export import dataframes_to_excel
+from pricing_core import MARKET_PLATFORMS, find_kb_products, get_knowledge_base
+
+# Kolom yang dicari sebagai nama produk pada file input, selain kolom pertama
+PRODUCT_COLUMNS = ['product_name', 'product name', 'nama produk', 'produk', 'product']
+
+# Batas scraping bersamaan per platform di semua proses; Tokopedia memakai browser Selenium
+DEFAULT_PLATFORM_CONCURRENCY = {'Tokopedia': 2, 'Shopee': 4}
+
+# Kolom workbook hasil, dengan nama kolom Bahasa Indonesia
+RESULT_COLUMNS = {
+    'product_name': 'Nama Produk',
+    'status': 'Status',
+    'kb_name': 'Produk Knowledge Base',
+    'kb_price': 'Harga Knowledge Base',
+    'kb_url': 'URL Knowledge Base',
+    'tokopedia_name': 'Produk Tokopedia',
+    'tokopedia_price': 'Harga Tokopedia',
+    'tokopedia_url': 'URL Tokopedia',
+    'shopee_name': 'Produk Shopee',
+    'shopee_price': 'Harga Shopee',
+    'shopee_url': 'URL Shopee',
+    'max_source': 'Sumber Harga Maksimum',
+    'max_price': 'Harga Maksimum',
+    'margin_price': 'Harga Maksimum (dengan margin)',
+    'errors': 'Error',
+}
+
+# Status per produk di workbook hasil
+STATUS_PRICED = "Harga ditemukan"
+STATUS_NO_PRICE = "Tidak ada harga"
+STATUS_NO_PRICE_ERRORS = "Tidak ada harga (ada platform gagal)"
+STATUS_FAILED = "Gagal, jalankan ulang"
+
+RESULT_CURRENCY_COLUMNS = [
+    'Harga Knowledge Base', 'Harga Tokopedia', 'Harga Shopee', 'Harga Maksimum', 'Harga Maksimum (dengan margin)'
+]
+
+# Semaphore per platform, diisi di setiap proses worker oleh _init_worker
+_platform_slots = {}
+
+def _init_worker(platform_slots):
+    load_dotenv()
+    _platform_slots.update(platform_slots)
+
+def read_product_names(path, column=None):
+    """Read unique product names from a CSV or Excel file
+
+    Args:
+        path (str): .csv, .xlsx or .xls file
+        column (str, optional): Column with product names; defaults to a
+            known product name column or the first column
+
+    Returns:
+        list: Product names in file order, without blanks and duplicates
+    """
+    if path.lower().endswith(".csv"):
+        df = pd.read_csv(path, dtype=str)
+    else:
+        df = pd.read_excel(path, dtype=str)
+
+    if column is None:
+        by_lower = {str(col).strip().lower(): col for col in df.columns}
+        column = next((by_lower[name] for name in PRODUCT_COLUMNS if name in by_lower), df.columns[0])
+    elif column not in df.columns:
+        raise ValueError(f"Column '{column}' not found in {path}")
+
+    names = df[column].dropna().str.strip()
+    return list(dict.fromkeys(name for name in names if name))
+
+def read_checkpoint(path):
+    """Results already stored in a checkpoint file, keyed by product name
+
+    A product can appear more than once when it was researched again; the
+    last row wins.
+    """
+    results = {}
+    try:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                except json.JSONDecodeError:
+                    # Baris terakhir bisa terpotong jika proses dihentikan saat menulis
+                    continue
+                results[result['product_name']] = result
+    except FileNotFoundError:
+        pass
+    return results
+
+def is_complete(result, platforms):
+    """Whether a checkpoint row can be reused for a run over the given platforms
+
+    Rows researched over another set of platforms, rows where a platform
+    failed and rows of older checkpoints (without 'platforms', with the
+    margin already in max_price) are researched again.
+    """
+    if 'platforms' not in result:
+        return False
+    return sorted(result['platforms']) == sorted(platforms) and not result.get('errors')
+
+def research_product(product_name, platforms):
+    """Research one product in the knowledge base and on e-commerce platforms
+
+    Runs in a worker process. Scrapes wait for a free slot of their
+    platform, so the total load per platform stays bounded across all
+    workers. A failing platform is recorded in 'errors' and does not stop
+    the others.
+
+    Args:
+        product_name (str): The name of the product to research
+        platforms (list): E-commerce platforms to scrape
+
+    Returns:
+        dict: Flat result row with the keys of RESULT_COLUMNS, without the
+            margin (applied when the workbook is written), plus the
+            researched 'platforms'
+    """
+    # Modul scraping (Selenium, Crawlbase, BeautifulSoup) hanya dimuat di proses worker
+    import scrapers
+
+    result = {'product_name': product_name, 'platforms': list(platforms), 'errors': []}
+    candidates = []
+
+    kb_matches = find_kb_products(get_knowledge_base(), product_name)
+    if kb_matches:
+        product = kb_matches[0]
+        result.update(kb_name=product['product_name'], kb_price=float(product['nett_price']), kb_url=product['url'])
+        candidates.append(("Knowledge Base", result['kb_price']))
+
+    for platform in platforms:
+        key = platform.lower()
+        try:
+            with _platform_slots[platform]:
+                product = scrapers.scrape_platform_product(platform, product_name)
+        except Exception as e:
+            result['errors'].append(f"{platform}: {str(e)}")
+            continue
+        if product:
+            result.update({f"{key}_name": product['name'], f"{key}_price": float(product['price']), f"{key}_url": product['url']})
+            candidates.append((platform, result[f"{key}_price"]))
+
+    if candidates:
+        source, price = max(candidates, key=lambda candidate: candidate[1])
+        result.update(max_source=source, max_price=price)
+    result['errors'] = "; ".join(result['errors'])
+    return result
+
+def run_batch(product_names, checkpoint_path, platforms, workers, platform_concurrency):
+    """Research all products without a complete checkpoint row
+
+    Every finished product is appended to the checkpoint immediately, so an
+    interrupted run continues where it stopped. Checkpoint rows count only
+    when they were researched over the same platforms and no platform
+    failed (see is_complete). Products whose worker failed are returned
+    with 'failed' set but are not checkpointed. Both are tried again on the
+    next run.
+
+    Returns:
+        dict: All results (checkpoint and new), keyed by product name
+    """
+    results = read_checkpoint(checkpoint_path)
+    pending = [name for name in product_names if name not in results or not is_complete(results[name], platforms)]
+    print(f"{len(product_names)} product(s), {len(product_names) - len(pending)} complete in checkpoint, {len(pending)} to research")
+    if not pending:
+        return results
+
+    # "spawn" agar setiap worker memulai browser dan client scraping sendiri
+    context = multiprocessing.get_context("spawn")
+    platform_slots = {platform: context.BoundedSemaphore(platform_concurrency[platform]) for platform in platforms}
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker, initargs=(platform_slots,)) as pool, \
+            open(checkpoint_path, 'a', encoding='utf-8') as checkpoint:
+        futures = {pool.submit(research_product, name, platforms): name for name in pending}
+        try:
+            for done, future in enumerate(as_completed(futures), start=1):
+                name = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # Produk yang gagal tidak dicatat di checkpoint, sehingga dicoba lagi pada run berikutnya
+                    print(f"[{done}/{len(pending)}] {name}: failed ({str(e)})")
+                    results[name] = {'product_name': name, 'failed': True, 'errors': str(e)}
+                    continue
+                checkpoint.write(json.dumps(result, ensure_ascii=False) + "\n")
+                checkpoint.flush()
+                results[name] = result
+                price = f"Rp {result['max_price']:,.2f} ({result['max_source']})" if result.get('max_price') else "no price found"
+                print(f"[{done}/{len(pending)}] {name}: {price}")
+        except KeyboardInterrupt:
+            print("Interrupted, finished products are kept in the checkpoint")
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+    print(f"Researched {len(pending)} product(s) in {time.perf_counter() - started:.1f}s")
+    return results
+
+def result_status(result):
+    """Status of a product in the result workbook
+
+    Tells apart products that were researched without a price from
+    products that failed and are retried on the next run.
+    """
+    if result is None or result.get('failed'):
+        return STATUS_FAILED
+    if result.get('max_price') is not None:
+        return STATUS_PRICED
+    return STATUS_NO_PRICE_ERRORS if result.get('errors') else STATUS_NO_PRICE
+
+def build_research_workbook(product_names, results, margin):
+    """Consolidated workbook of the research results, in input order
+
+    Every input product gets a row with a 'Status', including products
+    that failed in this run. The margin is applied here, so a checkpoint
+    can be reused with another margin.
+    """
+    rows = [
+        {**results.get(name, {'product_name': name}), 'status': result_status(results.get(name))}
+        for name in product_names
+    ]
+    df = pd.DataFrame(rows).reindex(columns=list(RESULT_COLUMNS))
+    df['margin_price'] = df['max_price'] * (1 + margin)
+    df = df.rename(columns=RESULT_COLUMNS)
+    return dataframes_to_excel([('Hasil Riset Harga', df, RESULT_CURRENCY_COLUMNS)])
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Research prices for a list of products (knowledge base, Tokopedia, Shopee) and write one workbook."
+    )
+    parser.add_argument("input", help="CSV or Excel file with product names")
+    parser.add_argument("-o", "--output", help="Output workbook (default: <input>-research.xlsx)")
+    parser.add_argument("--column", help="Column with product names (default: auto-detect)")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.checkpoint.jsonl)")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint and research everything again")
+    parser.add_argument("--margin", type=float, default=0.2, help="Margin applied to the maximum price (default: 0.2)")
+    parser.add_argument("--platforms", nargs="*", choices=MARKET_PLATFORMS, default=MARKET_PLATFORMS,
+                        help="E-commerce platforms to scrape (default: all; none for knowledge base only)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (default: CPU count)")
+    for platform, limit in DEFAULT_PLATFORM_CONCURRENCY.items():
+        parser.add_argument(f"--{platform.lower()}-concurrency", type=int, default=limit,
+                            help=f"Concurrent {platform} scrapes across all workers (default: {limit})")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    load_dotenv()
+
+    output = args.output or f"{os.path.splitext(args.input)[0]}-research.xlsx"
+    checkpoint_path = args.checkpoint or f"{output}.checkpoint.jsonl"
+    if args.restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    try:
+        product_names = read_product_names(args.input, args.column)
+    except (OSError, ValueError) as e:
+        print(f"Unable to read {args.input}: {str(e)}", file=sys.stderr)
+        return 2
+
+    platform_concurrency = {platform: max(getattr(args, f"{platform.lower()}_concurrency"), 1) for platform in MARKET_PLATFORMS}
+    try:
+        results = run_batch(product_names, checkpoint_path, args.platforms, max(args.workers, 1), platform_concurrency)
+    except KeyboardInterrupt:
+        return 130
+
+    with open(output, 'wb') as f:
+        f.write(build_research_workbook(product_names, results, args.margin))
+    failed = sum(1 for name in product_names if result_status(results.get(name)) == STATUS_FAILED)
+    # Produk dengan platform gagal sudah punya baris di workbook, tetapi juga dicoba lagi pada run berikutnya
+    partial = sum(1 for name in product_names if name in results and results[name].get('errors') and not results[name].get('failed'))
+    notes = []
+    if failed:
+        notes.append(f"{failed} product(s) failed, marked '{STATUS_FAILED}'")
+    if partial:
+        notes.append(f"{partial} product(s) with failed platforms")
+    print(f"Wrote {output}" + (f" ({'; '.join(notes)}; rerun to retry)" if notes else ""))
+    return 1 if failed or partial else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
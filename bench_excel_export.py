@@ -0,0 +1,96 @@
+import io
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from openpyxl.utils import get_column_letter
+
+from excel_export import CURRENCY_FORMAT, column_widths, dataframe_to_excel
+
+CURRENCY_COLUMNS = ['Harga Satuan', 'Total Harga Penawaran', 'Harga Maksimum']
+
+def build_evaluation(size, seed=42):
+    rng = np.random.default_rng(seed)
+    quantity = rng.integers(1, 100, size)
+    unit_price = rng.integers(10, 50_000, size) * 1000.0
+    max_price = unit_price * quantity * rng.uniform(0.9, 1.4, size)
+    return pd.DataFrame({
+        'Nama Produk': [f"Produk Uji {i:06d}" for i in range(size)],
+        'Jumlah': quantity,
+        'Harga Satuan': unit_price,
+        'Total Harga Penawaran': unit_price * quantity,
+        'Harga Maksimum': max_price,
+        'Status': np.where(unit_price * quantity <= max_price, "Wajar", "Tidak Wajar"),
+        'URL Referensi': [f"https://example.com/product/{i}" for i in range(size)],
+    })
+
+def legacy_export(df):
+    # Cara lama: format string per sel, workbook penuh di memori, lebar kolom lewat apply(len)
+    df = df.copy()
+    for col in CURRENCY_COLUMNS:
+        df[col] = df[col].apply(lambda x: f"Rp {x:,.2f}")
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
+        df.to_excel(writer, index=False, sheet_name='Hasil Evaluasi')
+        worksheet = writer.sheets['Hasil Evaluasi']
+        for idx, col in enumerate(df.columns):
+            max_length = max(df[col].astype(str).apply(len).max(), len(col))
+            worksheet.column_dimensions[chr(65 + idx)].width = max_length + 2
+    return buffer.getvalue()
+
+def openpyxl_export(df):
+    # Pembanding: workbook write-only openpyxl dengan format dan lebar kolom yang sama
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet('Hasil Evaluasi')
+    for idx, width in enumerate(column_widths(df, CURRENCY_COLUMNS), start=1):
+        worksheet.column_dimensions[get_column_letter(idx)].width = width
+
+    header = []
+    for col in df.columns:
+        cell = WriteOnlyCell(worksheet, value=col)
+        cell.font = Font(bold=True)
+        header.append(cell)
+    worksheet.append(header)
+
+    currency = [col in CURRENCY_COLUMNS for col in df.columns]
+    for row in df.itertuples(index=False, name=None):
+        cells = []
+        for value, is_currency in zip(row, currency):
+            if is_currency:
+                value = WriteOnlyCell(worksheet, value=value)
+                value.number_format = CURRENCY_FORMAT
+            cells.append(value)
+        worksheet.append(cells)
+
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+def streaming_export(df):
+    return dataframe_to_excel(df, 'Hasil Evaluasi', CURRENCY_COLUMNS)
+
+def measure(label, func, df):
+    start = time.perf_counter()
+    data = func(df)
+    elapsed = time.perf_counter() - start
+
+    # Memori diukur pada jalan terpisah karena tracemalloc memperlambat eksekusi
+    tracemalloc.start()
+    func(df)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<12} {elapsed:>8.2f}s   peak {peak / 2**20:>8.1f} MiB   {len(data) / 2**20:>6.1f} MiB file")
+
+if __name__ == "__main__":
+    size = 100_000
+    df = build_evaluation(size)
+    print(f"Exporting {size:,} evaluation rows")
+    measure("streaming", streaming_export, df)
+    measure("openpyxl", openpyxl_export, df)
+    if "--legacy" in sys.argv:
+        measure("legacy", legacy_export, df)
@@ -0,0 +1,58 @@
+import random
+import time
+
+from offering_evaluator import build_kb_index, resolve_offerings, apply_margin
+
+# Kosakata sintetis untuk membangun knowledge base dan penawaran berukuran besar
+BRANDS = ["Ruijie", "Mikrotik", "Cisco", "TP-Link", "Ubiquiti", "Aruba", "Huawei", "Fortinet"]
+TYPES = ["Access Point", "Switch", "Router", "Firewall", "Kabel UTP", "Patch Panel", "Rack", "Lisensi"]
+
+def build_kb(size, rng):
+    return [
+        {
+            'product_name': f"{rng.choice(BRANDS)} {rng.choice(TYPES)} RG-{i:06d}",
+            'nett_price': float(rng.randint(10, 50_000) * 1000),
+            'platform': "Summary Solution",
+            'url': f"https://example.com/product/{i}",
+        }
+        for i in range(size)
+    ]
+
+def build_offers(kb, size, rng):
+    offers = []
+    for _ in range(size):
+        product = rng.choice(kb)
+        name = product['product_name']
+        variant = rng.random()
+        if variant < 0.2:
+            # Hanya nomor model, dicocokkan lewat substring
+            name = name.split()[-1]
+        elif variant < 0.3:
+            # Salah ketik kecil, dicocokkan lewat fuzzy
+            name = name.replace("a", "e", 1)
+        elif variant < 0.35:
+            name = "Produk Tidak Dikenal " + str(rng.randint(0, 10**6))
+        quantity = rng.randint(1, 100)
+        unit_price = product['nett_price'] * rng.uniform(0.8, 1.4)
+        offers.append({'product_name': name, 'quantity': quantity, 'unit_price': unit_price})
+    return offers
+
+def timed(label, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    print(f"{label:<28} {time.perf_counter() - start:>8.3f}s")
+    return result
+
+if __name__ == "__main__":
+    rng = random.Random(42)
+    kb_size, offer_size = 100_000, 10_000
+    kb = build_kb(kb_size, rng)
+    offers = build_offers(kb, offer_size, rng)
+
+    print(f"Evaluating {offer_size:,} offering lines against a {kb_size:,}-row knowledge base")
+    kb_index = timed("build_kb_index", build_kb_index, kb)
+    resolved = timed("resolve_offerings", resolve_offerings, offers, kb_index)
+    evaluated = timed("apply_margin", apply_margin, resolved, 0.2)
+
+    print(resolved['match_type'].value_counts(dropna=False).to_string())
+    print(evaluated['status'].value_counts(dropna=False).to_string())
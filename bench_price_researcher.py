@@ -0,0 +1,75 @@
+import random
+import time
+
+from price_researcher import extract_product_name, extract_price
+
+# Korpus sintetis prompt Bahasa Indonesia dan Inggris dengan jawaban yang diharapkan
+PRODUCTS = [
+    "Ruijie Reyee RG-RAP2200",
+    "Mikrotik hAP ac2",
+    "TP-Link Archer C6",
+    "Cisco Catalyst 2960",
+    "Ubiquiti UniFi U6 Lite",
+    "Kabel UTP Cat6 305m",
+]
+
+NAME_TEMPLATES = [
+    "Product: {name}",
+    "Nama produk: {name}",
+    "produk: {name}?",
+    "Tolong cari harga untuk produk {name}",
+    "Please check the price of product {name}",
+    "Berapa harga barang {name}",
+    "Cari harga - {name}",
+    "Cari harga barang - {name}",
+    "**Produk**: {name}\nMohon bandingkan dengan Tokopedia",
+]
+
+PRICE_TEMPLATES = [
+    ("Harga: Rp {dot}", "dot"),
+    ("Harga terbaik Rp. {dot} di Tokopedia", "dot"),
+    ("Price: IDR {comma}", "comma"),
+    ("Rp{plain} (belum PPN)", "plain"),
+    ("Harga satuan Rp {dot},50 per unit", "dot_decimal"),
+    ("Tidak ada harga yang ditemukan", None),
+]
+
+def build_name_corpus(size, rng):
+    corpus = []
+    for _ in range(size):
+        name = rng.choice(PRODUCTS)
+        corpus.append((rng.choice(NAME_TEMPLATES).format(name=name), name))
+    return corpus
+
+def build_price_corpus(size, rng):
+    corpus = []
+    for _ in range(size):
+        value = rng.randint(10, 50_000) * 1000
+        template, kind = rng.choice(PRICE_TEMPLATES)
+        text = template.format(dot=f"{value:,}".replace(",", "."), comma=f"{value:,}", plain=value)
+        expected = None if kind is None else value + (0.5 if kind == "dot_decimal" else 0)
+        corpus.append((text, expected))
+    return corpus
+
+def run_benchmark(label, batch_func, corpus):
+    inputs = [text for text, _ in corpus]
+    start = time.perf_counter()
+    results = batch_func(inputs)
+    elapsed = time.perf_counter() - start
+
+    correct = sum(1 for result, (_, expected) in zip(results, corpus) if result == expected)
+    print(f"{label:<24} {len(inputs) / elapsed:>12,.0f} calls/sec   accuracy {correct / len(corpus):.1%}")
+
+    misses = [(text, expected, result) for result, (text, expected) in zip(results, corpus) if result != expected]
+    for text, expected, result in misses[:3]:
+        print(f"    miss: {text!r} -> {result!r} (expected {expected!r})")
+
+if __name__ == "__main__":
+    rng = random.Random(42)
+    size = 50_000
+    name_corpus = build_name_corpus(size, rng)
+    price_corpus = build_price_corpus(size, rng)
+
+    print(f"Benchmarking price_researcher over {size:,} synthetic messages")
+    run_benchmark("extract_product_name", lambda texts: [extract_product_name(t) for t in texts], name_corpus)
+    run_benchmark("extract_price", lambda texts: [extract_price(t) for t in texts], price_corpus)
@@ -0,0 +1,59 @@
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+from rupiah import parse_rupiah, parse_rupiah_series
+
+# Format sel harga yang ditemui di penawaran, knowledge base dan halaman marketplace
+CELL_TEMPLATES = [
+    ("Rp {dot}", 1),
+    ("Rp{dot},50", "decimal"),
+    ("IDR {comma}", 1),
+    ("{plain}", 1),
+    ("Rp{juta}jt", 1),
+    ("Rp {dot} - Rp {dot2}", 1),
+    ("Rp{dot}\nRp{dot2}\n25%", 1),
+    ("-", None),
+]
+
+def build_cell_corpus(size, distinct, rng):
+    """Column of `size` cells drawn from `distinct` different price texts"""
+    pool = []
+    for _ in range(distinct):
+        value = rng.randint(10, 50_000) * 1000
+        template, kind = rng.choice(CELL_TEMPLATES)
+        text = template.format(
+            dot=f"{value:,}".replace(",", "."), dot2=f"{value * 2:,}".replace(",", "."),
+            comma=f"{value:,}", plain=value, juta=f"{value / 1e6:g}".replace(".", ",")
+        )
+        expected = None if kind is None else value + (0.5 if kind == "decimal" else 0)
+        pool.append((text, expected))
+    return [rng.choice(pool) for _ in range(size)]
+
+def run_benchmark(label, func, cells, expected):
+    start = time.perf_counter()
+    results = np.asarray(func(cells), dtype=float)
+    elapsed = time.perf_counter() - start
+
+    expected = np.asarray([np.nan if e is None else e for e in expected], dtype=float)
+    correct = np.isclose(results, expected) | (np.isnan(results) & np.isnan(expected))
+    print(f"{label:<36} {len(cells) / elapsed:>14,.0f} cells/sec   accuracy {correct.mean():.1%}")
+
+if __name__ == "__main__":
+    rng = random.Random(42)
+    size = 1_000_000
+    scalar = lambda cells: [np.nan if (v := parse_rupiah(c)) is None else v for c in cells]
+
+    print(f"Benchmarking rupiah over {size:,} cells")
+    for distinct in (1_000, 100_000, size):
+        corpus = build_cell_corpus(size, distinct, rng)
+        cells = pd.Series([text for text, _ in corpus], dtype=object)
+        expected = [e for _, e in corpus]
+        run_benchmark(f"parse_rupiah ({distinct:,} distinct)", scalar, cells, expected)
+        run_benchmark(f"parse_rupiah_series ({distinct:,} distinct)", parse_rupiah_series, cells, expected)
+
+    numbers = pd.Series(np.array([rng.randint(10, 50_000) * 1000 for _ in range(size)], dtype=float))
+    run_benchmark("parse_rupiah (numeric)", scalar, numbers, numbers.tolist())
+    run_benchmark("parse_rupiah_series (numeric)", parse_rupiah_series, numbers, numbers.tolist())
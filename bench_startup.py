@@ -0,0 +1,80 @@
+import os
+import subprocess
+import sys
+import time
+
+# Modul berat yang tidak boleh ikut dimuat saat aplikasi dibuka; hanya dimuat saat scraping atau chat pertama
+HEAVY_MODULES = ['selenium', 'webdriver_manager', 'crawlbase', 'bs4', 'openai', 'google.generativeai', 'altair']
+
+# Batas regresi, bisa dilonggarkan untuk mesin yang lebih lambat
+MAX_IMPORT_S = float(os.getenv("BENCH_MAX_IMPORT_S", "2.0"))
+MAX_RERUN_MS = float(os.getenv("BENCH_MAX_RERUN_MS", "500"))
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+# Dijalankan di interpreter baru: impor semua import tingkat atas main.py dan laporkan modul berat yang ikut termuat
+COLD_IMPORT_CODE = f"""
+import ast, sys, time
+start = time.perf_counter()
+tree = ast.parse(open({APP_PATH!r}, encoding='utf-8').read())
+for node in tree.body:
+    if isinstance(node, (ast.Import, ast.ImportFrom)):
+        exec(compile(ast.Module([node], []), 'main.py', 'exec'))
+elapsed = time.perf_counter() - start
+print(elapsed)
+print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))
+"""
+
+def measure_cold_import(runs=3):
+    timings, loaded = [], set()
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", COLD_IMPORT_CODE],
+            capture_output=True, text=True, cwd=os.path.dirname(APP_PATH), check=True
+        )
+        elapsed, heavy = result.stdout.split("\n")[:2]
+        timings.append(float(elapsed))
+        loaded.update(filter(None, heavy.split(",")))
+    return min(timings), sorted(loaded)
+
+def measure_rerun(reruns=10):
+    from streamlit.testing.v1 import AppTest
+
+    # Kunci dummy: aplikasi tidak boleh menghubungi API apa pun hanya karena dibuka
+    os.environ.setdefault("GEMINI_API_KEY", "bench")
+    os.environ.setdefault("CRAWLING_API_KEY", "bench")
+
+    app = AppTest.from_file(APP_PATH, default_timeout=120)
+    start = time.perf_counter()
+    app.run()
+    first = time.perf_counter() - start
+    if app.exception:
+        raise RuntimeError(app.exception[0].value)
+
+    timings = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        app.run()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return first, timings[len(timings) // 2]
+
+if __name__ == "__main__":
+    failures = []
+
+    import_s, heavy = measure_cold_import()
+    print(f"cold import      {import_s:>8.3f}s   heavy modules loaded: {', '.join(heavy) or 'none'}")
+    if heavy:
+        failures.append(f"heavy modules imported at startup: {', '.join(heavy)}")
+    if import_s > MAX_IMPORT_S:
+        failures.append(f"cold import {import_s:.3f}s > {MAX_IMPORT_S}s")
+
+    first_s, rerun_s = measure_rerun()
+    print(f"first run        {first_s:>8.3f}s")
+    print(f"rerun (median)   {rerun_s * 1000:>8.1f}ms")
+    if rerun_s * 1000 > MAX_RERUN_MS:
+        failures.append(f"rerun {rerun_s * 1000:.1f}ms > {MAX_RERUN_MS}ms")
+
+    for failure in failures:
+        print(f"REGRESSION: {failure}")
+    sys.exit(1 if failures else 0)
@@ -3,8 +3,9 @@ from openai import OpenAI
 import streamlit as st
 import os
 from dotenv import load_dotenv
-import PyPDF2
-import tempfile
+from document_ingest import ingest_pdfs
+from document_index import search_document_index, format_retrieved_chunks
+from document_store import add_documents, clear_documents, get_document_index, list_documents, stored_hashes
 
 # Muat variabel lingkungan dari file .env (untuk menyimpan kunci API)
 load_dotenv()
@@ -65,32 +66,6 @@ ROLES = {
 }
 
 
-# Fungsi untuk mengekstrak teks dari file PDF yang diunggah
-def extract_text_from_pdf(pdf_file):
-    """Mengekstrak teks dari file PDF yang diunggah"""
-    try:
-        # Buat file sementara untuk menyimpan PDF yang diunggah
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-            tmp_file.write(pdf_file.getvalue())
-            tmp_file_path = tmp_file.name
-
-        # Buka dan baca file PDF sementara
-        with open(tmp_file_path, "rb") as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            text = ""
-            # Loop setiap halaman dalam PDF untuk mengambil teksnya
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-
-        # Hapus file sementara setelah selesai diproses
-        os.unlink(tmp_file_path)
-        return text
-    except Exception as e:
-        # Tampilkan pesan error jika gagal mengekstrak teks
-        st.error(f"Error extracting PDF text: {str(e)}")
-        return None
-
-
 # --- Bagian Sidebar untuk Konfigurasi ---
 with st.sidebar:
     st.header("⚙️ Configuration")
@@ -107,35 +82,29 @@ with st.sidebar:
         "Upload PDF documents:", type=["pdf"], accept_multiple_files=True
     )
 
-    # Proses file yang diunggah
+    # Proses file yang diunggah; dokumen yang sudah ada di document store (hash sama) tidak diekstrak lagi.
+    # Document store dipakai bersama oleh semua sesi dan tetap ada setelah aplikasi di-restart.
     if uploaded_files:
-        # Inisialisasi 'knowledge_base' di session_state jika belum ada
-        if "knowledge_base" not in st.session_state:
-            st.session_state.knowledge_base = ""
-
-        # Ekstrak teks dari file-file yang baru diunggah
-        new_knowledge = ""
-        for pdf_file in uploaded_files:
-            st.write(f"📄 Processing: {pdf_file.name}")
-            pdf_text = extract_text_from_pdf(pdf_file)
-            if pdf_text:
-                # Tambahkan teks dari PDF ke variabel dengan format penanda
-                new_knowledge += f"\n\n=== DOCUMENT: {pdf_file.name} ===\n{pdf_text}"
-
-        # Perbarui basis pengetahuan jika ada konten baru dan belum ada sebelumnya
-        if new_knowledge and new_knowledge not in st.session_state.knowledge_base:
-            st.session_state.knowledge_base += new_knowledge
-            st.success(f"✅ Processed {len(uploaded_files)} document(s)")
+        with st.spinner("📄 Processing documents..."):
+            documents = ingest_pdfs(uploaded_files, stored_hashes())
+            added, missing = add_documents(documents) if documents else (0, [])
+        if added:
+            st.success(f"✅ Processed {added} document(s)")
+        if missing:
+            st.warning(f"Not added because the knowledge base was cleared while processing: {', '.join(missing)}. They are processed again on the next refresh.")
 
     # Tombol untuk menghapus seluruh basis pengetahuan
     if st.button("🗑️ Clear Knowledge Base"):
-        st.session_state.knowledge_base = ""
+        clear_documents()
         st.success("Knowledge base cleared!")
 
     # Tampilkan status basis pengetahuan (jumlah kata)
-    if "knowledge_base" in st.session_state and st.session_state.knowledge_base:
-        word_count = len(st.session_state.knowledge_base.split())
+    stored_documents = list_documents()
+    if stored_documents:
+        word_count = sum(doc['words'] for doc in stored_documents)
+        chunk_count = sum(doc['chunks'] for doc in stored_documents)
         st.metric("Knowledge Base", f"{word_count} words")
+        st.caption(f"{len(stored_documents)} document(s), {chunk_count} searchable chunks")
 
 # --- Inisialisasi Session State ---
 # Session state digunakan untuk menyimpan data antar interaksi pengguna
@@ -187,30 +156,33 @@ if prompt := st.chat_input("What can I help you with?"):
         # Bangun prompt sistem dengan instruksi peran
         system_prompt = ROLES[selected_role]["system_prompt"]
 
-        # Tambahkan konteks dari basis pengetahuan jika tersedia
-        if "knowledge_base" in st.session_state and st.session_state.knowledge_base:
-            system_prompt += f"""
+        # Ambil hanya potongan dokumen yang paling relevan dengan pertanyaan, bukan seluruh dokumen
+        document_context = ""
+        document_index = get_document_index()
+        if document_index:
+            results = search_document_index(document_index, prompt)
+            if results:
+                document_context = f"""IMPORTANT: The following excerpts from the uploaded documents are the most relevant to this question. Use this information to answer when relevant:
 
-            IMPORTANT: You have access to the following knowledge base from uploaded documents. Use this information to answer questions when relevant:
+{format_retrieved_chunks(results)}
 
-            {st.session_state.knowledge_base}
+When answering questions, prioritize information from these excerpts when applicable. If the answer is found in the uploaded documents, mention which document it came from."""
 
-            When answering questions, prioritize information from the knowledge base when applicable. If the answer is found in the uploaded documents, mention which document it came from.
-            """
+        # Pertanyaan yang dikirim: potongan dokumen (jika ada) diikuti pertanyaan pengguna
+        full_prompt = f"{document_context}\n\nUser question: {prompt}" if document_context else prompt
 
         # Bangun pesan untuk API Telkom
         messages = []
 
-        # Tambahkan sistem prompt sebagai pesan pertama jika ini awal percakapan
-        if not st.session_state.messages[:-1]:
-            messages.append({"role": "system", "content": system_prompt})
+        # Tambahkan sistem prompt sebagai pesan pertama di setiap giliran agar peran tetap terjaga
+        messages.append({"role": "system", "content": system_prompt})
 
         # Tambahkan riwayat percakapan sebelumnya (semua kecuali pesan terakhir dari pengguna)
         for msg in st.session_state.messages[:-1]:
             messages.append({"role": msg["role"], "content": msg["content"]})
 
-        # Tambahkan pesan pengguna saat ini
-        messages.append({"role": "user", "content": prompt})
+        # Tambahkan pesan pengguna saat ini beserta potongan dokumen yang relevan
+        messages.append({"role": "user", "content": full_prompt})
 
         try:
             # Kirim pesan ke API Telkom dan dapatkan respons
@@ -3,8 +3,9 @@ import google.generativeai as genai
 import streamlit as st
 import os
 from dotenv import load_dotenv
-import PyPDF2
-import tempfile
+from document_ingest import ingest_pdfs
+from document_index import search_document_index, format_retrieved_chunks
+from document_store import add_documents, clear_documents, get_document_index, list_documents, stored_hashes
 
 # Muat variabel lingkungan dari file .env (untuk menyimpan kunci API)
 load_dotenv()
@@ -52,32 +53,6 @@ ROLES = {
 }
 
 
-# Fungsi untuk mengekstrak teks dari file PDF yang diunggah
-def extract_text_from_pdf(pdf_file):
-    """Mengekstrak teks dari file PDF yang diunggah"""
-    try:
-        # Buat file sementara untuk menyimpan PDF yang diunggah
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-            tmp_file.write(pdf_file.getvalue())
-            tmp_file_path = tmp_file.name
-
-        # Buka dan baca file PDF sementara
-        with open(tmp_file_path, "rb") as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            text = ""
-            # Loop setiap halaman dalam PDF untuk mengambil teksnya
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-
-        # Hapus file sementara setelah selesai diproses
-        os.unlink(tmp_file_path)
-        return text
-    except Exception as e:
-        # Tampilkan pesan error jika gagal mengekstrak teks
-        st.error(f"Error extracting PDF text: {str(e)}")
-        return None
-
-
 # --- Bagian Sidebar untuk Konfigurasi ---
 with st.sidebar:
     st.header("⚙️ Configuration")
@@ -94,35 +69,29 @@ with st.sidebar:
         "Upload PDF documents:", type=["pdf"], accept_multiple_files=True
     )
 
-    # Proses file yang diunggah
+    # Proses file yang diunggah; dokumen yang sudah ada di document store (hash sama) tidak diekstrak lagi.
+    # Document store dipakai bersama oleh semua sesi dan tetap ada setelah aplikasi di-restart.
     if uploaded_files:
-        # Inisialisasi 'knowledge_base' di session_state jika belum ada
-        if "knowledge_base" not in st.session_state:
-            st.session_state.knowledge_base = ""
-
-        # Ekstrak teks dari file-file yang baru diunggah
-        new_knowledge = ""
-        for pdf_file in uploaded_files:
-            st.write(f"📄 Processing: {pdf_file.name}")
-            pdf_text = extract_text_from_pdf(pdf_file)
-            if pdf_text:
-                # Tambahkan teks dari PDF ke variabel dengan format penanda
-                new_knowledge += f"\n\n=== DOCUMENT: {pdf_file.name} ===\n{pdf_text}"
-
-        # Perbarui basis pengetahuan jika ada konten baru dan belum ada sebelumnya
-        if new_knowledge and new_knowledge not in st.session_state.knowledge_base:
-            st.session_state.knowledge_base += new_knowledge
-            st.success(f"✅ Processed {len(uploaded_files)} document(s)")
+        with st.spinner("📄 Processing documents..."):
+            documents = ingest_pdfs(uploaded_files, stored_hashes())
+            added, missing = add_documents(documents) if documents else (0, [])
+        if added:
+            st.success(f"✅ Processed {added} document(s)")
+        if missing:
+            st.warning(f"Not added because the knowledge base was cleared while processing: {', '.join(missing)}. They are processed again on the next refresh.")
 
     # Tombol untuk menghapus seluruh basis pengetahuan
     if st.button("🗑️ Clear Knowledge Base"):
-        st.session_state.knowledge_base = ""
+        clear_documents()
         st.success("Knowledge base cleared!")
 
     # Tampilkan status basis pengetahuan (jumlah kata)
-    if "knowledge_base" in st.session_state and st.session_state.knowledge_base:
-        word_count = len(st.session_state.knowledge_base.split())
+    stored_documents = list_documents()
+    if stored_documents:
+        word_count = sum(doc['words'] for doc in stored_documents)
+        chunk_count = sum(doc['chunks'] for doc in stored_documents)
         st.metric("Knowledge Base", f"{word_count} words")
+        st.caption(f"{len(stored_documents)} document(s), {chunk_count} searchable chunks")
 
 # --- Inisialisasi Session State ---
 # Session state digunakan untuk menyimpan data antar interaksi pengguna
@@ -170,31 +139,34 @@ if prompt := st.chat_input("What can I help you with?"):
         # Bangun prompt sistem dengan instruksi peran
         system_prompt = ROLES[selected_role]["system_prompt"]
 
-        # Tambahkan konteks dari basis pengetahuan jika tersedia
-        if "knowledge_base" in st.session_state and st.session_state.knowledge_base:
-            system_prompt += f"""
+        # Ambil hanya potongan dokumen yang paling relevan dengan pertanyaan, bukan seluruh dokumen
+        document_context = ""
+        document_index = get_document_index()
+        if document_index:
+            results = search_document_index(document_index, prompt)
+            if results:
+                document_context = f"""IMPORTANT: The following excerpts from the uploaded documents are the most relevant to this question. Use this information to answer when relevant:
 
-            IMPORTANT: You have access to the following knowledge base from uploaded documents. Use this information to answer questions when relevant:
+{format_retrieved_chunks(results)}
 
-            {st.session_state.knowledge_base}
+When answering questions, prioritize information from these excerpts when applicable. If the answer is found in the uploaded documents, mention which document it came from."""
 
-            When answering questions, prioritize information from the knowledge base when applicable. If the answer is found in the uploaded documents, mention which document it came from.
-            """
+        # Pertanyaan yang dikirim: potongan dokumen (jika ada) diikuti pertanyaan pengguna
+        full_prompt = f"{document_context}\n\nUser question: {prompt}" if document_context else prompt
 
         # Konversi riwayat pesan ke format yang sesuai untuk Gemini
         chat_history = []
 
-        # Tambahkan prompt sistem sebagai pesan pertama jika ini awal percakapan
-        if not st.session_state.messages[:-1]:
-            chat_history.append({"role": "user", "parts": [system_prompt]})
-            chat_history.append(
-                {
-                    "role": "model",
-                    "parts": [
-                        "I understand. I'll act according to my role and use the knowledge base when relevant. How can I help you?"
-                    ],
-                }
-            )
+        # Tambahkan prompt sistem sebagai pesan pertama di setiap giliran agar peran tetap terjaga
+        chat_history.append({"role": "user", "parts": [system_prompt]})
+        chat_history.append(
+            {
+                "role": "model",
+                "parts": [
+                    "I understand. I'll act according to my role and use the knowledge base when relevant. How can I help you?"
+                ],
+            }
+        )
 
         # Tambahkan riwayat percakapan sebelumnya (semua kecuali pesan terakhir dari pengguna)
         for msg in st.session_state.messages[:-1]:
@@ -204,12 +176,6 @@ if prompt := st.chat_input("What can I help you with?"):
         # Mulai sesi chat dengan riwayat yang sudah ada
         chat = model.start_chat(history=chat_history)
 
-        # Gabungkan prompt sistem dengan pertanyaan pengguna hanya untuk interaksi pertama
-        if not st.session_state.messages[:-1]:
-            full_prompt = f"{system_prompt}\n\nUser question: {prompt}"
-        else:
-            full_prompt = prompt
-
         # Kirim pesan dan dapatkan respons secara streaming
         response = chat.send_message(full_prompt, stream=True)
 
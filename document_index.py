@@ -0,0 +1,185 @@
+import re
+from collections import Counter
+
+import numpy as np
+
+# Ukuran potongan dokumen (jumlah kata) dan tumpang tindih antar potongan
+CHUNK_WORDS = 200
+CHUNK_OVERLAP = 40
+
+# Jumlah potongan yang dikirim ke model per pertanyaan
+TOP_K = 6
+
+# Parameter BM25
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+TOKEN_PATTERN = re.compile(r'[0-9a-z]+')
+
+def tokenize(text):
+    """Lowercase word tokens of a text"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+def chunk_text(text, chunk_words=CHUNK_WORDS, overlap=CHUNK_OVERLAP):
+    """Split a text into overlapping chunks of words
+
+    Args:
+        text (str): Document text
+        chunk_words (int): Words per chunk
+        overlap (int): Words shared by consecutive chunks
+
+    Returns:
+        list: Chunk strings
+    """
+    words = text.split()
+    step = max(chunk_words - overlap, 1)
+    return [
+        " ".join(words[start:start + chunk_words])
+        for start in range(0, max(len(words) - overlap, 1), step)
+        if words[start:start + chunk_words]
+    ]
+
+def build_document_segment(text, chunk_words=CHUNK_WORDS, overlap=CHUNK_OVERLAP):
+    """Chunk one document and count its terms per chunk
+
+    A segment only depends on the document itself, so it is computed once
+    per document and reused by every index that contains the document.
+
+    Args:
+        text (str): Document text
+        chunk_words (int): Words per chunk
+        overlap (int): Words shared by consecutive chunks
+
+    Returns:
+        dict: 'chunks', 'terms' (local vocabulary) and per (term, chunk)
+            pair 'term_ids', 'chunk_ids' and 'counts', plus token
+            'lengths' per chunk
+    """
+    chunks = chunk_text(text, chunk_words, overlap)
+    terms = {}
+    term_ids, chunk_ids, counts = [], [], []
+    lengths = np.zeros(len(chunks), dtype=np.int64)
+    for chunk_id, chunk in enumerate(chunks):
+        tokens = tokenize(chunk)
+        lengths[chunk_id] = len(tokens)
+        tf = Counter(tokens)
+        term_ids.extend(terms.setdefault(token, len(terms)) for token in tf)
+        chunk_ids.extend([chunk_id] * len(tf))
+        counts.extend(tf.values())
+
+    return {
+        'chunks': chunks,
+        'terms': list(terms),
+        'term_ids': np.asarray(term_ids, dtype=np.int64),
+        'chunk_ids': np.asarray(chunk_ids, dtype=np.int64),
+        'counts': np.asarray(counts, dtype=np.int64),
+        'lengths': lengths,
+    }
+
+def merge_document_segments(segments, doc_names):
+    """Build a BM25 index from the segments of several documents
+
+    Only the vocabularies are merged in Python; postings are remapped and
+    weighted with array operations, so no document is tokenized again.
+    The BM25 weight of every (term, chunk) pair is computed once here and
+    stored as sparse postings, so a query only sums the weights of its
+    terms.
+
+    Args:
+        segments (list): Results of build_document_segment (chunk texts
+            are not needed)
+        doc_names (list): Name of each document
+
+    Returns:
+        dict: 'doc_names', 'chunk_doc_ids' (document of each chunk),
+            'terms' (term -> id) and CSR postings 'indptr', 'chunk_ids',
+            'weights'
+    """
+    terms = {}
+    term_parts, chunk_parts, count_parts, length_parts, doc_id_parts = [], [], [], [], []
+    chunk_base = 0
+    for doc_id, segment in enumerate(segments):
+        # Id term lokal dokumen -> id term gabungan
+        mapping = np.array([terms.setdefault(term, len(terms)) for term in segment['terms']], dtype=np.int64)
+        term_parts.append(mapping[segment['term_ids']])
+        chunk_parts.append(segment['chunk_ids'] + chunk_base)
+        count_parts.append(segment['counts'])
+        length_parts.append(segment['lengths'])
+        doc_id_parts.append(np.full(len(segment['lengths']), doc_id, dtype=np.int32))
+        chunk_base += len(segment['lengths'])
+
+    term_ids = np.concatenate(term_parts) if term_parts else np.zeros(0, dtype=np.int64)
+    chunk_ids = np.concatenate(chunk_parts) if chunk_parts else np.zeros(0, dtype=np.int64)
+    counts = np.concatenate(count_parts).astype(float) if count_parts else np.zeros(0)
+    lengths = np.concatenate(length_parts).astype(float) if length_parts else np.zeros(0)
+    chunk_doc_ids = np.concatenate(doc_id_parts) if doc_id_parts else np.zeros(0, dtype=np.int32)
+
+    # Urutkan per term agar postings satu term berada dalam satu rentang (format CSR)
+    order = np.argsort(term_ids, kind='stable')
+    term_ids, chunk_ids, counts = term_ids[order], chunk_ids[order], counts[order]
+    indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(term_ids, minlength=len(terms)), out=indptr[1:])
+
+    doc_freq = np.diff(indptr).astype(float)
+    idf = np.log(1 + (len(lengths) - doc_freq + 0.5) / (doc_freq + 0.5))
+    avg_length = lengths.mean() if len(lengths) else 0.0
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[chunk_ids] / max(avg_length, 1.0))
+    weights = idf[term_ids] * counts * (BM25_K1 + 1) / (counts + norm)
+
+    return {
+        'doc_names': list(doc_names),
+        'chunk_doc_ids': chunk_doc_ids,
+        'terms': terms,
+        'indptr': indptr,
+        'chunk_ids': chunk_ids,
+        'weights': weights,
+    }
+
+def build_document_index(documents, chunk_words=CHUNK_WORDS, overlap=CHUNK_OVERLAP):
+    """Build a BM25 index over chunks of the given documents
+
+    Args:
+        documents (iterable): Dicts with 'name' and 'text'
+        chunk_words (int): Words per chunk
+        overlap (int): Words shared by consecutive chunks
+
+    Returns:
+        dict: 'chunks' plus the keys of merge_document_segments
+    """
+    documents = list(documents)
+    segments = [build_document_segment(doc['text'], chunk_words, overlap) for doc in documents]
+    index = merge_document_segments(segments, [doc['name'] for doc in documents])
+    index['chunks'] = [chunk for segment in segments for chunk in segment['chunks']]
+    return index
+
+def search_document_index(index, query, top_k=TOP_K):
+    """Retrieve the chunks that best match a query
+
+    Args:
+        index (dict): Index from build_document_index, or a stored index
+            with the same keys
+        query (str): User question
+        top_k (int): Number of chunks to return
+
+    Returns:
+        list: Dicts with 'name', 'text' and 'score', best match first
+    """
+    term_ids = [index['terms'][token] for token in set(tokenize(query)) if token in index['terms']]
+    if not term_ids:
+        return []
+
+    indptr = index['indptr']
+    postings = np.concatenate([np.arange(indptr[t], indptr[t + 1]) for t in term_ids])
+    scores = np.bincount(index['chunk_ids'][postings], weights=index['weights'][postings], minlength=len(index['chunks']))
+
+    top_k = min(top_k, int(np.count_nonzero(scores)))
+    best = np.argpartition(-scores, top_k - 1)[:top_k]
+    best = best[np.argsort(-scores[best])]
+    return [
+        {'name': index['doc_names'][index['chunk_doc_ids'][i]], 'text': index['chunks'][i], 'score': float(scores[i])}
+        for i in best
+    ]
+
+def format_retrieved_chunks(results):
+    """Format retrieved chunks as prompt context, labelled by document"""
+    return "\n\n".join(f"=== DOCUMENT: {r['name']} ===\n{r['text']}" for r in results)
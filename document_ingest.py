@@ -0,0 +1,87 @@
+import hashlib
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import PyPDF2
+import streamlit as st
+
+# Jumlah halaman per tugas di process pool; dokumen yang lebih kecil diekstrak langsung tanpa pool
+PAGES_PER_TASK = 16
+
+# Jumlah proses ekstraksi PDF, default semua core
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "0")) or os.cpu_count() or 1
+
+def document_hash(data):
+    """SHA-256 of a document's bytes, used as its identity"""
+    return hashlib.sha256(data).hexdigest()
+
+def _extract_pages(data, start, stop):
+    # Dijalankan di proses terpisah: buka PDF langsung dari buffer di memori
+    reader = PyPDF2.PdfReader(io.BytesIO(data))
+    return [(reader.pages[i].extract_text() or "") for i in range(start, stop)]
+
+# Process pool dibuat sekali dan dipakai bersama oleh semua sesi
+@st.cache_resource
+def get_pdf_pool():
+    # "spawn" agar proses anak tidak mewarisi thread server Streamlit
+    return ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+def extract_pdf_text(data, pages_per_task=PAGES_PER_TASK):
+    """Extract the text of a PDF from memory, in parallel for large documents
+
+    Args:
+        data (bytes): Content of the PDF file
+        pages_per_task (int): Pages extracted per process pool task
+
+    Returns:
+        str: Text of all pages, one page per line block
+    """
+    page_count = len(PyPDF2.PdfReader(io.BytesIO(data)).pages)
+    if page_count <= pages_per_task or PDF_WORKERS == 1:
+        return "\n".join(_extract_pages(data, 0, page_count))
+
+    pool = get_pdf_pool()
+    futures = [
+        pool.submit(_extract_pages, data, start, min(start + pages_per_task, page_count))
+        for start in range(0, page_count, pages_per_task)
+    ]
+    return "\n".join(text for future in futures for text in future.result())
+
+# Teks hasil ekstraksi di-cache per isi file, sehingga rerun dan unggahan ulang tidak mengekstrak lagi
+@st.cache_data(show_spinner=False, max_entries=256)
+def extract_pdf_text_cached(doc_hash, _data):
+    return extract_pdf_text(_data)
+
+def ingest_pdfs(uploaded_files, known_hashes=()):
+    """Hash uploaded PDFs and extract the text of those not ingested yet
+
+    Args:
+        uploaded_files (list): Uploaded files (anything with .name and .getvalue())
+        known_hashes (iterable): Hashes of documents that are already ingested
+
+    Returns:
+        list: Dicts with 'hash' and 'name' for each uploaded document, plus
+            'text' for documents not in known_hashes; duplicates in the
+            same upload included only once
+    """
+    known_hashes = set(known_hashes)
+    seen = set()
+    documents = []
+    for pdf_file in uploaded_files:
+        data = pdf_file.getvalue()
+        doc_hash = document_hash(data)
+        if doc_hash in seen:
+            continue
+        seen.add(doc_hash)
+        if doc_hash in known_hashes:
+            documents.append({'hash': doc_hash, 'name': pdf_file.name})
+            continue
+        try:
+            text = extract_pdf_text_cached(doc_hash, data)
+        except Exception as e:
+            st.error(f"Error extracting PDF text from {pdf_file.name}: {str(e)}")
+            continue
+        documents.append({'hash': doc_hash, 'name': pdf_file.name, 'text': text})
+    return documents
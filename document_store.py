@@ -0,0 +1,231 @@
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+import streamlit as st
+
+from document_index import build_document_segment, merge_document_segments
+
+# Lokasi penyimpanan dokumen, dipakai bersama oleh semua sesi dan bertahan setelah restart
+DOCUMENT_STORE_DIR = os.getenv("DOCUMENT_STORE_DIR", "document_store")
+
+# Array index yang disimpan sebagai .npy dan dibuka dengan memory map
+INDEX_ARRAYS = ('indptr', 'chunk_ids', 'weights', 'chunk_doc_ids', 'chunk_offsets')
+
+# Array segmen per dokumen (hasil tokenisasi), dihitung sekali saat dokumen masuk
+SEGMENT_ARRAYS = ('term_ids', 'chunk_ids', 'counts', 'lengths', 'chunk_offsets')
+
+# Sesi Streamlit berjalan sebagai thread dalam satu proses; penulisan store dilakukan satu per satu
+_STORE_LOCK = threading.Lock()
+
+class MappedChunks:
+    """Chunk texts read lazily from a memory-mapped file"""
+
+    def __init__(self, path, offsets):
+        self.offsets = offsets
+        self._data = b""
+        # mmap tidak bisa dibuat untuk file kosong; file langsung ditutup karena mmap memegang salinannya
+        if offsets[-1]:
+            with open(path, 'rb') as f:
+                self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self._data[self.offsets[i]:self.offsets[i + 1]].decode('utf-8')
+
+def _documents_dir():
+    return os.path.join(DOCUMENT_STORE_DIR, "documents")
+
+def _generation_dir(generation):
+    return os.path.join(DOCUMENT_STORE_DIR, f"index-{generation}")
+
+def _write_json(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+def _read_json(path, default):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+def current_generation():
+    """Content hash of the current index generation, empty when the store is empty"""
+    return _read_json(os.path.join(DOCUMENT_STORE_DIR, "CURRENT"), "") or ""
+
+def stored_hashes():
+    """Content hashes of all stored documents"""
+    try:
+        entries = os.listdir(_documents_dir())
+    except FileNotFoundError:
+        return set()
+    # Dokumen tanpa segmen (format lama atau belum selesai ditulis) dianggap belum tersimpan
+    return {
+        entry for entry in entries
+        if not entry.endswith(".tmp") and os.path.exists(os.path.join(_documents_dir(), entry, "segment.npz"))
+    }
+
+def list_documents():
+    """Metadata of the documents in the current index
+
+    Returns:
+        list: Dicts with 'hash', 'name', 'words' and 'chunks'
+    """
+    generation = current_generation()
+    if not generation:
+        return []
+    return _read_json(os.path.join(_generation_dir(generation), "documents.json"), [])
+
+def _write_document(doc):
+    """Store the text segment of a new document under its content hash"""
+    segment = build_document_segment(doc['text'])
+    doc_dir = os.path.join(_documents_dir(), doc['hash'])
+    tmp_dir = f"{doc_dir}.tmp"
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    encoded = [chunk.encode('utf-8') for chunk in segment['chunks']]
+    segment['chunk_offsets'] = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(chunk) for chunk in encoded], out=segment['chunk_offsets'][1:])
+    with open(os.path.join(tmp_dir, "chunks.bin"), 'wb') as f:
+        f.writelines(encoded)
+    np.savez(os.path.join(tmp_dir, "segment.npz"), **{name: segment[name] for name in SEGMENT_ARRAYS})
+    _write_json(os.path.join(tmp_dir, "terms.json"), segment['terms'])
+    _write_json(os.path.join(tmp_dir, "meta.json"), {
+        'hash': doc['hash'], 'name': doc['name'], 'words': len(doc['text'].split()), 'added': time.time()
+    })
+    os.replace(tmp_dir, doc_dir)
+
+def _read_segment(doc_hash):
+    doc_dir = os.path.join(_documents_dir(), doc_hash)
+    with np.load(os.path.join(doc_dir, "segment.npz")) as arrays:
+        segment = {name: arrays[name] for name in SEGMENT_ARRAYS}
+    segment['terms'] = _read_json(os.path.join(doc_dir, "terms.json"), [])
+    return segment
+
+def _stored_documents():
+    documents = [_read_json(os.path.join(_documents_dir(), doc_hash, "meta.json"), None) for doc_hash in stored_hashes()]
+    # Urutan tetap berdasarkan waktu masuk agar id dokumen stabil
+    return sorted((doc for doc in documents if doc), key=lambda doc: doc['added'])
+
+def _write_index(documents):
+    """Merge the stored segments of all documents into the index and make it current
+
+    The generation is named by the hash of its ordered document hashes, so
+    the same documents always give the same generation and the cached open
+    index stays valid.
+    """
+    generation = hashlib.sha256('\n'.join(doc['hash'] for doc in documents).encode()).hexdigest()
+    gen_dir = _generation_dir(generation)
+    if not os.path.exists(gen_dir):
+        segments = [_read_segment(doc['hash']) for doc in documents]
+        index = merge_document_segments(segments, [doc['name'] for doc in documents])
+        tmp_dir = f"{gen_dir}.tmp"
+        os.makedirs(tmp_dir, exist_ok=True)
+
+        # Teks potongan disalin byte demi byte dari file dokumen, offset digeser per dokumen
+        offsets = [np.zeros(1, dtype=np.int64)]
+        with open(os.path.join(tmp_dir, "chunks.bin"), 'wb') as out:
+            for doc, segment in zip(documents, segments):
+                with open(os.path.join(_documents_dir(), doc['hash'], "chunks.bin"), 'rb') as f:
+                    shutil.copyfileobj(f, out)
+                offsets.append(segment['chunk_offsets'][1:] + offsets[-1][-1])
+        index['chunk_offsets'] = np.concatenate(offsets)
+
+        for name in INDEX_ARRAYS:
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), index[name])
+        _write_json(os.path.join(tmp_dir, "terms.json"), index['terms'])
+        _write_json(os.path.join(tmp_dir, "documents.json"), [
+            {'hash': doc['hash'], 'name': doc['name'], 'words': doc['words'], 'chunks': len(segment['lengths'])}
+            for doc, segment in zip(documents, segments)
+        ])
+        os.replace(tmp_dir, gen_dir)
+
+    # Ganti penunjuk generasi secara atomik, lalu hapus generasi lama.
+    # Sesi yang masih memetakan file lama tetap bisa membacanya sampai dilepas.
+    _write_json(os.path.join(DOCUMENT_STORE_DIR, "CURRENT"), generation)
+    for entry in os.listdir(DOCUMENT_STORE_DIR):
+        if entry.startswith("index-") and entry != f"index-{generation}":
+            shutil.rmtree(os.path.join(DOCUMENT_STORE_DIR, entry), ignore_errors=True)
+
+def add_documents(documents):
+    """Add documents to the shared store and refresh the shared index
+
+    Document content is stored once under its hash; only documents that
+    are not stored yet need their 'text'. The index is rebuilt from the
+    stored segments, without tokenizing any document again.
+
+    Args:
+        documents (list): Dicts with 'hash', 'name' and, for documents that
+            are not in stored_hashes, 'text'
+
+    Returns:
+        tuple: (number of documents added, names of documents that are not
+            stored and came without 'text', e.g. because the store was
+            cleared after the caller read stored_hashes)
+    """
+    with _STORE_LOCK:
+        known = stored_hashes()
+        added, missing = 0, []
+        for doc in documents:
+            if doc['hash'] in known:
+                continue
+            if doc.get('text') is None:
+                missing.append(doc['name'])
+                continue
+            _write_document(doc)
+            known.add(doc['hash'])
+            added += 1
+
+        # Index juga dibangun ulang bila tertinggal dari dokumen yang tersimpan (mis. proses berhenti di tengah)
+        if added or {doc['hash'] for doc in list_documents()} != known:
+            _write_index(_stored_documents())
+        return added, missing
+
+def clear_documents():
+    """Remove every document and index from the store"""
+    with _STORE_LOCK:
+        shutil.rmtree(DOCUMENT_STORE_DIR, ignore_errors=True)
+
+# Index dibuka sekali per generasi (hash isi) dan dipakai bersama oleh semua sesi
+@st.cache_resource(max_entries=2, show_spinner=False)
+def load_document_index(generation):
+    """Open a stored index generation with memory-mapped arrays
+
+    Args:
+        generation (str): Generation from current_generation
+
+    Returns:
+        dict: Index with the same keys as build_document_index
+    """
+    gen_dir = _generation_dir(generation)
+    index = {name: np.load(os.path.join(gen_dir, f"{name}.npy"), mmap_mode='r') for name in INDEX_ARRAYS}
+    index['terms'] = _read_json(os.path.join(gen_dir, "terms.json"), None)
+    documents = _read_json(os.path.join(gen_dir, "documents.json"), None)
+    if index['terms'] is None or documents is None:
+        raise FileNotFoundError(gen_dir)
+    index['doc_names'] = [doc['name'] for doc in documents]
+    index['chunks'] = MappedChunks(os.path.join(gen_dir, "chunks.bin"), index['chunk_offsets'])
+    return index
+
+def get_document_index():
+    """Current shared document index, or None when the store is empty"""
+    for _ in range(2):
+        generation = current_generation()
+        if not generation:
+            return None
+        try:
+            return load_document_index(generation)
+        except FileNotFoundError:
+            # Generasi baru saja diganti oleh sesi lain, baca ulang penunjuknya
+            continue
+    return None
@@ -0,0 +1,248 @@
+import io
+import zipfile
+from xml.sax.saxutils import escape, quoteattr
+
+import numpy as np
+import pandas as pd
+
+# Format angka Rupiah bawaan Excel, nilai tetap numerik sehingga bisa dihitung di Excel
+CURRENCY_FORMAT = '"Rp" #,##0.00'
+
+# Lebar kolom maksimum agar kolom URL panjang tidak membuat sheet sulit dibaca
+MAX_COLUMN_WIDTH = 80
+
+# Jumlah baris (tersebar merata) yang diukur untuk lebar kolom teks; <cols> harus ditulis sebelum baris data
+WIDTH_SAMPLE_ROWS = 1_000
+
+# Jumlah baris yang diubah ke XML sekaligus; memori tetap terbatas berapa pun jumlah barisnya
+CHUNK_ROWS = 10_000
+
+# Batas Excel untuk nama sheet: panjang maksimum dan karakter yang tidak boleh dipakai
+MAX_SHEET_NAME_LENGTH = 31
+INVALID_SHEET_NAME_CHARS = set('[]:*?/\\')
+
+# Indeks style pada styles.xml di bawah
+STYLE_DEFAULT, STYLE_CURRENCY, STYLE_HEADER = 0, 1, 2
+
+CONTENT_TYPES_XML = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
+<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>
+{sheets}
+</Types>"""
+
+ROOT_RELS_XML = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>
+</Relationships>"""
+
+WORKBOOK_XML = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<sheets>{sheets}</sheets>
+</workbook>"""
+
+WORKBOOK_RELS_XML = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+{sheets}
+<Relationship Id="rIdStyles" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>
+</Relationships>"""
+
+STYLES_XML = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">
+<numFmts count="1"><numFmt numFmtId="164" formatCode={currency_format}/></numFmts>
+<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font><font><b/><sz val="11"/><name val="Calibri"/></font></fonts>
+<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>
+<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>
+<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>
+<cellXfs count="3">
+<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>
+<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>
+<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>
+</cellXfs>
+<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>
+</styleSheet>""".format(currency_format=quoteattr(CURRENCY_FORMAT))
+
+def _currency_text_length(values):
+    """Length of values rendered as "Rp 1,234,567.89", computed without formatting each value"""
+    values = np.abs(np.nan_to_num(values.astype(float), nan=0.0, posinf=0.0, neginf=0.0))
+    digits = np.floor(np.log10(np.maximum(values, 1))).astype(int) + 1
+    return digits + (digits - 1) // 3 + len("Rp ") + len(".00")
+
+def column_widths(df, currency_columns=()):
+    """Compute Excel column widths for a DataFrame
+
+    Currency columns are measured over every row, which stays vectorized.
+    Other columns are measured on at most WIDTH_SAMPLE_ROWS evenly spread
+    rows, so the cost does not grow with the size of the export.
+
+    Args:
+        df (pd.DataFrame): Data to export
+        currency_columns (iterable): Columns exported with CURRENCY_FORMAT
+
+    Returns:
+        list: Width for each column, in column order
+    """
+    if len(df) > WIDTH_SAMPLE_ROWS:
+        sample = df.iloc[np.linspace(0, len(df) - 1, WIDTH_SAMPLE_ROWS).astype(int)]
+    else:
+        sample = df
+
+    widths = []
+    for col_idx, col in enumerate(df.columns):
+        if not len(df):
+            length = 0
+        elif col in currency_columns:
+            length = int(_currency_text_length(df.iloc[:, col_idx].to_numpy()).max())
+        else:
+            # Kolom yang seluruhnya kosong tidak punya panjang teks (NaN)
+            length = int(sample.iloc[:, col_idx].astype(str).str.len().fillna(0).max())
+        widths.append(min(max(length, len(str(col))) + 2, MAX_COLUMN_WIDTH))
+    return widths
+
+def _column_kind(series):
+    if pd.api.types.is_bool_dtype(series):
+        return 'bool'
+    if pd.api.types.is_numeric_dtype(series):
+        return 'number'
+    if pd.api.types.infer_dtype(series, skipna=True) in ('integer', 'floating', 'mixed-integer-float', 'decimal'):
+        return 'number'
+    return 'string'
+
+def _cells_xml(series, kind, style):
+    """Render one column of a chunk as cell XML, vectorized over its rows"""
+    style_attr = f' s="{style}"' if style else ''
+    if kind == 'number':
+        values = pd.to_numeric(series, errors='coerce').astype(float)
+        text = values.astype(str)
+        valid = np.isfinite(values.to_numpy())
+        return pd.Series(
+            np.where(valid, f'<c{style_attr}><v>' + text + '</v></c>', '<c/>'),
+            index=series.index
+        )
+    if kind == 'bool':
+        return pd.Series(
+            np.where(series.isna(), '<c/>', np.where(series.fillna(False).astype(bool), '<c t="b"><v>1</v></c>', '<c t="b"><v>0</v></c>')),
+            index=series.index
+        )
+
+    text = (
+        series.astype(str)
+        .str.replace('&', '&amp;', regex=False)
+        .str.replace('<', '&lt;', regex=False)
+        .str.replace('>', '&gt;', regex=False)
+        # Karakter kontrol tidak valid di XML dan akan membuat file rusak
+        .str.replace(r'[\x00-\x08\x0b\x0c\x0e-\x1f]', '', regex=True)
+    )
+    cells = f'<c t="inlineStr"{style_attr}><is><t xml:space="preserve">' + text + '</t></is></c>'
+    return cells.where(series.notna(), '<c/>')
+
+def _write_sheet_xml(stream, df, currency_columns):
+    widths = column_widths(df, currency_columns)
+    stream.write(
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><cols>'
+    )
+    stream.write(''.join(
+        f'<col min="{i}" max="{i}" width="{width}" customWidth="1"/>' for i, width in enumerate(widths, start=1)
+    ))
+    stream.write('</cols><sheetData>')
+
+    header = ''.join(
+        f'<c t="inlineStr" s="{STYLE_HEADER}"><is><t>{escape(str(col))}</t></is></c>' for col in df.columns
+    )
+    stream.write(f'<row r="1">{header}</row>')
+
+    kinds = [_column_kind(df[col]) for col in df.columns]
+    styles = [STYLE_CURRENCY if col in currency_columns else STYLE_DEFAULT for col in df.columns]
+    for start in range(0, len(df), CHUNK_ROWS):
+        chunk = df.iloc[start:start + CHUNK_ROWS]
+        row_numbers = np.arange(start + 2, start + 2 + len(chunk)).astype(str)
+        rows = pd.Series('<row r="' + row_numbers + '">', index=chunk.index)
+        for col_idx, col in enumerate(df.columns):
+            rows = rows + _cells_xml(chunk.iloc[:, col_idx], kinds[col_idx], styles[col_idx])
+        stream.write(''.join(rows + '</row>'))
+
+    stream.write('</sheetData></worksheet>')
+
+def sheet_names(names):
+    """Validate sheet names and make them unique after Excel's length cut
+
+    Excel compares sheet names case-insensitively and refuses a workbook
+    with duplicates, so names that collide after the cut to
+    MAX_SHEET_NAME_LENGTH characters get a " (2)", " (3)", ... suffix.
+
+    Args:
+        names (list): Requested sheet names
+
+    Returns:
+        list: Names to write, in the same order
+
+    Raises:
+        ValueError: If a name is empty, contains one of []:*?/\\ or starts
+            or ends with an apostrophe
+    """
+    result, used = [], set()
+    for name in names:
+        name = str(name)
+        invalid = sorted(INVALID_SHEET_NAME_CHARS & set(name))
+        if not name.strip() or invalid or name.startswith("'") or name.endswith("'"):
+            raise ValueError(f"Invalid sheet name {name!r}" + (f": must not contain {''.join(invalid)}" if invalid else ""))
+
+        unique = name[:MAX_SHEET_NAME_LENGTH]
+        counter = 1
+        while unique.casefold() in used:
+            counter += 1
+            suffix = f" ({counter})"
+            unique = name[:MAX_SHEET_NAME_LENGTH - len(suffix)] + suffix
+        used.add(unique.casefold())
+        result.append(unique)
+    return result
+
+def dataframes_to_excel(sheets):
+    """Export one or more DataFrames to an .xlsx file in memory
+
+    Sheets are streamed as XML straight into the zip archive in chunks of
+    CHUNK_ROWS rows, with currency columns kept numeric and shown through a
+    native number format.
+
+    Args:
+        sheets (list): (sheet_name, DataFrame, currency_columns) tuples
+
+    Returns:
+        bytes: Content of the .xlsx file
+
+    Raises:
+        ValueError: If a sheet name is not allowed by Excel (see sheet_names)
+    """
+    names = sheet_names([name for name, _, _ in sheets])
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for idx, (_, df, currency_columns) in enumerate(sheets, start=1):
+            with archive.open(f"xl/worksheets/sheet{idx}.xml", 'w') as raw, \
+                    io.TextIOWrapper(raw, encoding='utf-8') as stream:
+                _write_sheet_xml(stream, df, set(currency_columns))
+
+        archive.writestr("[Content_Types].xml", CONTENT_TYPES_XML.format(sheets='\n'.join(
+            f'<Override PartName="/xl/worksheets/sheet{idx}.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            for idx in range(1, len(sheets) + 1)
+        )))
+        archive.writestr("_rels/.rels", ROOT_RELS_XML)
+        archive.writestr("xl/workbook.xml", WORKBOOK_XML.format(sheets=''.join(
+            f'<sheet name={quoteattr(name)} sheetId="{idx}" r:id="rId{idx}"/>'
+            for idx, name in enumerate(names, start=1)
+        )))
+        archive.writestr("xl/_rels/workbook.xml.rels", WORKBOOK_RELS_XML.format(sheets='\n'.join(
+            f'<Relationship Id="rId{idx}" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+            f'Target="worksheets/sheet{idx}.xml"/>'
+            for idx in range(1, len(sheets) + 1)
+        )))
+        archive.writestr("xl/styles.xml", STYLES_XML)
+    return buffer.getvalue()
+
+def dataframe_to_excel(df, sheet_name, currency_columns=()):
+    """Export a single DataFrame to an .xlsx file in memory"""
+    return dataframes_to_excel([(sheet_name, df, currency_columns)])
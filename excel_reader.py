@@ -0,0 +1,106 @@
+import os
+import zipfile
+
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+
+# Batas token teks penawaran yang dikirim ke model, bisa diubah lewat environment
+EXCEL_TOKEN_BUDGET = int(os.getenv("EXCEL_TOKEN_BUDGET", "8000"))
+
+# Jumlah baris per potongan teks
+CHUNK_ROWS = 50
+
+# Error dari openpyxl/pandas untuk file yang bukan workbook .xlsx atau rusak
+# (KeyError: arsip zip tanpa bagian workbook yang wajib)
+UNREADABLE_WORKBOOK_ERRORS = (InvalidFileException, zipfile.BadZipFile, KeyError, EOFError)
+
+def estimate_tokens(text):
+    """Rough token estimate (about 4 characters per token)"""
+    return len(text) // 4 + 1
+
+def _format_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).replace("\n", " ").replace("|", "/").strip()
+
+def _format_row(values):
+    cells = [_format_value(v) for v in values]
+    while cells and not cells[-1]:
+        cells.pop()
+    return " | ".join(cells)
+
+def iter_excel_chunks(excel_file, chunk_rows=CHUNK_ROWS):
+    """Stream an Excel workbook as compact row-oriented text chunks
+
+    The workbook is opened in read-only mode and rows are read one by one,
+    so memory does not grow with the size of the file. Every chunk repeats
+    the sheet name and header row so it can be read on its own.
+
+    Args:
+        excel_file: Path or file-like object of an .xlsx file
+        chunk_rows (int): Maximum number of data rows per chunk
+
+    Yields:
+        dict: 'sheet', 'first_row', 'last_row' (1-based sheet rows),
+            'rows' (number of data rows) and 'text'
+    """
+    workbook = load_workbook(excel_file, read_only=True, data_only=True)
+    try:
+        for worksheet in workbook.worksheets:
+            header = None
+            lines, first_row, last_row = [], None, None
+            for row_number, values in enumerate(worksheet.iter_rows(values_only=True), start=1):
+                line = _format_row(values)
+                if not line.replace("|", "").strip():
+                    continue
+                if header is None:
+                    header = line
+                    continue
+                if first_row is None:
+                    first_row = row_number
+                lines.append(line)
+                last_row = row_number
+                if len(lines) == chunk_rows:
+                    yield _make_chunk(worksheet.title, header, lines, first_row, last_row)
+                    lines, first_row = [], None
+            if lines:
+                yield _make_chunk(worksheet.title, header, lines, first_row, last_row)
+    finally:
+        workbook.close()
+
+def _make_chunk(sheet, header, lines, first_row, last_row):
+    text = f"=== SHEET: {sheet} (rows {first_row}-{last_row}) ===\n{header}\n" + "\n".join(lines)
+    return {'sheet': sheet, 'first_row': first_row, 'last_row': last_row, 'rows': len(lines), 'text': text}
+
+def extract_text_from_excel(excel_file, token_budget=EXCEL_TOKEN_BUDGET, chunk_rows=CHUNK_ROWS):
+    """Extract text from an Excel workbook within a token budget
+
+    Chunks are added until the next one would exceed the budget; the rest
+    of the workbook is only counted and summarized.
+
+    Args:
+        excel_file: Path or file-like object of an .xlsx file
+        token_budget (int): Maximum estimated tokens of the returned text
+        chunk_rows (int): Maximum number of data rows per chunk
+
+    Returns:
+        str: Row-oriented text of all sheets, with a truncation summary when
+            the budget was reached
+    """
+    parts = []
+    used = 0
+    truncated = {}
+    for chunk in iter_excel_chunks(excel_file, chunk_rows):
+        tokens = estimate_tokens(chunk['text'])
+        if not truncated and used + tokens <= token_budget:
+            parts.append(chunk['text'])
+            used += tokens
+        else:
+            truncated[chunk['sheet']] = truncated.get(chunk['sheet'], 0) + chunk['rows']
+
+    if truncated:
+        summary = ", ".join(f"{rows} row(s) in sheet {sheet}" for sheet, rows in truncated.items())
+        parts.append(f"=== TRUNCATED ===\nNot shown to stay within {token_budget} tokens: {summary}.")
+    return "\n\n".join(parts)
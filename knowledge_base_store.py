@@ -0,0 +1,175 @@
+import os
+
+import pandas as pd
+
+# Modul ini tidak memakai Streamlit supaya bisa dipakai API HTTP dan batch CLI;
+# error dilempar ke pemanggil, tampilan error ada di knowledge_base_manager
+KNOWLEDGE_BASE_PATH = "knowledge_base.xlsx"
+KNOWLEDGE_BASE_COLUMNS = ['product_name', 'nett_price', 'platform', 'link']
+
+def load_knowledge_base():
+    """Load knowledge base from Excel file"""
+    try:
+        df = pd.read_excel(KNOWLEDGE_BASE_PATH)
+        products = []
+        for _, row in df.iterrows():
+            products.append({
+                'product_name': row['product_name'],
+                'nett_price': float(row['nett_price']),
+                'platform': row['platform'],
+                'url': row['link']
+            })
+        # Versi dipakai sebagai kunci cache untuk data turunan knowledge base
+        version = os.stat(KNOWLEDGE_BASE_PATH).st_mtime_ns
+        return {'products': products, 'version': version}
+    except FileNotFoundError:
+        return {'products': [], 'version': 0}
+
+def _read_knowledge_base_sheet():
+    """Knowledge base as a DataFrame, empty when the file does not exist yet"""
+    try:
+        return pd.read_excel(KNOWLEDGE_BASE_PATH)
+    except FileNotFoundError:
+        return pd.DataFrame(columns=KNOWLEDGE_BASE_COLUMNS)
+
+def save_to_knowledge_base(product_data):
+    """Save new product data to knowledge base
+
+    Args:
+        product_data (dict): 'name', 'price', 'platform' and 'url'
+
+    Raises:
+        OSError: If the workbook cannot be written
+    """
+    df = _read_knowledge_base_sheet()
+    new_row = pd.DataFrame([{
+        'product_name': product_data['name'],
+        'nett_price': product_data['price'],
+        'platform': product_data['platform'],
+        'link': product_data['url']
+    }])
+    df = pd.concat([df, new_row], ignore_index=True)
+    df.to_excel(KNOWLEDGE_BASE_PATH, index=False)
+
+def product_key(product_name, platform):
+    """Normalized key used to detect duplicate products"""
+    return (' '.join(str(product_name).lower().split()), str(platform).lower())
+
+def diff_against_knowledge_base(knowledge_base, records):
+    """Compare extracted product records with the knowledge base
+
+    Later records win over earlier ones with the same product and platform,
+    so the freshest price from a chat session is kept.
+
+    Args:
+        knowledge_base (dict): Knowledge base with a 'products' list
+        records (list): Dicts with 'name', 'price', 'platform' and 'url'
+
+    Returns:
+        list: Records with a 'status' of "New", "Update" (price or link
+            changed) or "Duplicate", and 'old_price' for updates
+    """
+    existing = {}
+    for product in knowledge_base['products']:
+        existing.setdefault(product_key(product['product_name'], product['platform']), product)
+
+    latest = {}
+    for record in records:
+        latest[product_key(record['name'], record['platform'])] = record
+
+    changes = []
+    for key, record in latest.items():
+        product = existing.get(key)
+        if product is None:
+            status, old_price = "New", None
+        elif float(product['nett_price']) != float(record['price']) or product['url'] != record['url']:
+            status, old_price = "Update", float(product['nett_price'])
+        else:
+            status, old_price = "Duplicate", float(product['nett_price'])
+        changes.append({**record, 'status': status, 'old_price': old_price})
+    return changes
+
+def save_products_to_knowledge_base(changes):
+    """Apply many product changes to the knowledge base in a single write
+
+    Args:
+        changes (list): Records from diff_against_knowledge_base; "New"
+            rows are appended, "Update" rows overwrite price and link of
+            the existing product, "Duplicate" rows are skipped
+
+    Returns:
+        int: Number of products written
+
+    Raises:
+        OSError: If the workbook cannot be written
+    """
+    df = _read_knowledge_base_sheet()
+
+    row_by_key = {}
+    for idx, name, platform in zip(df.index, df['product_name'], df['platform']):
+        row_by_key.setdefault(product_key(name, platform), idx)
+
+    new_rows = []
+    written = 0
+    for change in changes:
+        if change['status'] == "Duplicate":
+            continue
+        idx = row_by_key.get(product_key(change['name'], change['platform']))
+        if idx is not None:
+            df.loc[idx, ['nett_price', 'link']] = [change['price'], change['url']]
+        else:
+            new_rows.append({
+                'product_name': change['name'],
+                'nett_price': change['price'],
+                'platform': change['platform'],
+                'link': change['url']
+            })
+        written += 1
+
+    if new_rows:
+        df = pd.concat([df, pd.DataFrame(new_rows)], ignore_index=True)
+    if written:
+        df.to_excel(KNOWLEDGE_BASE_PATH, index=False)
+    return written
+
+def format_knowledge_base(knowledge_base):
+    """Format knowledge base data for display"""
+    text = "=== KNOWLEDGE BASE PRODUCTS ===\n\n"
+    for product in knowledge_base['products']:
+        text += f"Product: {product['product_name']}\n"
+        text += f"Price: Rp {product['nett_price']:,.2f}\n"
+        text += f"Platform: {product['platform']}\n"
+        text += f"URL: {product['url']}\n"
+        text += "---\n\n"
+    return text
+
+def read_knowledge_base_file():
+    """Content of the knowledge base workbook, for download
+
+    Raises:
+        FileNotFoundError: If there is no knowledge base yet
+    """
+    # File knowledge base sudah berupa .xlsx, jadi dikirim apa adanya tanpa dibaca ulang
+    with open(KNOWLEDGE_BASE_PATH, "rb") as f:
+        return f.read()
+
+def get_product_by_name(knowledge_base, product_name):
+    """Search for a product in knowledge base by name"""
+    for product in knowledge_base['products']:
+        if product['product_name'].lower() == product_name.lower():
+            return product
+    return None
+
+def get_all_platforms(knowledge_base):
+    """Get list of all platforms in knowledge base"""
+    platforms = set()
+    for product in knowledge_base['products']:
+        platforms.add(product['platform'])
+    return list(platforms)
+
+def get_price_range(knowledge_base):
+    """Get min and max prices from knowledge base"""
+    if not knowledge_base['products']:
+        return 0, 0
+    prices = [p['nett_price'] for p in knowledge_base['products']]
+    return min(prices), max(prices)
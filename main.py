@@ -1,131 +1,58 @@
-from logging import PlaceHolder
-from openai import OpenAI
 import streamlit as st
 import os
-import io
 import pandas as pd
-import google.generativeai as genai
 from dotenv import load_dotenv
-from bs4 import BeautifulSoup
-from crawlbase import CrawlingAPI
-import base64
+import hashlib
+import io
 import re
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from price_researcher import extract_product_name, extract_price
-
-# Define roles and their configurations
-ROLE = {
-    "Price Researcher": {
-        "icon": "💰",
-        "description": "Sebagai peneliti harga, saya akan mencari dan membandingkan harga produk dari berbagai sumber untuk memberikan rekomendasi harga terbaik."
-    },
-    "Offering Reviewer": {
-        "icon": "📋",
-        "description": "Sebagai peninjau penawaran, saya akan membantu Anda meninjau dan mengevaluasi penawaran bisnis."
-    }
-}
+from concurrent.futures import Future, ThreadPoolExecutor
+from price_researcher import extract_product_name, extract_product_records
+from excel_export import dataframe_to_excel, dataframes_to_excel
+from excel_reader import UNREADABLE_WORKBOOK_ERRORS, extract_text_from_excel
+from knowledge_base_manager import save_products_to_knowledge_base, download_knowledge_base
+from knowledge_base_store import diff_against_knowledge_base
+from offering_evaluator import apply_margin, margin_sensitivity
+from rupiah import parse_rupiah_series
+from offering_review import (
+    REVIEW_GENERATION_CONFIG, REVIEW_OUTPUT_INSTRUCTIONS, iter_json_products,
+    parse_offering_review, parse_review_text, format_review_product, format_offering_review
+)
+from tracing import trace, span, submit_with_context
+import rerun_profiler
+from pricing_core import (
+    DEFAULT_MODEL, MARKET_PLATFORMS, ROLE, get_knowledge_base, build_kb_context, evaluate_offering_lines,
+    resolve_offering_workbook, build_prompt_prefix, get_prefix_model
+)
+import project_store
+from session_history import (
+    HISTORY_PAGE_SIZE, new_history, append_message, message_count, recent_messages, last_message, latest_messages,
+    count_older_messages
+)
+from turn_metrics import start_turn, mark_first_token, add_usage, timed_call, finish_turn, snapshot_recent_metrics, summarize_metrics
 
 # Initialize session state variables
 if "gemini_model" not in st.session_state:
-    st.session_state["gemini_model"] = "gemini-2.5-flash"
+    st.session_state["gemini_model"] = DEFAULT_MODEL
 
 if "current_role" not in st.session_state:
     # Set default role
     default_role = "Price Researcher"
     st.session_state.current_role = default_role
-    
-    # Initialize messages with welcome message for default role
-    st.session_state.messages = []
-    welcome_message = f"**{st.session_state.current_role} {ROLE[st.session_state.current_role]['icon']}**: {ROLE[st.session_state.current_role]['description']}"
-    st.session_state.messages = [{"role": "assistant", "content": welcome_message}]
-elif "messages" not in st.session_state:
-    st.session_state.messages = []
-    # Add welcome message for current role if messages list is empty
-    welcome_message = f"**{st.session_state.current_role} {ROLE[st.session_state.current_role]['icon']}**: {ROLE[st.session_state.current_role]['description']}"
-    st.session_state.messages = [{"role": "assistant", "content": welcome_message}]
 
 if "current_project" not in st.session_state:
     st.session_state.current_project = "My Project"  # Default project name
 
+if "project_owner" not in st.session_state:
+    # Project disimpan per pemilik; id pemilik disimpan di URL agar riwayat tetap terbuka setelah reload
+    owner = st.query_params.get("owner", "")
+    if not re.fullmatch(r"[0-9a-f]{32}", owner):
+        owner = project_store.new_owner()
+        st.query_params["owner"] = owner
+    st.session_state.project_owner = owner
+
 #if "knowledge_base" not in st.session_state:
 #    st.session_state.knowledge_base = {"products": []}
 
-# Knowledge Base Management Functions
-def load_knowledge_base():
-    """Load knowledge base from Excel file"""
-    try:
-        df = pd.read_excel("knowledge_base.xlsx")
-        products = []
-        for _, row in df.iterrows():
-            products.append({
-                'product_name': row['product_name'],
-                'nett_price': float(row['nett_price']),
-                'platform': row['platform'],
-                'url': row['link']
-            })
-        return {'products': products}
-    except FileNotFoundError:
-        return {'products': []}
-
-def save_to_knowledge_base(product_data):
-    """Save new product data to knowledge base"""
-    try:
-        # Load existing data
-        try:
-            df = pd.read_excel("knowledge_base.xlsx")
-        except FileNotFoundError:
-            df = pd.DataFrame(columns=['product_name', 'nett_price', 'platform', 'link'])
-        
-        # Add new data
-        new_row = pd.DataFrame([{
-            'product_name': product_data['name'],
-            'nett_price': product_data['price'],
-            'platform': product_data['platform'],
-            'link': product_data['url']
-        }])
-        
-        df = pd.concat([df, new_row], ignore_index=True)
-        
-        # Save back to Excel
-        df.to_excel("knowledge_base.xlsx", index=False)
-        return True
-    except Exception as e:
-        st.error(f"Error saving to knowledge base: {str(e)}")
-        return False
-
-def format_knowledge_base(knowledge_base):
-    """Format knowledge base data for display"""
-    text = "=== KNOWLEDGE BASE PRODUCTS ===\n\n"
-    for product in knowledge_base['products']:
-        text += f"Product: {product['product_name']}\n"
-        text += f"Price: Rp {product['nett_price']:,.2f}\n"
-        text += f"Platform: {product['platform']}\n"
-        text += f"URL: {product['url']}\n"
-        text += "---\n\n"
-    return text
-
-def download_knowledge_base():
-    """Generate downloadable Excel file from knowledge base"""
-    try:
-        df = pd.read_excel("knowledge_base.xlsx")
-        buffer = io.BytesIO()
-        with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False)
-        return buffer.getvalue()
-    except Exception as e:
-        st.error(f"Error preparing download: {str(e)}")
-        return None
-
-def get_product_by_name(knowledge_base, product_name):
-    """Search for a product in knowledge base by name"""
-    for product in knowledge_base['products']:
-        if product['product_name'].lower() == product_name.lower():
-            return product
-    return None
-
 # Helper function untuk filter produk dari knowledge base
 def filter_knowledge_base_products(platform=None, product_name=None):
     """
@@ -138,10 +65,9 @@ def filter_knowledge_base_products(platform=None, product_name=None):
     Returns:
         list: List of matching products
     """
-    if not st.session_state.get('knowledge_base') or not st.session_state.knowledge_base.get('products'):
+    products = get_knowledge_base()['products']
+    if not products:
         return []
-        
-    products = st.session_state.knowledge_base['products']
     
     if platform:
         products = [p for p in products if p['platform'] == platform]
@@ -151,37 +77,36 @@ def filter_knowledge_base_products(platform=None, product_name=None):
     
     return products
 
-def extract_evaluation_from_response(response_text):
-    """Extract evaluation details from assistant's response"""
-    try:
-        products = []
-        lines = response_text.split('\n')
-        current_product = {}
-        
-        for line in lines:
-            line = line.strip()
-            if "Product:" in line or "Produk:" in line:
-                if current_product:
-                    products.append(current_product)
-                current_product = {}
-                current_product['product_name'] = line.split(":", 1)[1].strip()
-            elif "Quantity:" in line or "Jumlah:" in line:
-                current_product['quantity'] = int(line.split(":", 1)[1].strip())
-            elif "Unit Price:" in line or "Harga Satuan:" in line:
-                price_str = line.split(":", 1)[1].strip()
-                price_str = price_str.replace("Rp", "").replace(".", "").replace(",", "").strip()
-                current_product['unit_price'] = float(price_str)
-            elif "Reference URL:" in line or "URL:" in line:
-                current_product['reference_url'] = line.split(":", 1)[1].strip()
-        
-        if current_product:
-            products.append(current_product)
-        
-        return products
-    except Exception as e:
-        st.error(f"Error extracting evaluation data: {str(e)}")
-        return None
-    
+def open_project(project_name):
+    """Load the stored chat history of a project into the session
+
+    Only the latest messages are read; older pages are loaded when shown.
+    A project without history starts with the welcome message of the
+    current role, which is only stored with the project's first message.
+    """
+    st.session_state.history = new_history(st.session_state.project_owner, project_name)
+    st.session_state.current_project = project_name
+    st.session_state.history_pages = 1
+    if not message_count(st.session_state.history):
+        role = st.session_state.current_role
+        append_message(st.session_state.history, "assistant", f"**{role} {ROLE[role]['icon']}**: {ROLE[role]['description']}", pending=True)
+
+# Tabel knowledge base untuk sidebar, dibentuk sekali per versi knowledge base
+@st.cache_data(max_entries=4, show_spinner=False)
+def knowledge_base_table(kb_version, _products):
+    # Convert dictionary format to DataFrame with explicit columns
+    kb_df = pd.DataFrame(_products, columns=['product_name', 'nett_price', 'platform', 'url'])
+    # Ensure column names match exactly with Excel file
+    kb_df = kb_df.rename(columns={
+        'product_name': 'Product Name',
+        'nett_price': 'Price',
+        'platform': 'Platform',
+        'url': 'URL'
+    })
+    # Format price column
+    kb_df['Price'] = [f"Rp {int(float(x)):,}" for x in kb_df['Price']]
+    return kb_df
+
 def create_offering_template():
     """Create Excel file with offering template"""
     try:
@@ -191,73 +116,173 @@ def create_offering_template():
             'Unit Price',
             'Total Price'
         ])
-        buffer = io.BytesIO()
-        with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='Offering Template')
-        return buffer.getvalue()
+        return dataframe_to_excel(df, 'Offering Template')
     except Exception as e:
         st.error(f"Error creating offering template: {str(e)}")
         return None
 
+def evaluate_against_knowledge_base(products, margin):
+    """Evaluate offering lines against the shared knowledge base"""
+    return evaluate_offering_lines(products, margin, get_knowledge_base())
+
+# Hasil pencocokan file penawaran tidak bergantung pada margin, jadi di-cache per isi file dan versi knowledge base
+@st.cache_data(max_entries=16, show_spinner=False)
+def resolve_uploaded_offering(file_hash, kb_version, _file_bytes, _products):
+    """Read an uploaded offering workbook and resolve it against the knowledge base
+
+    Args:
+        file_hash (str): SHA-256 of the uploaded file, part of the cache key
+        kb_version (int): Version of the loaded knowledge base, part of the cache key
+        _file_bytes (bytes): Content of the uploaded file
+        _products (list): Knowledge base products
+
+    Returns:
+        pd.DataFrame: Result of resolve_offerings, to be passed to apply_margin
+
+    Raises:
+        ValueError: If the file does not follow the offering template
+    """
+    return resolve_offering_workbook(_file_bytes, {'products': _products, 'version': kb_version})
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def read_uploaded_offering_text(file_hash, _file_bytes):
+    """Extract text from an uploaded offering workbook, cached by file hash"""
+    return extract_text_from_excel(io.BytesIO(_file_bytes))
+
+def format_offering_evaluation(evaluated):
+    """Format evaluated offering lines as compact context for the reviewer"""
+    columns = {
+        'product_name': 'product',
+        'quantity': 'qty',
+        'unit_price': 'unit_price',
+        'total_price': 'total_price',
+        'nett_price': 'kb_unit_price',
+        'max_price': 'max_price',
+        'status': 'status',
+        'reference_url': 'reference_url',
+    }
+    df = evaluated[list(columns)].rename(columns=columns)
+    df['status'] = df['status'].fillna("Tidak ada di knowledge base")
+    return df.to_csv(index=False, float_format="%.2f")
+
+# Kolom evaluasi yang ditampilkan di tabel, dengan nama kolom Bahasa Indonesia
+EVALUATION_DISPLAY_COLUMNS = {
+    'product_name': 'Nama Produk',
+    'quantity': 'Jumlah',
+    'unit_price': 'Harga Satuan',
+    'total_price': 'Total Harga Penawaran',
+    'max_price': 'Harga Maksimum',
+    'status': 'Status',
+    'reference_url': 'URL Referensi'
+}
+
+def show_evaluation_table(container, evaluated):
+    """Render evaluated offering lines as a table in a container"""
+    container.dataframe(
+        evaluated[list(EVALUATION_DISPLAY_COLUMNS)].rename(columns=EVALUATION_DISPLAY_COLUMNS),
+        column_config={"URL Referensi": st.column_config.LinkColumn()},
+        hide_index=True,
+    )
+
 def create_evaluation_excel(products, margin):
     """Create Excel file with evaluation results"""
     try:
-        df_data = []
-        
-        for product in products:
-            # Get maximum price from knowledge base
-            kb_product = None
-            if "knowledge_base" in st.session_state:
-                for kb_item in st.session_state.knowledge_base['products']:
-                    if product['product_name'].lower() in kb_item['product_name'].lower():
-                        kb_product = kb_item
-                        break
-            
-            if kb_product:
-                # Calculate maximum allowed price
-                max_price = float(kb_product['nett_price']) * product['quantity'] * (1 + margin)
-                reference_url = kb_product['url']
-                
-                # Determine status
-                status = "Wajar" if product['total_price'] <= max_price else "Tidak Wajar"
-                
-                df_data.append({
-                    'Nama Produk': product['product_name'],
-                    'Jumlah': product['quantity'],
-                    'Harga Satuan': product['unit_price'],
-                    'Total Harga Penawaran': product['total_price'],
-                    'Harga Maksimum': max_price,
-                    'Status': status,
-                    'URL Referensi': reference_url
-                })
-        
+        # Cocokkan semua baris penawaran dengan knowledge base sekaligus
+        evaluated = evaluate_against_knowledge_base(products, margin)
+    except Exception as e:
+        st.error(f"Error creating Excel file: {str(e)}")
+        return None
+    return build_evaluation_workbook(evaluated)
+
+# Kolom harga pada file evaluasi, ditulis sebagai angka dengan format Rupiah
+EVALUATION_CURRENCY_COLUMNS = ['Harga Satuan', 'Total Harga Penawaran', 'Harga Maksimum']
+
+def build_evaluation_workbook(evaluated):
+    """Create Excel file from evaluated offering lines"""
+    try:
+        evaluated = evaluated[evaluated['matched']]
+
         # Create DataFrame
-        df = pd.DataFrame(df_data)
+        df = pd.DataFrame({
+            'Nama Produk': evaluated['product_name'],
+            'Jumlah': evaluated['quantity'],
+            'Harga Satuan': evaluated['unit_price'],
+            'Total Harga Penawaran': evaluated['total_price'],
+            'Harga Maksimum': evaluated['max_price'],
+            'Status': evaluated['status'],
+            'URL Referensi': evaluated['reference_url']
+        })
         
-        # Format currency columns
-        currency_columns = ['Harga Satuan', 'Total Harga Penawaran', 'Harga Maksimum']
-        for col in currency_columns:
-            df[col] = df[col].apply(lambda x: f"Rp {x:,.2f}")
-        
-        # Create Excel file in memory
-        buffer = io.BytesIO()
-        with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='Hasil Evaluasi')
-            
-            # Auto-adjust columns width
-            worksheet = writer.sheets['Hasil Evaluasi']
-            for idx, col in enumerate(df.columns):
-                max_length = max(
-                    df[col].astype(str).apply(len).max(),
-                    len(col)
-                )
-                worksheet.column_dimensions[chr(65 + idx)].width = max_length + 2
-        
-        return buffer.getvalue()
+        # Sheet kedua: status di setiap margin dan margin impas per baris
+        sensitivity = margin_sensitivity(evaluated)
+        sensitivity['break_even_margin'] = (sensitivity['break_even_margin'] * 100).round(2)
+        sensitivity = sensitivity.rename(columns={'product_name': 'Nama Produk', 'break_even_margin': 'Margin Impas (%)'})
+
+        return dataframes_to_excel([
+            ('Hasil Evaluasi', df, EVALUATION_CURRENCY_COLUMNS),
+            ('Sensitivitas Margin', sensitivity, ()),
+        ])
     except Exception as e:
         st.error(f"Error creating Excel file: {str(e)}")
         return None
 
+# Jumlah baris penawaran maksimum pada heatmap sensitivitas agar grafik tetap terbaca
+SENSITIVITY_CHART_ROWS = 100
+
+def show_margin_sensitivity(evaluated, margin):
+    """Render the margin sensitivity heatmap for matched offering lines"""
+    import altair as alt
+
+    sensitivity = margin_sensitivity(evaluated[evaluated['matched']])
+    if sensitivity.empty:
+        st.info("No offering lines matched the knowledge base.")
+        return
+
+    # Baris dengan margin impas tertinggi paling berisiko, tampilkan lebih dulu; hanya grafik yang dibatasi
+    chart_rows = sensitivity.sort_values('break_even_margin', ascending=False).head(SENSITIVITY_CHART_ROWS)
+    chart_rows['line'] = [f"{i + 1}. {name}" for i, name in enumerate(chart_rows['product_name'])]
+    long = chart_rows.melt(
+        id_vars=['line', 'break_even_margin'],
+        value_vars=[col for col in chart_rows.columns if col.endswith('%')],
+        var_name='Margin', value_name='Status'
+    )
+    chart = alt.Chart(long).mark_rect().encode(
+        x=alt.X('Margin:O', sort=None),
+        y=alt.Y('line:N', sort=None, title=None),
+        color=alt.Color('Status:N', scale=alt.Scale(domain=["Wajar", "Tidak Wajar"], range=["#2e7d32", "#c62828"])),
+        tooltip=['line', 'Margin', 'Status', alt.Tooltip('break_even_margin:Q', format='.1%', title='Break-even margin')],
+    )
+    st.altair_chart(chart)
+
+    at_margin = int((sensitivity['break_even_margin'] > margin).sum())
+    shown = f" The chart shows the {len(chart_rows)} riskiest." if len(chart_rows) < len(sensitivity) else ""
+    st.caption(
+        f"{at_margin} of {len(sensitivity)} line(s) are Tidak Wajar at the current {margin:.0%} margin.{shown} "
+        "Break-even margin = total price / (KB price × quantity) - 1."
+    )
+
+def show_rerun_profile(record):
+    """Render the rerun profiler panel in the sidebar"""
+    st.subheader("⏱️ Rerun Profiler")
+    st.toggle("Profile reruns", value=rerun_profiler.PROFILE_BY_DEFAULT, key="profile_reruns")
+    st.checkbox(
+        "Capture cProfile of slowest reruns",
+        key="profile_capture",
+        help=f"Keeps the {rerun_profiler.MAX_PROFILE_DUMPS} slowest reruns as .prof files in '{rerun_profiler.PROFILE_DIR}'."
+    )
+    if record is None:
+        return
+
+    st.metric("This rerun", f"{record['total_ms']:.0f} ms")
+    st.dataframe(pd.Series(record['sections'], name="ms").sort_values(ascending=False))
+    reruns = list(rerun_profiler.get_rerun_history())
+    with st.expander(f"Sections over last {len(reruns)} reruns"):
+        st.dataframe(pd.DataFrame(rerun_profiler.summarize_reruns(reruns)).T)
+        st.caption("Rerun time histogram (ms)")
+        st.bar_chart(pd.Series(rerun_profiler.rerun_histogram(reruns), name="reruns"))
+    if record.get('profile'):
+        st.caption(f"Profile saved to {record['profile']}")
+
 # Fungsi untuk mengunduh file Excel penawaran bisnis
 def download_business_offering(data):
     """Generate downloadable Excel file from business offering data"""
@@ -273,342 +298,212 @@ def download_business_offering(data):
             'URL Referensi'
         ])
         
-        # Format currency columns
-        currency_columns = ['Harga Satuan', 'Total Harga Penawaran', 'Harga Maksimum']
-        for col in currency_columns:
-            df[col] = df[col].apply(lambda x: f"Rp {float(x):,.2f}")
-        
-        # Create Excel file in memory
-        buffer = io.BytesIO()
-        with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='Hasil Evaluasi')
-            
-            # Auto-adjust columns width
-            worksheet = writer.sheets['Hasil Evaluasi']
-            for idx, col in enumerate(df.columns):
-                max_length = max(
-                    df[col].astype(str).apply(len).max(),
-                    len(col)
-                )
-                worksheet.column_dimensions[chr(65 + idx)].width = max_length + 2
-        
-        return buffer.getvalue()
+        for col in EVALUATION_CURRENCY_COLUMNS:
+            df[col] = parse_rupiah_series(df[col])
+
+        return dataframe_to_excel(df, 'Hasil Evaluasi', EVALUATION_CURRENCY_COLUMNS)
     except Exception as e:
         st.error(f"Error preparing business offering download: {str(e)}")
         return None
     
-# Fungsi extract text dari file Excel
-def extract_text_from_excel(excel_file):
-    import pandas as pd
-    text = ""
-    df = pd.read_excel(excel_file)
-    for column in df.columns:
-        text += f"{column}:\n"
-        text += "\n".join(df[column].astype(str).tolist()) + "\n\n"
-    return text
-    
-# Fungsi cari url produk di Tokopedia dengan nama produk dan review lebih dari 1, pilih yang memiliki harga tertinggi dengan output berupa url dari produk tersebut
-def scrape_tokopedia_search(query):
-    url = f"https://www.tokopedia.com/search?q={query.replace(' ', '+')}"
+def extract_evaluation_from_response(response_text):
+    """Extract evaluation details from assistant's response
 
-    options = webdriver.ChromeOptions()
-    options.add_argument("--headless=new")  # jalan tanpa buka browser
-    options.add_argument("--disable-blink-features=AutomationControlled")
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+    JSON reviews are parsed directly; plain-text reviews fall back to the
+    line-based parser.
+    """
+    try:
+        review = parse_offering_review(response_text)
+        if review and review['products']:
+            return review['products']
+        return parse_review_text(response_text)
+    except Exception as e:
+        st.error(f"Error extracting evaluation data: {str(e)}")
+        return None
 
-    driver.get(url)
 
-    products = []
-    items = driver.find_elements(By.CSS_SELECTOR, "div[data-testid='divSRPContentProducts'] article")
+def evaluate_vendor_offerings(response_text, margin):
+    """Evaluate vendor offerings and create Excel file"""
+    try:
+        # Extract product information from response
+        products = extract_evaluation_from_response(response_text)
+        if not products:
+            return None
+            
+        # Create Excel file
+        return create_evaluation_excel(products, margin)
+    except Exception as e:
+        st.error(f"Error in evaluation process: {str(e)}")
+        return None
 
-    for item in items:
-        try:
-            name = item.find_element(By.CSS_SELECTOR, "div.prd_link-product-name").text
-            price_text = item.find_element(By.CSS_SELECTOR, "div.prd_link-product-price").text
-            sold_text = item.find_element(By.CSS_SELECTOR, "span.prd_label-integrity").text
-            link = item.find_element(By.CSS_SELECTOR, "a").get_attribute("href")
-
-            # convert harga ke int
-            price = int(re.sub(r"[^\d]", "", price_text))
-
-            # cari angka sold
-            sold_match = re.search(r"(\d+)", sold_text.replace(".", ""))
-            sold = int(sold_match.group(1)) if sold_match else 0
-
-            products.append({
-                "name": name,
-                "price": price,
-                "sold": sold,
-                "link": link
-            })
-        except Exception as e:
-            st.warning(f"Unable to fetch Tokopedia data: {str(e)}")
+# Executor untuk scraping e-commerce di background, dibagi antar rerun dan sesi
+@st.cache_resource
+def get_scrape_executor():
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="market-scrape")
 
-    driver.quit()
+# Fungsi scraping satu platform e-commerce, dijalankan di thread background
+def fetch_market_context(platform, product_name, project=None):
+    """
+    Scrape live marketplace data for a product on a single platform.
 
-    # filter produk yang sold > 0
-    filtered = [p for p in products if p["sold"] > 0]
+    Runs on a worker thread, so it must not call any Streamlit API.
 
-    if not filtered:
-        return None
+    Args:
+        platform (str): "Tokopedia" or "Shopee".
+        product_name (str): The name of the product to search for.
+        project (tuple, optional): (owner, project name) whose research cache receives the result.
 
-    # ambil produk dengan harga tertinggi
-    highest = max(filtered, key=lambda x: x["price"])
-    
-    # return URL saja karena itu yang dibutuhkan untuk scraping detail produk
-    return highest["link"]
-
-# Fungsi cari url produk di Shopee dengan nama produk dan review lebih dari 1, pilih yang memiliki harga tertinggi
-def find_shopee_product_url(product_name, min_reviews=1):
-    search_url = f"https://shopee.co.id/search?keyword={product_name}"
-    options = {
-        'ajax_wait': 'true',
-        'page_wait': '5000'
-    }
-    response = crawling_api.get(search_url, options)
+    Returns:
+        str: Context block for the prompt, or None if nothing was found.
+    """
+    # Modul scraping (Selenium, Crawlbase, BeautifulSoup) baru dimuat saat scraping pertama
+    import scrapers
 
-    if response.get('headers', {}).get('pc_status') == '200':
-        html_content = response.get('body', b'').decode('utf-8')
-        soup = BeautifulSoup(html_content, 'html.parser')
+    with span(f"scrape.{platform}", product_name=product_name) as attrs:
+        context = scrapers.fetch_platform_context(platform, product_name)
+        attrs['found'] = context is not None
+    if context and project is not None:
+        project_store.put_research(*project, f"scrape.{platform}", product_name.lower(), context)
+    return context
 
-        # Find product links with more than min_reviews reviews
-        products = soup.select('div[data-sqe="item"]')
-        highest_price_product = None
-        highest_price = 0
+def start_market_research(product_name, platforms, project=None):
+    """
+    Submit marketplace scrapes to the background executor.
 
-        for product in products:
-            reviews_count_text = product.select_one('div[data-sqe="rating"]').text.strip()
-            reviews_count = int(reviews_count_text.split()[0].replace('.', '').replace(',', '')) if reviews_count_text else 0
-            
-            if reviews_count >= min_reviews:
-                price_text = product.select_one('span[data-sqe="price"]').text.strip()
-                price_value = int(price_text.replace('Rp', '').replace('.', '').strip())
-                if price_value > highest_price:
-                    highest_price = price_value
-                    highest_price_product = product.select_one('a')['href']
-        
-        return highest_price_product
-    
-    print("No product found with the specified criteria.")
-    return None
-
-# Fungsi crawlbase untuk mendapatkan informasi harga pada halaman produk Tokopedia
-def scrape_tokopedia_product_page(url):
-    options = {
-        'ajax_wait': 'true',
-        'page_wait': '5000'
-    }
-    response = crawling_api.get(url, options)
-
-    if response.get('headers', {}).get('pc_status') == '200':
-        html_content = response.get('body', b'').decode('utf-8')
-        soup = BeautifulSoup(html_content, 'html.parser')
-
-        # Extract product details
-        product_name = soup.select_one('h1[data-testid="lblPDPDetailProductName"]').text.strip()
-        price_text = soup.select_one('div[data-testid="lblPDPDetailProductPrice"]').text.strip()
-        price_value = int(price_text.replace('Rp', '').replace('.', '').strip())
-        elem = soup.select_one('p.css-19y0pwk-unf-heading.e1qvo2ff8')
-        if elem:
-            text = elem.text.strip()
-        # contoh: "15 rating • 6 ulasan"
-            match = re.findall(r'\d+', text)
-            rating_count = int(match[0])
-
-        return {
-            "name": product_name,
-            "price": price_value,
-            "rating_count": rating_count,
-            "url": url
-        }
-    
-    print("Failed to scrape the product page.")
-    return None
-
-# Fungsi crawlbase untuk mendapatkan informasi harga pada halaman produk Shopee
-def scrape_shopee_product_page(url):
-    options = {
-        'ajax_wait': 'true',
-        'page_wait': '5000'
-    }
-    response = crawling_api.get(url, options)
-
-    if response.get('headers', {}).get('pc_status') == '200':
-        html_content = response.get('body', b'').decode('utf-8')
-        soup = BeautifulSoup(html_content, 'html.parser')
-
-        # Extract product details
-        product_name = soup.select_one('div[data-sqe="name"]').text.strip()
-        price_text = soup.select_one('div[data-sqe="price"]').text.strip()
-        price_value = int(price_text.replace('Rp', '').replace('.', '').strip())
-        reviews_count_text = soup.select_one('div[data-sqe="rating"]').text.strip()
-        reviews_count = int(reviews_count_text.split()[0].replace('.', '').replace(',', '')) if reviews_count_text else 0
-
-        return {
-            "name": product_name,
-            "price": price_value,
-            "reviews_count": reviews_count,
-            "url": url
-        }
-    
-    print("Failed to scrape the product page.")
-    return None
+    Results already cached for the project are returned as completed
+    futures without scraping again.
 
-#Fungsi mendapatkan harga produk tertinggi dari beberapa e-commerce
-def get_max_product_price(product_name, margin=0.2):
-    """
-    Get the maximum vendor price for a product across multiple e-commerce platforms.
-    
     Args:
         product_name (str): The name of the product to search for.
-        margin (float): The acceptable price margin for products.
-    
+        platforms (list): Selected platforms; only e-commerce ones are scraped.
+        project (tuple, optional): (owner, project name) whose research cache is used.
+
     Returns:
-        dict: A dictionary containing the platform and the maximum price found.
+        dict: Mapping of platform name to its Future.
     """
-    # Cari produk di Tokopedia
-    tokopedia_url = scrape_tokopedia_search(product_name)
-    if tokopedia_url:
-        tokopedia_data = scrape_tokopedia_product_page(tokopedia_url)
-        if tokopedia_data:
-            tokopedia_data['platform'] = 'Tokopedia'
-            tokopedia_data['price'] *= (1 + margin)  # Apply margin
+    if not product_name:
+        return {}
+    executor = get_scrape_executor()
+    futures = {}
+    for platform in platforms:
+        if platform not in MARKET_PLATFORMS:
+            continue
+        cached = None
+        if project is not None:
+            cached = project_store.get_research(*project, f"scrape.{platform}", product_name.lower())
+        if cached is not None:
+            futures[platform] = Future()
+            futures[platform].set_result((cached, 0.0))
         else:
-            tokopedia_data = None
-    else:
-        tokopedia_data = None
-
-    # Cari produk di Shopee
-    shopee_url = find_shopee_product_url(product_name)
-    if shopee_url:
-        shopee_data = scrape_shopee_product_page(shopee_url)
-        if shopee_data:
-            shopee_data['platform'] = 'Shopee'
-            shopee_data['price'] *= (1 + margin)  # Apply margin
-        else:
-            shopee_data = None
-    else:
-        shopee_data = None
-
-
-    # Search for product in knowledge base
-    summary_solution_data = None
-    kb = load_knowledge_base()
-    for product in kb['products']:
-        if product_name.lower() in product['product_name'].lower():
-            summary_solution_data = {
-                "name": product['product_name'],
-                "price": float(product['nett_price']),
-                "platform": product['platform'],
-                "url": product['url']
-            }
-            summary_solution_data['price'] *= (1 + margin)  # Apply margin
-            break
-    
+            futures[platform] = submit_with_context(
+                executor, timed_call, fetch_market_context, platform, product_name, project
+            )
+    return futures
 
-    # Bandingkan harga dan pilih yang tertinggi
-    max_price_data = None
-    if tokopedia_data and shopee_data and summary_solution_data:
-        max_price_data = tokopedia_data if tokopedia_data['price'] > shopee_data['price'] and tokopedia_data['price'] > summary_solution_data['price'] else shopee_data if shopee_data['price'] > summary_solution_data['price'] else summary_solution_data
-    elif tokopedia_data:
-        max_price_data = tokopedia_data
-    elif shopee_data:
-        max_price_data = shopee_data
-    elif summary_solution_data:
-        max_price_data = summary_solution_data
-
-    return max_price_data
-
-# Fungsi untuk format hasil analisis harga vendor
-def format_vendor_price_analysis(analysis):
+def collect_market_context(futures, metrics=None):
     """
-    Format the vendor price analysis for display.
-    
+    Wait for background scrapes and gather their context blocks.
+
     Args:
-        analysis (dict): The analysis result containing platform and price.
-    
+        futures (dict): Mapping of platform name to Future from start_market_research.
+        metrics (dict, optional): Turn metrics that receive per-platform scrape timings.
+
     Returns:
-        str: Formatted string for display.
+        list: Context blocks from every platform that returned data.
     """
-    if not analysis:
-        return "No vendor prices found."
-    
-    platform = analysis['platform']
-    price = analysis['price']
-    
-    entry = f"### Vendor Price Analysis\n"
-    entry += f"Platform: {platform}\n"
-    entry += f"Price: Rp{price:,}\n"
-    entry += f"URL: {analysis['url']}\n"
-    entry += f"Product Name: {analysis['name']}\n"
-    entry += f"Reviews Count: {analysis.get('reviews_count', 'N/A')}\n"
-    if platform == "Tokopedia":
-        entry += f"Rating Count: {analysis.get('rating_count', 'N/A')}\n"
-    elif platform == "Shopee":
-        entry += f"Reviews Count: {analysis.get('reviews_count', 'N/A')}\n"
-    else:
-        entry += "Platform not recognized.\n"
+    context_info = []
+    for platform, future in futures.items():
+        try:
+            context, elapsed = future.result()
+            if metrics is not None:
+                metrics['scrape_s'][platform] = round(elapsed, 3)
+            if context:
+                context_info.append(context)
+        except Exception as e:
+            st.warning(f"Unable to fetch {platform} data: {str(e)}")
+    return context_info
 
-def extract_evaluation_from_response(response_text):
-    """Extract evaluation details from assistant's response"""
-    try:
-        products = []
-        lines = response_text.split('\n')
-        current_product = {}
-        
-        for line in lines:
-            line = line.strip()
-            if "Product:" in line or "Produk:" in line:
-                if current_product:
-                    products.append(current_product)
-                current_product = {}
-                current_product['product_name'] = line.split(":", 1)[1].strip()
-            elif "Quantity:" in line or "Jumlah:" in line:
-                current_product['quantity'] = int(line.split(":", 1)[1].strip())
-            elif "Unit Price:" in line or "Harga Satuan:" in line:
-                price_str = line.split(":", 1)[1].strip()
-                price_str = price_str.replace("Rp", "").replace(".", "").replace(",", "").strip()
-                current_product['unit_price'] = float(price_str)
-            elif "Total Price:" in line or "Total Harga Penawaran:" in line:
-                total_price_str = line.split(":", 1)[1].strip()
-                total_price_str = total_price_str.replace("Rp", "").replace(".", "").replace(",", "").strip()
-                current_product['total_price'] = float(total_price_str)
-        
-        if current_product:
-            products.append(current_product)
-        
-        return products
-    except Exception as e:
-        st.error(f"Error extracting evaluation data: {str(e)}")
-        return None
+def stream_to_container(response, container, prefix="", metrics=None):
+    """
+    Render a streaming Gemini response into a placeholder.
 
+    Args:
+        response: Streaming response from chat.send_message.
+        container: st.empty() placeholder to render into.
+        prefix (str): Already rendered text to keep above the new tokens.
+        metrics (dict, optional): Turn metrics that receive TTFT and token usage.
 
-def evaluate_vendor_offerings(response_text, margin):
-    """Evaluate vendor offerings and create Excel file"""
-    try:
-        # Extract product information from response
-        products = extract_evaluation_from_response(response_text)
-        if not products:
-            return None
-            
-        # Create Excel data
-        excel_data = create_evaluation_excel(products, margin)
-        if not excel_data:
-            return None
-            
-        # Generate Excel file
-        return download_business_offering(excel_data)
-    except Exception as e:
-        st.error(f"Error in evaluation process: {str(e)}")
-        return None
+    Returns:
+        str: The text received from this response only.
+    """
+    response_text = ""
+    for chunk in response:
+        if hasattr(chunk, "text") and chunk.text:
+            if metrics is not None:
+                mark_first_token(metrics)
+            response_text += chunk.text
+            # Tambahkan kursor berkedip untuk efek visual
+            container.markdown(prefix + response_text + "▌")
+    if metrics is not None:
+        add_usage(metrics, response)
+    return response_text
+
+def stream_offering_review(response, container, table=None, margin=0.0, metrics=None):
+    """
+    Render a streaming JSON offering review, product by product.
+
+    Each product is evaluated against the knowledge base as soon as its
+    JSON object is complete and appended to the live table. Pass no table
+    when a deterministic evaluation of the offering already exists, so the
+    numbers transcribed by the model are not evaluated a second time.
+
+    Args:
+        response: Streaming response from chat.send_message with REVIEW_GENERATION_CONFIG.
+        container: st.empty() placeholder to render into.
+        table: st.empty() placeholder for the live evaluation table, optional.
+        margin (float): Acceptable price margin for the evaluation.
+        metrics (dict, optional): Turn metrics that receive TTFT and token usage.
+
+    Returns:
+        tuple: (Markdown of the review, list of reviewed product dicts,
+            pd.DataFrame of evaluated lines or None)
+    """
+    raw_text = ""
+
+    def text_chunks():
+        nonlocal raw_text
+        for chunk in response:
+            if hasattr(chunk, "text") and chunk.text:
+                if metrics is not None:
+                    mark_first_token(metrics)
+                raw_text += chunk.text
+                yield chunk.text
+
+    products = []
+    rendered = []
+    evaluated_rows = []
+    container.markdown("▌")
+    for product in iter_json_products(text_chunks()):
+        products.append(product)
+        rendered.append(format_review_product(product))
+        container.markdown("\n\n".join(rendered) + "\n\n▌")
+        if table is not None:
+            # Evaluasi produk ini saja; index knowledge base sudah di-cache
+            evaluated_rows.extend(evaluate_against_knowledge_base([product], margin).to_dict('records'))
+            show_evaluation_table(table, pd.DataFrame(evaluated_rows))
+    if metrics is not None:
+        add_usage(metrics, response)
+
+    evaluated = pd.DataFrame(evaluated_rows) if evaluated_rows else None
+    review = parse_offering_review(raw_text)
+    if review is None:
+        # Model tidak mengikuti skema, tampilkan teks apa adanya
+        return raw_text, parse_review_text(raw_text), evaluated
+    return format_offering_review(review), review['products'], evaluated
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Get the API key from environment variables
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-crawling_api = CrawlingAPI({"token": os.getenv("CRAWLING_API_KEY")})
-
 # Konfigurasi Telkom API menggunakan kunci yang diambil dari environment
 @st.cache_resource
 def get_telkom_client():
@@ -617,6 +512,7 @@ def get_telkom_client():
         st.error("TELKOM_API_KEY not found in environment variables!")
         return None
 
+    from openai import OpenAI
     return OpenAI(
         api_key=api_key,
         base_url="https://telkom-ai-dag-api.apilogy.id/Telkom-LLM/0.0.4/llm",
@@ -624,81 +520,19 @@ def get_telkom_client():
     )
 
 st.set_page_config(page_title="Pricing Chatbot for Solution Team", page_icon="🤖", layout="wide")
+
+# Profiling per rerun: nyalakan dari sidebar atau dengan RERUN_PROFILE=1
+rerun_profiler.start_rerun(
+    st.session_state.get("profile_reruns", rerun_profiler.PROFILE_BY_DEFAULT),
+    capture=st.session_state.get("profile_capture", False)
+)
+
 st.title("AI Chatbot App for Solution Team")
 st.write("This is a chatbot app using Google Gemini AI for estimating best pricing of CPE items.")
 
-# Initialize the Generative AI model
-model = genai.GenerativeModel('gemini-1.5-flash')
-
-ROLE = {
-        "Price Researcher": {
-            "system_prompt": """Kamu adalah seorang peneliti harga dengan tugas sebagai berikut:
-
-1. PENCARIAN HARGA:
-   - SELALU periksa dan gunakan data dari knowledge base TERLEBIH DAHULU
-   - Jika ada data yang cocok di knowledge base, berikan informasi tersebut sebagai referensi utama
-   - Jika tidak ada data yang cocok persis, berikan saran dari informasi yang relevan terutama yang bersumber dari e-commerce
-   - Untuk platform e-commerce, cari data real-time sebagai perbandingan
-
-2. PENGGUNAAN KNOWLEDGE BASE:
-   - SELALU periksa knowledge base terlebih dahulu
-   - Jika query terlalu umum, tampilkan semua produk relevan dari knowledge base
-   - Jika perlu detail tambahan, mulai dengan menunjukkan data yang tersedia
-   - Berikan panduan spesifik berdasarkan data di knowledge base
-   - Baru kemudian tanyakan detail tambahan jika diperlukan
-   
-3. ASUMSI TEKNIS:
-   - Hindari terlalu banyak bertanya tentang spesifikasi teknis
-   - Gunakan asumsi spesifikasi sesuai rekomendasi profesional
-   - Fokus pada perbandingan harga, bukan detail teknis
-
-3. REFERENSI:
-   - Sertakan link referensi untuk setiap harga yang direkomendasikan
-   - Prioritaskan link dari knowledge base jika tersedia
-   - Cantumkan platform sumber untuk setiap harga
-
-4. FORMAT LAPORAN:
-   - Berikan format poin yang berisi nama produk, harga, link referensi, dan justifikasi
-   - Tampilkan harga dalam format yang jelas (contoh: Rp 1.000.000)
-   - Rekomendasi harga terbaik adalah harga tertinggi yang memiliki rating paling banyak atau seminimalnya 1 rating
-   - Berikan justifikasi singkat untuk setiap rekomendasi""",
-            "icon": "💰",
-            "description": "Sebagai peneliti harga, saya akan mencari dan membandingkan harga produk dari berbagai sumber untuk memberikan rekomendasi harga terbaik."
-        },
-        "Offering Reviewer": {
-            "system_prompt": """Kamu adalah seorang reviewer penawaran harga dengan tugas sebagai berikut:
-
-1. ANALISIS PENAWARAN:
-   - Tinjau penawaran harga dari vendor secara menyeluruh
-   - Bandingkan dengan harga pasar di platform e-commerce
-   - Evaluasi kewajaran harga berdasarkan harga dari knowledge base dikali margin.
-   - Cara Evaluasi:
-       1. Harga dari knowledge base merupakan harga satuan
-       2. Hitung harga wajar mitra dengan mengalikan harga dari knowledge base dengan margin.
-       3. Jika harga penawaran lebih tinggi dibandingkan harga dari knowledge base dikali margin, maka status penawaran harga tidak wajar
-       4. Jika harga penawaran lebih rendah dibandingkan harga dari knowledge base dikali margin, maka status penawaran harga wajar.
-
-2. PERSYARATAN PELANGGAN:
-   - Pastikan penawaran memenuhi semua persyaratan pelanggan
-   - Identifikasi gap antara penawaran dan kebutuhan
-   - Berikan saran penyesuaian jika diperlukan
-
-3. ANALISIS KOMPETITIF:
-   - Bandingkan dengan harga kompetitor di pasar
-   - Evaluasi value proposition penawaran
-   - Pertimbangkan faktor diferensiasi
-
-4. REKOMENDASI:
-   - Berikan rekomendasi penerimaan/penolakan penawaran
-   - Sarankan poin negosiasi jika diperlukan
-   - Sertakan justifikasi untuk setiap rekomendasi""",
-            "icon": "📄",
-            "description": "Sebagai reviewer penawaran, saya akan mengevaluasi dan memberikan masukan tentang penawaran harga yang diajukan oleh vendor."
-        },
-    }
-
 
 # --- Sidebar Configuration ---
+rerun_profiler.section("sidebar.settings")
 with st.sidebar:
     st.header("⚙️ Configuration")
     st.write("You can configure the chatbot settings here.")
@@ -711,6 +545,19 @@ with st.sidebar:
         placeholder="e.g., My Project, AI Chatbot, Price Researcher"
     )
 
+    # Riwayat chat dan hasil riset disimpan per project; berganti project memuat riwayatnya tanpa panggilan LLM
+    if "history" not in st.session_state or st.session_state.history['project'] != selected_project:
+        open_project(selected_project)
+    st.caption(
+        f"{message_count(st.session_state.history)} message(s) and "
+        f"{project_store.count_research(st.session_state.project_owner, selected_project)} cached research result(s) "
+        "stored for this project."
+    )
+    if st.button("Clear Project History"):
+        project_store.clear_project(st.session_state.project_owner, selected_project)
+        open_project(selected_project)
+        st.rerun()
+
     # --- Sidebar Role Selection ---
     st.subheader("👤 Role Selection")
     selected_role = st.selectbox(
@@ -720,13 +567,14 @@ with st.sidebar:
     )
 
     # --- Sidebar Platform Selection ---
-    #st.subheader("🛒 Platform Selection")
-    #st.write("You can select multiple platforms to compare prices.")
-    selected_platform = ["Summary Solution"] #st.multiselect(
-        #"Select Platform",
-        #["Tokopedia", "Shopee", "Summary Solution"],
-        #default=["Summary Solution"]
-    
+    # Platform e-commerce discraping di background; jawaban dari knowledge base tidak menunggu hasilnya
+    st.subheader("🛒 Platform Selection")
+    st.write("You can select multiple platforms to compare prices.")
+    selected_platform = st.multiselect(
+        "Select Platform",
+        MARKET_PLATFORMS + ["Summary Solution"],
+        default=["Summary Solution"]
+    )
 
     # --- Sidebar Input Margin ---
     st.subheader("💰 Price Margin")
@@ -739,33 +587,23 @@ with st.sidebar:
     )
 
     # --- Sidebar Knowledge Base ---
+    rerun_profiler.section("sidebar.knowledge_base")
     st.subheader("📥 Knowledge Base")
     
-    # Initialize knowledge base in session state if not exists
-    if "knowledge_base" not in st.session_state:
-        kb_data = load_knowledge_base()
-        st.session_state.knowledge_base = kb_data
-        if kb_data['products']:
-            st.success("Knowledge base loaded successfully!")
-        else:
-            st.warning("Knowledge base is empty or not found. Starting with empty knowledge base.")
+    # Knowledge base dipakai bersama oleh semua sesi dan dimuat ulang otomatis jika file berubah
+    knowledge_base = get_knowledge_base()
+    if not knowledge_base['products']:
+        st.warning("Knowledge base is empty or not found. Starting with empty knowledge base.")
+    elif "kb_loaded_notice" not in st.session_state:
+        st.session_state.kb_loaded_notice = True
+        st.success("Knowledge base loaded successfully!")
     
     # Display current knowledge base
-    if "knowledge_base" in st.session_state and st.session_state.knowledge_base.get('products'):
+    if knowledge_base['products']:
         st.write("Knowledge Base Reference:")
         try:
-            # Convert dictionary format to DataFrame with explicit columns
-            kb_df = pd.DataFrame(st.session_state.knowledge_base['products'])
-            # Ensure column names match exactly with Excel file
-            kb_df = kb_df.rename(columns={
-                'product_name': 'Product Name',
-                'nett_price': 'Price',
-                'platform': 'Platform',
-                'url': 'URL'
-            })
+            kb_df = knowledge_base_table(knowledge_base['version'], knowledge_base['products'])
             if not kb_df.empty:
-                # Format price column
-                kb_df['Price'] = kb_df['Price'].apply(lambda x: f"Rp {int(float(x)):,}")
                 # Display with better formatting
                 st.dataframe(
                     kb_df,
@@ -791,74 +629,104 @@ with st.sidebar:
         except Exception as e:
             st.error(f"Error displaying knowledge base: {str(e)}")
 
+    rerun_profiler.section("sidebar.kb_actions")
     if st.button("Update Knowledge Base"):
         #Refresh display current knowledge base
-        st.session_state.knowledge_base = load_knowledge_base()
+        knowledge_base = get_knowledge_base()
         st.success("Knowledge base updated!")
         #Display update knowledge base above
         st.rerun()
     
     # Add new knowledge from chat
     if st.button("Add Knowledge from Chat"):
-        if st.session_state.messages and len(st.session_state.messages) > 0:
+        if last_message(st.session_state.history):
             # Get last chat message
-            last_message = st.session_state.messages[-1]["content"]
+            last_content = last_message(st.session_state.history)["content"]
             
             try:
-                from price_researcher import extract_product_name, extract_price
-                
-                # Extract product name
-                product_name = extract_product_name(last_message)
-                print(product_name)
-
-                # Extract price
-                price = extract_price(last_message)
-                
-                # Extract link
-                link_pattern = r"https?://[^\s<>\"']+"
-                link_match = re.search(link_pattern, last_message)
-                link = link_match.group(0) if link_match else None
-                
-                # Check platform from link
-                platform = None
-                if link:
-                    if "tokopedia" in link.lower():
-                        platform = "Tokopedia"
-                    elif "shopee" in link.lower():
-                        platform = "Shopee"
-                    else:
-                        platform = "Summary Solution"
-
-                if price and platform and link and product_name:
-                    try:
-                        
-                        # Create product info
-                        product_data = {
-                            'name': product_name,
-                            'price': price,
-                            'platform': platform,
-                            'url': link
-                        }
-                        
-                        # Save to knowledge base
-                        if save_to_knowledge_base(product_data):
-                            # Reload knowledge base to session state
-                            st.session_state.knowledge_base = load_knowledge_base()
-                            st.success("Product information added to knowledge base!")
-                        
-                    except ValueError as e:
-                        st.error(f"Error converting price: {str(e)}")
-                else:
+                # Ambil semua produk (nama, harga, link, platform) dalam satu kali pemindaian
+                records = extract_product_records(last_content)
+                complete = [r for r in records if r['price'] and r['url']]
+
+                # Simpan semua produk sekaligus dalam satu kali tulis
+                changes = diff_against_knowledge_base(knowledge_base, complete)
+                saved = save_products_to_knowledge_base(changes) if changes else 0
+
+                if saved:
+                    # Muat ulang knowledge base bersama dari file yang baru ditulis
+                    knowledge_base = get_knowledge_base()
+                    st.success(f"{saved} product(s) added to knowledge base!")
+
+                incomplete = [r for r in records if r not in complete]
+                if not records:
+                    st.warning("Could not extract complete product information. Missing: product name")
+                for record in incomplete:
                     missing = []
-                    if not product_name: missing.append("product name")
-                    if not price: missing.append("price")
-                    if not platform: missing.append("platform")
-                    if not link: missing.append("link")
-                    st.warning(f"Could not extract complete product information. Missing: {', '.join(missing)}")
+                    if not record['price']: missing.append("price")
+                    if not record['url']: missing.append("link")
+                    st.warning(f"Could not extract complete product information for {record['name']}. Missing: {', '.join(missing)}")
             except Exception as e:
                 st.error(f"Error processing message: {str(e)}")
 
+    # Harvest all products researched in this session into the knowledge base
+    if st.button("Harvest Session into Knowledge Base"):
+        harvested = []
+        history = st.session_state.history
+        for message in latest_messages(history):
+            if message["role"] == "assistant":
+                harvested.extend(
+                    r for r in extract_product_records(message["content"])
+                    if r['price'] and r['url']
+                )
+        st.session_state.harvest_preview = diff_against_knowledge_base(knowledge_base, harvested)
+        if not st.session_state.harvest_preview:
+            st.warning("No complete product information found in this session.")
+
+    if st.session_state.get("harvest_preview"):
+        changes = st.session_state.harvest_preview
+        preview_df = pd.DataFrame(changes)[['status', 'name', 'price', 'old_price', 'platform', 'url']]
+        preview_df = preview_df.rename(columns={
+            'status': 'Status',
+            'name': 'Product Name',
+            'price': 'Price',
+            'old_price': 'KB Price',
+            'platform': 'Platform',
+            'url': 'URL'
+        })
+        st.dataframe(
+            preview_df,
+            column_config={"URL": st.column_config.LinkColumn()},
+            hide_index=True,
+        )
+        to_write = sum(1 for c in changes if c['status'] != "Duplicate")
+        col1, col2 = st.columns(2)
+        if col1.button(f"Commit {to_write} product(s)", disabled=not to_write):
+            saved = save_products_to_knowledge_base(changes)
+            if saved is not None:
+                st.session_state.harvest_preview = None
+                st.success(f"{saved} product(s) written to knowledge base!")
+                st.rerun()
+        if col2.button("Discard"):
+            st.session_state.harvest_preview = None
+            st.rerun()
+
+    # --- Sidebar Turn Metrics ---
+    rerun_profiler.section("sidebar.metrics")
+    st.subheader("📊 Turn Metrics")
+    recent_metrics = snapshot_recent_metrics()
+    if recent_metrics:
+        last_turn = recent_metrics[-1]
+        col1, col2 = st.columns(2)
+        col1.metric("Last TTFT", f"{last_turn['ttft_s'] or 0:.2f}s")
+        col2.metric("Last latency", f"{last_turn['total_s']:.2f}s")
+        with st.expander(f"p50 / p95 over last {len(recent_metrics)} turns"):
+            summary_df = pd.DataFrame(summarize_metrics(recent_metrics)).T
+            st.dataframe(summary_df)
+    else:
+        st.caption("No chat turns recorded yet.")
+
     # Logic to upload offerings
+    rerun_profiler.section("sidebar.offerings")
     st.header("📤 Upload Offerings")
     # Add button to download offering template
     excel_data = create_offering_template()
@@ -870,227 +738,240 @@ with st.sidebar:
             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
         )
     uploaded_file = st.file_uploader("Upload Offerings (Excel file)", type=["xlsx"])
+    st.session_state.offering_evaluation = None
+    st.session_state.offering_text = None
     if uploaded_file is not None:
-        # Process the uploaded file
-        business_offering = extract_text_from_excel(uploaded_file)
+        file_bytes = uploaded_file.getvalue()
+        file_hash = hashlib.sha256(file_bytes).hexdigest()
+        knowledge_base = get_knowledge_base()
+        # Baca kolom template langsung dan evaluasi tanpa melewati LLM
+        try:
+            resolved = resolve_uploaded_offering(
+                file_hash, knowledge_base.get('version', 0), file_bytes, knowledge_base['products']
+            )
+            # Perubahan margin hanya menghitung ulang harga maksimum dan status
+            st.session_state.offering_evaluation = apply_margin(resolved, margin)
+        except ValueError as e:
+            # File di luar template tetap dikirim ke reviewer sebagai teks
+            try:
+                st.session_state.offering_text = read_uploaded_offering_text(file_hash, file_bytes)
+                st.warning(f"{str(e)}. The offering will be reviewed as text only.")
+            except UNREADABLE_WORKBOOK_ERRORS as read_error:
+                st.error(f"Unable to read the uploaded file as an Excel workbook: {str(read_error)}")
+        except UNREADABLE_WORKBOOK_ERRORS as e:
+            st.error(f"Unable to read the uploaded file as an Excel workbook: {str(e)}")
 
     # Add Evaluate Last Response button if there are messages
-    if st.session_state.messages and len(st.session_state.messages) > 0:
-        last_message = st.session_state.messages[-1]
+    latest_message = last_message(st.session_state.history)
+    if latest_message:
         if selected_role == "Offering Reviewer":
-            st.button("Extract Evaluation Results", disabled=True)
-            #st.write("This feature is still under development.")
-            st.markdown("<p style='color: red; font-size: 12px;'>This feature is still under development.</p>", unsafe_allow_html=True)
+            if st.button("Extract Evaluation Results", disabled=latest_message["role"] != "assistant"):
+                evaluation_excel = evaluate_vendor_offerings(latest_message["content"], margin)
+                if evaluation_excel:
+                    st.download_button(
+                        label="Download Extracted Evaluation",
+                        data=evaluation_excel,
+                        file_name="extracted_evaluation.xlsx",
+                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    )
+                else:
+                    st.warning("No evaluated products found in the last response.")
             
 
 # Update session state based on current selections
+rerun_profiler.section("session_state")
 if selected_role and st.session_state.current_role != selected_role:
     st.session_state.current_role = selected_role
     welcome_message = f"**{selected_role} {ROLE[selected_role]['icon']}**: {ROLE[selected_role]['description']}"
-    st.session_state.messages.append({"role": "assistant", "content": welcome_message})
-    
-if selected_project and st.session_state.current_project != selected_project:
-    st.session_state.current_project = selected_project
-
-# Atur ulang percakapan jika project berganti
-if (st.session_state.current_project != selected_project):
-    st.session_state.messages = []  # Kosongkan riwayat chat
-    st.session_state.current_project = selected_project  # Perbarui proyek saat ini
-    st.rerun()  # Muat ulang aplikasi untuk menerapkan perubahan
-    
+    append_message(st.session_state.history, "assistant", welcome_message, pending=True)
+
 
 #--- Main Chat Interface ---
 # Display project's name
 st.markdown(f"### Project Name: {selected_project}")
 
-# Tampilkan riwayat chat
-for message in st.session_state.messages:
+# Tampilkan hasil evaluasi penawaran yang diunggah
+rerun_profiler.section("offering_evaluation")
+if st.session_state.get("offering_evaluation") is not None:
+    evaluated = st.session_state.offering_evaluation
+    with st.expander(f"📋 Offering Evaluation ({int(evaluated['matched'].sum())}/{len(evaluated)} lines matched in knowledge base)", expanded=True):
+        evaluation_tab, sensitivity_tab = st.tabs(["Evaluation", "Margin Sensitivity"])
+        with evaluation_tab:
+            show_evaluation_table(st, evaluated)
+        with sensitivity_tab:
+            show_margin_sensitivity(evaluated, margin)
+        evaluation_excel = build_evaluation_workbook(evaluated)
+        if evaluation_excel:
+            st.download_button(
+                label="Download Evaluation Results",
+                data=evaluation_excel,
+                file_name="evaluation_results.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
+
+# Tampilkan riwayat chat per halaman; hanya halaman terbaru yang digambar secara default
+rerun_profiler.section("chat_history")
+shown_messages = latest_messages(st.session_state.history, st.session_state.get("history_pages", 1) * HISTORY_PAGE_SIZE)
+hidden_messages = count_older_messages(st.session_state.history, shown_messages[0]) if shown_messages else 0
+if hidden_messages:
+    if st.button(f"Show older messages ({hidden_messages} hidden)", key="show_older_messages"):
+        st.session_state.history_pages = st.session_state.get("history_pages", 1) + 1
+        st.rerun()
+for message in shown_messages:
     with st.chat_message(message["role"]):
+        if message.get("evaluation") is not None:
+            show_evaluation_table(st, message["evaluation"])
         st.markdown(message["content"])
 
 
 # Input chat dari pengguna
+rerun_profiler.section("chat_turn")
 if prompt := st.chat_input("What can I help you with?"):
     # Tampilkan pesan pengguna di chat
     with st.chat_message("user"):
         st.markdown(prompt)
 
     # Hasilkan respons dari asisten AI
-    with st.chat_message("assistant"):
-        # Inisialisasi model Generative AI
-        model = genai.GenerativeModel(st.session_state["gemini_model"])
+    with st.chat_message("assistant"), trace("chat_turn", project=selected_project, role=selected_role) as turn_trace:
+        turn_metrics = start_turn(selected_project, selected_role, st.session_state["gemini_model"])
+        knowledge_base = get_knowledge_base()
+        kb_version = knowledge_base.get('version', 0)
+
+        # Prefix statis (peran, proyek, snapshot knowledge base) dibangun dan didaftarkan sekali
+        with span("build_prompt_prefix", kb_version=kb_version) as attrs:
+            prompt_prefix = build_prompt_prefix(
+                ROLE[selected_role]["system_prompt"], selected_project, kb_version, knowledge_base
+            )
+            model, prefix_cached = get_prefix_model(
+                st.session_state["gemini_model"], selected_role, selected_project, kb_version, prompt_prefix
+            )
+            attrs['prefix_chars'] = len(prompt_prefix)
+            attrs['prefix_cached'] = prefix_cached
+
+        # Suffix per giliran: hanya konteks yang bergantung pada pertanyaan saat ini
+        turn_context = []
 
-        # Bangun prompt sistem dengan instruksi peran dan konteks sebelumnya
-        system_prompt = ROLE[selected_role]["system_prompt"]
-        
         # Tambahkan konteks bahwa ini adalah kelanjutan percakapan jika ada riwayat
-        if len(st.session_state.messages) > 1:  # Jika ada lebih dari pesan selamat datang
-            system_prompt += "\n\nThis is a continuation of our conversation. Please maintain context from previous messages."
-        
-        # Tambahkan nama proyek ke dalam prompt sistem
-        system_prompt += f"\n\n=== PROJECT NAME ===\n{selected_project}"
+        if message_count(st.session_state.history) > 1:  # Jika ada lebih dari pesan selamat datang
+            turn_context.append("This is a continuation of our conversation. Please maintain context from previous messages.")
 
         # Extract product name from query
-        product_name = extract_product_name(prompt)
+        with span("extract_product_name") as attrs:
+            product_name = extract_product_name(prompt)
+            attrs['product_name'] = product_name
 
-        # Tambahkan nama produk ke dalam prompt sistem jika ditemukan
+        # Tambahkan nama produk ke dalam konteks jika ditemukan
         if product_name:
-            system_prompt += f"\n\n=== PRODUCT NAME ===\n{product_name}"
-            #print(f"Extracted product name: {product_name}")
+            turn_context.append(f"=== PRODUCT NAME ===\n{product_name}")
 
-        # Tambahkan konteks dari berbagai sumber
-        context_info = []
-        
         # Tambahkan informasi dari knowledge base jika tersedia
-        if "knowledge_base" in st.session_state and st.session_state.knowledge_base.get('products', []):
-            if product_name:
-                # Cari produk yang cocok di knowledge base
-                matching_products = [
-                    p for p in st.session_state.knowledge_base['products']
-                    if product_name.lower() in p['product_name'].lower()
-                ]
-                if matching_products:
-                    context_info.append("""
-                    KNOWLEDGE BASE INFORMATION:
-                    Ditemukan produk yang sesuai dalam knowledge base:
-                    """)
-                    for p in matching_products:
-                        context_info.append(f"""
-                        Nama: {p['product_name']}
-                        Harga: Rp {float(p['nett_price']):,.2f}
-                        Platform: {p['platform']}
-                        URL: {p['url']}
-                        ---
-                        """)
-                    print(f"Found {len(matching_products)} matching products in knowledge base.")
-                else:
-                    # Jika tidak ada yang cocok persis, tampilkan semua data sebagai referensi
-                    kb_info = format_knowledge_base(st.session_state.knowledge_base)
-                    context_info.append(f"""
-                    KNOWLEDGE BASE INFORMATION:
-                    Tidak ditemukan produk yang persis sama. Berikut semua data yang tersedia:
-                    {kb_info}
-                    """)
-                    print("No exact match found in knowledge base. Displaying all available data.")
-
-        # Tambahkan informasi dari platform e-commerce yang dipilih
-        for platform in selected_platform:
-            if platform == "Summary Solution" and product_name:
-                if "knowledge_base" in st.session_state and st.session_state.knowledge_base.get('products'):
-                    matching_products = [
-                        p for p in st.session_state.knowledge_base['products']
-                        if product_name.lower() in p['product_name'].lower()
-                    ]
-                    if matching_products:
-                        context_info.append("""
-                        SUMMARY SOLUTION INFORMATION:
-                        Found the following matching products in knowledge base:
-                        """)
-                        for p in matching_products:
-                            context_info.append(f"""
-                            Product: {p['product_name']}
-                            Price: Rp {float(p['nett_price']):,.2f}
-                            Platform: {p['platform']}
-                            URL: {p['url']}
-                            ---
-                            """)
-                    else:
-                        context_info.append("""
-                        SUMMARY SOLUTION INFORMATION:
-                        No matching products found in knowledge base.
-                        """)
-            elif platform == "Shopee":
-                try:
-                    shopee_url = find_shopee_product_url(product_name)
-                    if shopee_url:
-                        product_data = scrape_shopee_product_page(shopee_url)
-                        if product_data:
-                            context_info.append(f"""
-                            SHOPEE PRODUCT INFORMATION:
-                            Product: {product_data['name']}
-                            Price: Rp {product_data['price']:,.2f}
-                            Reviews: {product_data['reviews_count']}
-                            URL: {product_data['url']}
-                            """)
-                except Exception as e:
-                    st.warning(f"Unable to fetch Shopee data: {str(e)}")
-                    
-            elif platform == "Tokopedia":
-                try:
-                    tokopedia_url = scrape_tokopedia_search(product_name)
-                    if tokopedia_url:
-                        product_data = scrape_tokopedia_product_page(tokopedia_url)
-                        print(product_data)
-                        if product_data:
-                            context_info.append(f"""
-                            TOKOPEDIA PRODUCT INFORMATION:
-                            Product: {product_data['name']}
-                            Price: Rp {product_data['price']:,.2f}
-                            Rating Count: {product_data['rating_count']}
-                            URL: {product_data['url']}
-                            """)
-                except Exception as e:
-                    st.warning(f"Unable to fetch Tokopedia data: {str(e)}")
-                
+        with span("kb_match.knowledge_base", kb_size=len(knowledge_base.get('products', []))):
+            context_info = build_kb_context(knowledge_base, product_name, selected_platform)
+
+        # Mulai scraping e-commerce di background agar jawaban dari knowledge base tidak menunggu
+        market_futures = start_market_research(
+            product_name, selected_platform, (st.session_state.project_owner, selected_project)
+        )
+
+        # Hasil evaluasi penawaran sudah dihitung; LLM hanya menulis ulasan naratif
+        if selected_role == "Offering Reviewer":
+            if st.session_state.get("offering_evaluation") is not None:
+                turn_context.append(f"""=== OFFERING EVALUATION RESULTS ===
+{format_offering_evaluation(st.session_state.offering_evaluation)}
+The prices, maximum prices and statuses above were computed from the knowledge base with a {margin:.0%} margin.
+Do not recalculate them; use them as-is and write the narrative review on top of these numbers.""")
+            elif st.session_state.get("offering_text"):
+                turn_context.append(f"=== BUSINESS OFFERING ===\n{st.session_state.offering_text}")
+            turn_context.append(REVIEW_OUTPUT_INSTRUCTIONS)
 
         # Gabungkan semua informasi konteks
         if context_info:
-            system_prompt += f"""
-
+            turn_context.append(f"""
             IMPORTANT CONTEXT INFORMATION:
             
             {' '.join(context_info)}
+            """)
 
-            When answering:
-            1. Please prioritize and take information from KNOWLEDGE BASE INFORMATION when available. Please ensure to give confirmation to user whether it's available or not
-            2. Use live data from selected e-commerce platforms for current market comparison
-            3. Always include relevant product links from all available sources
-            4. Compare prices between knowledge base and current market data
-            5. Consider platform-specific factors (ratings, reviews, seller reputation)
-            6. Highlight any significant price differences between platforms
-            """
-
-        # Konversi riwayat pesan ke format yang sesuai untuk Gemini
-        chat_history = []
-        # Tambahkan prompt sistem sebagai pesan pertama jika ini awal percakapan
-        if not st.session_state.messages:
-            chat_history.append({"role": "user", "parts": [system_prompt]})
-            chat_history.append(
-                {
-                    "role": "model",
-                    "parts": [
-                        "I understand. I'll act according to my role and use the knowledge base when relevant. How can I help you?"
-                    ],
-                }
-            )
-        # Tambahkan riwayat percakapan sebelumnya
-        for msg in st.session_state.messages:
-            role = "user" if msg["role"] == "user" else "model"
-            chat_history.append({"role": role, "parts": [msg["content"]]})
-        # Tambahkan pesan user terbaru ke chat_history
-        chat_history.append({"role": "user", "parts": [prompt]})
-
-        # Mulai sesi chat dengan riwayat yang sudah ada
-        chat = model.start_chat(history=chat_history)
+        turn_metrics['prefix_chars'] = len(prompt_prefix)
+        turn_metrics['prefix_cached'] = prefix_cached
+        turn_metrics['kb_context_chars'] = sum(len(c) for c in context_info)
 
-        # Kirim pesan dan dapatkan respons secara streaming
-        response = chat.send_message(prompt, stream=True)
+        # Konversi riwayat pesan ke format yang sesuai untuk Gemini; hanya pesan yang masih di memori yang dikirim
+        with span("build_history", messages=len(recent_messages(st.session_state.history))):
+            chat_history = []
+            for msg in recent_messages(st.session_state.history):
+                role = "user" if msg["role"] == "user" else "model"
+                chat_history.append({"role": role, "parts": [msg["content"]]})
 
-        # Tampilkan respons secara streaming (efek ketikan)
-        response_text = ""
-        response_container = st.empty()
-        for chunk in response:
-            if hasattr(chunk, "text") and chunk.text:
-                response_text += chunk.text
-                # Tambahkan kursor berkedip untuk efek visual
-                response_container.markdown(response_text + "▌")
+        # Mulai sesi chat dengan riwayat yang sudah ada
+        with span("start_chat"):
+            chat = model.start_chat(history=chat_history)
+
+        # Pesan giliran ini: konteks per giliran diikuti pertanyaan pengguna
+        turn_message = prompt
+        if turn_context:
+            turn_message = "\n\n".join(turn_context) + f"\n\nUser question: {prompt}"
+
+        # Fase 1: jawaban dari knowledge base langsung di-stream tanpa menunggu scraping
+        with span("stream.knowledge_base") as attrs:
+            review_evaluation = None
+            if selected_role == "Offering Reviewer":
+                # Jawaban terstruktur: setiap produk tampil begitu objek JSON-nya selesai.
+                # Workbook yang sudah dievaluasi langsung dari file tetap memakai evaluasi itu;
+                # angka salinan model hanya dievaluasi untuk penawaran berbentuk teks.
+                workbook_evaluation = st.session_state.get("offering_evaluation")
+                evaluation_table = st.empty() if workbook_evaluation is None else None
+                response_container = st.empty()
+                response = chat.send_message(turn_message, stream=True, generation_config=REVIEW_GENERATION_CONFIG)
+                response_text, reviewed_products, review_evaluation = stream_offering_review(
+                    response, response_container, table=evaluation_table, margin=margin, metrics=turn_metrics
+                )
+                if workbook_evaluation is not None:
+                    review_evaluation = workbook_evaluation
+                attrs['reviewed_products'] = len(reviewed_products)
+            else:
+                response_container = st.empty()
+                response = chat.send_message(turn_message, stream=True)
+                response_text = stream_to_container(response, response_container, metrics=turn_metrics)
+            response_container.markdown(response_text)
+            attrs['response_chars'] = len(response_text)
+
+        # Fase 2: setelah scraping selesai, tambahkan perbandingan pasar di pesan yang sama
+        if market_futures:
+            with st.spinner("Fetching live marketplace data..."), span("collect_market_context"):
+                market_info = collect_market_context(market_futures, metrics=turn_metrics)
+            if market_info:
+                market_prompt = f"""
+                LIVE E-COMMERCE DATA:
+
+                {' '.join(market_info)}
+
+                Using this live data, write only a short market comparison for the answer above:
+                1. Compare these prices with the knowledge base prices you already gave
+                2. Consider platform-specific factors (ratings, reviews, seller reputation)
+                3. Highlight any significant price differences between platforms
+                4. Always include the product links
+                """
+                response_text += "\n\n---\n\n### 🛒 Market Comparison\n\n"
+                with span("stream.market_comparison"):
+                    response = chat.send_message(market_prompt, stream=True)
+                    response_text += stream_to_container(response, response_container, prefix=response_text, metrics=turn_metrics)
 
         # Tampilkan respons final tanpa kursor
         response_container.markdown(response_text)
+        turn_metrics['trace_file'] = turn_trace['file']
+        finish_turn(turn_metrics)
 
     # Setelah proses AI selesai, baru tambahkan pesan user dan asisten ke session_state
-    st.session_state.messages.append({"role": "user", "content": prompt})
-    st.session_state.messages.append({"role": "assistant", "content": response_text})
+    append_message(st.session_state.history, "user", prompt)
+    # Simpan hanya kolom evaluasi yang ditampilkan agar riwayat tetap ringkas
+    if review_evaluation is not None:
+        review_evaluation = review_evaluation[list(EVALUATION_DISPLAY_COLUMNS)]
+    append_message(st.session_state.history, "assistant", response_text, evaluation=review_evaluation)
+
+# Selesaikan pengukuran rerun; panel profiler ditampilkan di bagian bawah sidebar
+with st.sidebar:
+    show_rerun_profile(rerun_profiler.finish_rerun())
 
 # Scraping product page and saving data
 #url = 'https://shopee.co.id/Ruijie-Reyee-RG-RAP2200(F)-Wireless-Ceiling-Access-Point-WiFi-5-1200M-Dual-Band-PoE-Garansi-Resmi-i.517307496.42257544573'
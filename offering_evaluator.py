@@ -0,0 +1,321 @@
+import difflib
+
+import numpy as np
+import pandas as pd
+
+from rupiah import parse_rupiah_series
+
+# Batas kemiripan untuk pencocokan fuzzy nama produk penawaran dengan knowledge base
+FUZZY_CUTOFF = 0.8
+
+# Jumlah kandidat knowledge base (berdasarkan token yang sama) yang dibandingkan secara fuzzy
+FUZZY_CANDIDATES = 20
+
+# Token yang muncul di lebih banyak baris dari ini dianggap terlalu umum untuk memilih kandidat fuzzy
+MAX_FUZZY_POSTING = 1000
+
+OFFER_COLUMNS = ['product_name', 'quantity', 'unit_price', 'total_price']
+
+# Nama kolom yang dikenali pada file penawaran (template Inggris maupun Bahasa Indonesia)
+OFFER_HEADERS = {
+    'product_name': ['product name', 'nama produk', 'product', 'produk'],
+    'quantity': ['quantity', 'qty', 'jumlah'],
+    'unit_price': ['unit price', 'harga satuan'],
+    'total_price': ['total price', 'total harga penawaran', 'total harga', 'total'],
+}
+
+def normalize_names(names):
+    """Normalize product names for matching
+
+    Lowercases, turns punctuation into spaces and collapses whitespace, so
+    "Ruijie RG-RAP2200" and "ruijie rg rap2200" share the same key. Missing
+    names become the empty key, which never matches.
+
+    Args:
+        names (pd.Series): Product names
+
+    Returns:
+        pd.Series: Normalized keys
+    """
+    # Di pandas 3 astype(str) mempertahankan NaN, jadi nama kosong diisi lebih dulu
+    return (
+        names.fillna('').astype(str)
+        .str.lower()
+        .str.replace(r'[^0-9a-z]+', ' ', regex=True)
+        .str.strip()
+    )
+
+def read_offering_sheet(excel_file):
+    """Read an offering workbook straight into offering lines
+
+    Args:
+        excel_file: Path or file-like object of an offering .xlsx based on
+            the offering template
+
+    Returns:
+        pd.DataFrame: Columns product_name, quantity, unit_price and, when
+            present, total_price
+
+    Raises:
+        ValueError: If the product name, quantity or unit price column is missing
+    """
+    df = pd.read_excel(excel_file)
+    headers = {str(col).strip().lower(): col for col in df.columns}
+
+    rename = {}
+    for field, aliases in OFFER_HEADERS.items():
+        for alias in aliases:
+            if alias in headers:
+                rename[headers[alias]] = field
+                break
+
+    missing = [field for field in OFFER_COLUMNS[:3] if field not in rename.values()]
+    if missing:
+        raise ValueError(f"Offering sheet is missing column(s): {', '.join(missing)}")
+
+    df = df.rename(columns=rename)[list(rename.values())]
+    return df.dropna(subset=['product_name']).reset_index(drop=True)
+
+def build_kb_index(products):
+    """Build a lookup index over knowledge base products
+
+    The index is independent of any offering, so callers should build it
+    once per knowledge base version and reuse it.
+
+    Args:
+        products (list): Knowledge base products ('product_name', 'nett_price', 'platform', 'url')
+
+    Returns:
+        dict: Index with the product table, normalized keys, an exact-key
+            map, token postings (sorted row ids per token), the keys joined
+            into one text and the token trigrams for partial-token
+            substring search
+    """
+    kb = pd.DataFrame(products, columns=['product_name', 'nett_price', 'platform', 'url'])
+    keys = normalize_names(kb['product_name'])
+
+    # Baris pertama untuk setiap kunci, sama seperti pencarian lama yang berhenti di kecocokan pertama
+    exact = pd.Series(np.arange(len(keys)), index=keys.to_numpy())
+    exact = exact[~exact.index.duplicated()]
+
+    postings = {}
+    for row, key in enumerate(keys):
+        for token in set(key.split()):
+            postings.setdefault(token, []).append(row)
+
+    # Kunci hanya berisi [0-9a-z ], jadi '\n' sebagai pemisah menjamin kecocokan tidak melintasi dua baris
+    lengths = keys.str.len().to_numpy()
+    starts = np.concatenate(([0], np.cumsum(lengths[:-1] + 1))) if len(keys) else np.zeros(0, dtype=int)
+
+    return {
+        'kb': kb,
+        'keys': keys.to_numpy(dtype=object),
+        'prices': parse_rupiah_series(kb['nett_price']).to_numpy(dtype=float),
+        'exact': exact,
+        'postings': {token: np.array(rows) for token, rows in postings.items()},
+        'joined_keys': '\n'.join(keys),
+        'key_starts': starts,
+        'trigrams': {token[i:i + 3] for token in postings for i in range(len(token) - 2)},
+    }
+
+def _model_tokens(key):
+    return {token for token in key.split() if any(c.isdigit() for c in token)}
+
+def _resolve_key(key, kb_index):
+    """Resolve a key without exact match: substring first, then fuzzy"""
+    keys = kb_index['keys']
+    tokens = set(key.split())
+    postings = [kb_index['postings'].get(token) for token in tokens]
+    known = sorted((p for p in postings if p is not None), key=len)
+
+    # Token yang tidak ada di posting bisa jadi potongan token ("rap22" dari "rap2200"), jadi cari nama
+    # penawaran sebagai substring di seluruh kunci seperti pencarian lama. Potongan token hanya mungkin
+    # bila semua trigram-nya dikenal, sehingga nama yang memang tidak dikenal tidak memindai semua kunci.
+    unknown = [token for token, rows in zip(tokens, postings) if rows is None]
+    trigrams = kb_index['trigrams']
+    if unknown and all(token[i:i + 3] in trigrams for token in unknown for i in range(len(token) - 2)):
+        position = kb_index['joined_keys'].find(key)
+        if position != -1:
+            return int(np.searchsorted(kb_index['key_starts'], position, side='right') - 1), 'substring'
+    if not known:
+        return -1, None
+
+    # Substring: semua token harus ada di nama knowledge base, ambil baris pertama yang memuat nama penawaran.
+    # Irisan dimulai dari posting terkecil agar token umum tidak membuat irisan mahal.
+    if len(known) == len(postings):
+        candidates = known[0]
+        for rows in known[1:]:
+            # Posting sudah terurut, jadi irisan cukup dengan binary search atas kandidat yang sedikit
+            positions = np.minimum(np.searchsorted(rows, candidates), len(rows) - 1)
+            candidates = candidates[rows[positions] == candidates]
+            if not candidates.size:
+                break
+        for row in candidates:
+            if key in keys[row]:
+                return int(row), 'substring'
+
+    # Fuzzy: bandingkan hanya dengan kandidat yang paling banyak berbagi token.
+    # Token yang mengandung angka (nomor model) harus sama persis, "hap ac2" bukan "hap ac3".
+    selective = [p for p in known if len(p) <= MAX_FUZZY_POSTING] or [known[0][:MAX_FUZZY_POSTING]]
+    rows, counts = np.unique(np.concatenate(selective), return_counts=True)
+    top = rows[np.argsort(-counts, kind='stable')[:FUZZY_CANDIDATES]]
+    model_tokens = _model_tokens(key)
+    best_row, best_ratio = -1, FUZZY_CUTOFF
+    matcher = difflib.SequenceMatcher(b=key, autojunk=False)
+    for row in top:
+        if _model_tokens(keys[row]) != model_tokens:
+            continue
+        matcher.set_seq1(keys[row])
+        ratio = matcher.ratio()
+        if ratio >= best_ratio:
+            best_row, best_ratio = int(row), ratio
+    return (best_row, 'fuzzy') if best_row >= 0 else (-1, None)
+
+def match_offerings(offer_names, kb_index):
+    """Match offering product names to knowledge base rows
+
+    Exact normalized keys are joined in one vectorized lookup; only unique
+    names without an exact match go through the substring/fuzzy fallback.
+
+    Args:
+        offer_names (pd.Series): Product names from the offering
+        kb_index (dict): Index from build_kb_index
+
+    Returns:
+        tuple: (np.ndarray of KB row ids, -1 when unmatched;
+            np.ndarray of match types 'exact', 'substring', 'fuzzy' or None)
+    """
+    keys = normalize_names(offer_names.reset_index(drop=True))
+    unique_keys = pd.Series(keys.unique())
+    blank = (unique_keys == '').to_numpy()
+    exact_rows = unique_keys.map(kb_index['exact']).where(~blank)
+
+    resolved_rows = exact_rows.fillna(-1).astype(int).to_numpy(copy=True)
+    resolved_types = np.where(exact_rows.notna(), 'exact', None).astype(object)
+    # Nama kosong tidak dicocokkan sama sekali
+    for i in np.flatnonzero(exact_rows.isna().to_numpy() & ~blank):
+        resolved_rows[i], resolved_types[i] = _resolve_key(unique_keys[i], kb_index)
+
+    positions = pd.Index(unique_keys).get_indexer(keys)
+    return resolved_rows[positions], resolved_types[positions]
+
+def resolve_offerings(offers, kb_index):
+    """Resolve offering lines against the knowledge base
+
+    The result does not depend on the margin, so it can be kept and passed
+    to apply_margin whenever the margin changes.
+
+    Args:
+        offers (pd.DataFrame or list): Lines with 'product_name', 'quantity',
+            'unit_price' and optionally 'total_price'
+        kb_index (dict): Index from build_kb_index
+
+    Returns:
+        pd.DataFrame: Offering lines with numeric quantity, unit_price and
+            total_price plus kb_product_name, nett_price, reference_url,
+            match_type and matched
+    """
+    df = pd.DataFrame(offers).reset_index(drop=True)
+    for col in OFFER_COLUMNS:
+        if col not in df.columns:
+            df[col] = np.nan
+    df = df[OFFER_COLUMNS].copy()
+
+    # Sel teks seperti "Rp 1.500.000" atau "2 unit" ikut terbaca, bukan menjadi NaN
+    df['quantity'] = parse_rupiah_series(df['quantity'])
+    df['unit_price'] = parse_rupiah_series(df['unit_price'])
+    df['total_price'] = parse_rupiah_series(df['total_price']).fillna(df['unit_price'] * df['quantity'])
+
+    rows, match_types = match_offerings(df['product_name'], kb_index)
+    kb = kb_index['kb']
+
+    # Elemen kosong di akhir array, sehingga baris -1 (tidak cocok) langsung menghasilkan None/NaN
+    df['kb_product_name'] = np.append(kb['product_name'].to_numpy(dtype=object), None)[rows]
+    df['nett_price'] = np.append(kb_index['prices'], np.nan)[rows]
+    df['reference_url'] = np.append(kb['url'].to_numpy(dtype=object), None)[rows]
+    df['match_type'] = match_types
+    df['matched'] = rows >= 0
+    return df
+
+def _comparable(resolved):
+    # NaN <= x bernilai False, sehingga baris tanpa angka lengkap akan salah dinilai "Tidak Wajar"
+    return (
+        resolved['matched'].to_numpy(dtype=bool)
+        & np.isfinite(resolved['total_price'].to_numpy(dtype=float))
+        & np.isfinite(resolved['quantity'].to_numpy(dtype=float))
+        & np.isfinite(resolved['nett_price'].to_numpy(dtype=float))
+    )
+
+def apply_margin(resolved, margin):
+    """Compute maximum price and status for resolved offering lines
+
+    Args:
+        resolved (pd.DataFrame): Result of resolve_offerings
+        margin (float): Acceptable price margin, e.g. 0.2 for 20%
+
+    Returns:
+        pd.DataFrame: Copy with max_price and status ("Wajar", "Tidak Wajar",
+            or None for lines without a knowledge base match or without a
+            quantity, total price or knowledge base price to compare)
+    """
+    df = resolved.copy()
+    max_price = df['nett_price'].to_numpy(dtype=float) * df['quantity'].to_numpy(dtype=float) * (1 + margin)
+    total_price = df['total_price'].to_numpy(dtype=float)
+    df['max_price'] = max_price
+    df['status'] = np.where(
+        _comparable(df),
+        np.where(total_price <= max_price, "Wajar", "Tidak Wajar"),
+        None
+    )
+    return df
+
+def evaluate_offerings(offers, kb_index, margin):
+    """Resolve offering lines and evaluate them with the given margin"""
+    return apply_margin(resolve_offerings(offers, kb_index), margin)
+
+# Grid margin untuk analisis sensitivitas, 0% sampai 50% sesuai rentang slider margin
+SENSITIVITY_MARGINS = np.round(np.arange(0, 0.501, 0.05), 2)
+
+def break_even_margins(resolved):
+    """Margin at which each offering line starts to be "Wajar"
+
+    Args:
+        resolved (pd.DataFrame): Result of resolve_offerings (or apply_margin)
+
+    Returns:
+        np.ndarray: total_price / (nett_price * quantity) - 1 per line, NaN
+            for lines without a knowledge base match
+    """
+    base = resolved['nett_price'].to_numpy(dtype=float) * resolved['quantity'].to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return resolved['total_price'].to_numpy(dtype=float) / base - 1
+
+def margin_sensitivity(resolved, margins=SENSITIVITY_MARGINS):
+    """Evaluate every offering line against a grid of margins at once
+
+    The maximum prices of all lines and margins are computed in a single
+    broadcasted (lines x margins) array operation.
+
+    Args:
+        resolved (pd.DataFrame): Result of resolve_offerings (or apply_margin)
+        margins (array-like): Margins to evaluate, e.g. 0.2 for 20%
+
+    Returns:
+        pd.DataFrame: product_name, break_even_margin and one status column
+            per margin (labelled like "20%"), None for lines apply_margin
+            cannot judge
+    """
+    margins = np.asarray(margins, dtype=float)
+    base = resolved['nett_price'].to_numpy(dtype=float) * resolved['quantity'].to_numpy(dtype=float)
+    max_prices = base[:, None] * (1 + margins[None, :])
+    wajar = resolved['total_price'].to_numpy(dtype=float)[:, None] <= max_prices
+    statuses = np.where(
+        _comparable(resolved)[:, None],
+        np.where(wajar, "Wajar", "Tidak Wajar"),
+        None
+    )
+
+    df = pd.DataFrame(statuses, columns=[f"{m:.0%}" for m in margins])
+    df.insert(0, 'break_even_margin', break_even_margins(resolved))
+    df.insert(0, 'product_name', resolved['product_name'].to_numpy(dtype=object))
+    return df
@@ -0,0 +1,196 @@
+import json
+import re
+
+from rupiah import parse_rupiah
+
+# Skema JSON jawaban Offering Reviewer; daftar produk diletakkan lebih dulu agar bisa ditampilkan selama streaming
+OFFERING_REVIEW_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'products': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'product_name': {'type': 'string'},
+                    'quantity': {'type': 'number'},
+                    'unit_price': {'type': 'number', 'description': 'Offered unit price in Rupiah'},
+                    'total_price': {'type': 'number', 'description': 'Offered total price in Rupiah'},
+                    'kb_price': {'type': 'number', 'nullable': True, 'description': 'Knowledge base unit price in Rupiah'},
+                    'max_price': {'type': 'number', 'nullable': True, 'description': 'Knowledge base total price including margin'},
+                    'status': {'type': 'string', 'description': '"Wajar", "Tidak Wajar" or "Tidak Ditemukan"'},
+                    'reference_url': {'type': 'string', 'nullable': True},
+                    'notes': {'type': 'string', 'nullable': True},
+                },
+                'required': ['product_name', 'quantity', 'unit_price', 'total_price', 'status'],
+            },
+        },
+        'review': {
+            'type': 'string',
+            'description': 'Markdown narrative: customer requirements, competitive analysis and recommendation',
+        },
+    },
+    'required': ['products', 'review'],
+}
+
+# Dict biasa (bukan genai.GenerationConfig) agar SDK Gemini tidak ikut diimpor saat modul ini dimuat
+REVIEW_GENERATION_CONFIG = {
+    'response_mime_type': "application/json",
+    'response_schema': OFFERING_REVIEW_SCHEMA,
+}
+
+REVIEW_OUTPUT_INSTRUCTIONS = """=== OUTPUT FORMAT ===
+Answer with a JSON object following the response schema. List every offered product in "products" with
+all prices as plain numbers in Rupiah, then write the narrative review in Markdown in "review"."""
+
+# Karakter struktur JSON yang perlu diperhatikan parser inkremental; karakter lain dilompati
+JSON_STRUCTURE_PATTERN = re.compile(r'[{}\[\]"\\]')
+
+# Label baris pada jawaban teks lama (tanpa JSON)
+REVIEW_LINE_PATTERN = re.compile(
+    r'^[\s\-]*(?P<label>nama produk|product name|product|produk|quantity|jumlah|qty|unit price|harga satuan'
+    r'|total price|total harga penawaran|reference url|url|status)\s*:\s*(?P<value>.*)$',
+    re.IGNORECASE
+)
+
+REVIEW_LINE_FIELDS = {
+    'nama produk': 'product_name', 'product name': 'product_name', 'product': 'product_name', 'produk': 'product_name',
+    'quantity': 'quantity', 'jumlah': 'quantity', 'qty': 'quantity',
+    'unit price': 'unit_price', 'harga satuan': 'unit_price',
+    'total price': 'total_price', 'total harga penawaran': 'total_price',
+    'reference url': 'reference_url', 'url': 'reference_url',
+    'status': 'status',
+}
+
+def iter_json_products(chunks):
+    """Yield product objects from a streamed JSON review as soon as they close
+
+    Only objects that are direct elements of a top-level array, or of an
+    array inside the top-level object (the "products" list), are yielded.
+
+    Args:
+        chunks (iterable): Text chunks of the JSON response, in order
+
+    Yields:
+        dict: Each complete product object
+    """
+    text = ""
+    stack = []
+    in_string = False
+    skip_until = 0
+    start = None
+    for chunk in chunks:
+        offset = len(text)
+        text += chunk
+        for match in JSON_STRUCTURE_PATTERN.finditer(text, offset):
+            pos = match.start()
+            if pos < skip_until:
+                continue
+            char = match.group()
+            if in_string:
+                if char == '\\':
+                    # Karakter sesudah backslash selalu bagian dari string, bisa saja ada di chunk berikutnya
+                    skip_until = pos + 2
+                elif char == '"':
+                    in_string = False
+            elif char == '"':
+                in_string = True
+            elif char in '{[':
+                if char == '{' and start is None and stack and stack[-1] == '[' and len(stack) <= 2:
+                    start = pos
+                stack.append(char)
+            elif stack:
+                stack.pop()
+                if char == '}' and start is not None and stack and stack[-1] == '[' and len(stack) <= 2:
+                    try:
+                        yield json.loads(text[start:pos + 1])
+                    except json.JSONDecodeError:
+                        pass
+                    start = None
+
+def parse_offering_review(response_text):
+    """Parse a JSON Offering Reviewer response
+
+    Args:
+        response_text (str): Full (or truncated) JSON response
+
+    Returns:
+        dict: 'products' (list of dicts) and 'review' (str), or None if
+            the text is not a JSON review
+    """
+    try:
+        review = json.loads(response_text)
+    except json.JSONDecodeError:
+        # Jawaban terpotong: ambil produk yang sudah lengkap
+        products = list(iter_json_products([response_text]))
+        return {'products': products, 'review': ''} if products else None
+
+    if isinstance(review, list):
+        return {'products': [p for p in review if isinstance(p, dict)], 'review': ''}
+    if isinstance(review, dict) and isinstance(review.get('products'), list):
+        return {'products': [p for p in review['products'] if isinstance(p, dict)], 'review': str(review.get('review') or '')}
+    return None
+
+def parse_review_text(response_text):
+    """Parse product blocks from a plain-text review
+
+    Fallback for responses that are not JSON, e.g. earlier chat messages.
+    Values that cannot be converted are left as None instead of failing
+    the whole response.
+
+    Args:
+        response_text (str): Review text with "Produk:", "Jumlah:",
+            "Harga Satuan:", ... lines
+
+    Returns:
+        list: Dicts with 'product_name' and whichever of 'quantity',
+            'unit_price', 'total_price', 'reference_url' and 'status' were found
+    """
+    products = []
+    current = None
+    for line in response_text.replace("*", "").splitlines():
+        match = REVIEW_LINE_PATTERN.match(line)
+        if not match:
+            continue
+        field = REVIEW_LINE_FIELDS[match.group('label').lower()]
+        value = match.group('value').strip()
+        if field == 'product_name':
+            current = {'product_name': value}
+            products.append(current)
+        elif current is None:
+            continue
+        elif field in ('quantity', 'unit_price', 'total_price'):
+            current[field] = parse_rupiah(value)
+        else:
+            current[field] = value
+    return products
+
+def _format_rupiah(value):
+    try:
+        return f"Rp {float(value):,.2f}"
+    except (TypeError, ValueError):
+        return "-"
+
+def format_review_product(product):
+    """Render one reviewed product as Markdown"""
+    lines = [f"**Produk:** {product.get('product_name', '-')}"]
+    quantity = product.get('quantity')
+    lines.append(f"- Jumlah: {quantity:g}" if isinstance(quantity, (int, float)) else f"- Jumlah: {quantity or '-'}")
+    lines.append(f"- Harga Satuan: {_format_rupiah(product.get('unit_price'))}")
+    lines.append(f"- Total Harga Penawaran: {_format_rupiah(product.get('total_price'))}")
+    if product.get('max_price') is not None:
+        lines.append(f"- Harga Maksimum: {_format_rupiah(product['max_price'])}")
+    if product.get('status'):
+        lines.append(f"- Status: {product['status']}")
+    if product.get('reference_url'):
+        lines.append(f"- URL: {product['reference_url']}")
+    if product.get('notes'):
+        lines.append(f"- Catatan: {product['notes']}")
+    return "\n".join(lines)
+
+def format_offering_review(review):
+    """Render a parsed review (products and narrative) as Markdown"""
+    parts = [format_review_product(product) for product in review['products']]
+    if review.get('review'):
+        parts.append(review['review'])
+    return "\n\n".join(parts)
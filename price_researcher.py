@@ -1,79 +1,138 @@
 import re
 
+from rupiah import RUPIAH_PATTERN, parse_rupiah, rupiah_from_match
+
+# Pola-pola dikompilasi sekali saat modul diimpor, bukan di setiap pemanggilan
+PRODUCT_HEADER_PATTERN = re.compile(r'(?:nama produk|product|produk):\s*([^?\n]+)', re.IGNORECASE)
+PRODUCT_KEYWORD_PATTERN = re.compile(r'(?<!\S)(?:produk|product|item|barang)\s+(\S.*)', re.DOTALL)
+# Pembatas hanya dihitung bila diikuti spasi/akhir teks, sehingga '-' di nomor model (TP-Link, RG-RAP2200) tidak memotong nama
+PRODUCT_DELIMITER_PATTERNS = [re.compile(re.escape(d) + r'(?=\s|$)') for d in (':', '-', '=')]
+
+URL_PATTERN = r'https?://[^\s<>"\'\]]+'
+
+# Satu pola gabungan untuk memindai header produk, harga dan URL dalam satu kali jalan.
+# Nama produk berhenti sebelum harga/URL di baris yang sama agar token tersebut tetap terbaca.
+RECORD_TOKEN_PATTERN = re.compile(
+    r'(?:nama produk|product name|product|produk)\s*:\s*'
+    r'(?P<product>[^?\n]+?)(?=\s*[-|,]?\s*(?:Rp\.?\s*\d|IDR\s*\d|https?://)|\s*[?\n]|\s*$)'
+    r'|(?P<url>' + URL_PATTERN + r')'
+    r'|' + RUPIAH_PATTERN.pattern,
+    re.IGNORECASE
+)
+
 def extract_product_name(prompt):
     """Extract product name using multiple strategies
-    
+
     Args:
         prompt (str): User message/prompt
-        
+
     Returns:
         str: Extracted product name or None if not found
     """
     prompt = prompt.replace("*", "").strip()
-    
-    # Define pattern groups for different search strategies
-    patterns = {
-        'product_headers': [
-            r'product:\s*([^?\n]+)',
-            r'nama produk:\s*([^?\n]+)',
-            r'produk:\s*([^?\n]+)'
-        ],
-    }
-
-    # Try each pattern group
-    for pattern_group in patterns.values():
-        for pattern in pattern_group:
-            match = re.search(pattern, prompt, re.IGNORECASE)
-            if match:
-                name = match.group(1).strip()
-                if name and len(name) > 2:
-                    return name
-
-    # Try delimiter-based extraction
-    delimiters = [':', '-', '=']
-    for delimiter in delimiters:
-        if delimiter in prompt:
-            parts = prompt.split(delimiter)
-            if len(parts) > 1:
-                name = parts[1].strip()
-                if name and len(name) > 2:
-                    return name
 
-    # Try keyword-based extraction
-    keywords = ['produk', 'product', 'item', 'barang']
-    words = prompt.split()
-    for i, word in enumerate(words):
-        if word in keywords and i + 1 < len(words):
-            name = ' '.join(words[i+1:])
-            if name and len(name) > 2:
+    # Try product headers in a single scan
+    for match in PRODUCT_HEADER_PATTERN.finditer(prompt):
+        name = match.group(1).strip()
+        if len(name) > 2:
+            return name
+
+    # Try delimiter-based extraction, only looking at the first segment after the delimiter
+    for pattern in PRODUCT_DELIMITER_PATTERNS:
+        start = pattern.search(prompt)
+        if start:
+            end = pattern.search(prompt, start.end())
+            name = prompt[start.end():end.start() if end else None].strip()
+            if len(name) > 2:
                 return name
 
+    # Try keyword-based extraction
+    for match in PRODUCT_KEYWORD_PATTERN.finditer(prompt):
+        name = ' '.join(match.group(1).split())
+        if len(name) > 2:
+            return name
+
     return None
 
 def extract_price(text):
     """Extract price from text
-    
+
     Args:
         text (str): Text containing price information
-        
+
     Returns:
         float: Extracted price or None if not found
     """
-    patterns = [
-        r'(?:Rp\.?|IDR)\s*(\d{1,3}(?:\.\d{3})*(?:\,\d+)?)',
-        r'(?:Rp\.?|IDR)\s*(\d+)'
-    ]
-    
-    text = text.strip()
-    
-    for pattern in patterns:
-        match = re.search(pattern, text)
-        if match:
-            price_str = match.group(1)
-            price_str = int(price_str.replace(".", "").replace(",", "."))
-            try:
-                return float(price_str)
-            except ValueError:
+    # Teks bebas: hanya nominal bertanda Rp/IDR, agar nomor model tidak terbaca sebagai harga
+    return parse_rupiah(text, require_currency=True)
+
+def detect_platform(url):
+    """Detect the source platform of a product link
+
+    Args:
+        url (str): Product URL
+
+    Returns:
+        str: "Tokopedia", "Shopee", "Summary Solution", or None without URL
+    """
+    if not url:
+        return None
+    url = url.lower()
+    if "tokopedia" in url:
+        return "Tokopedia"
+    if "shopee" in url:
+        return "Shopee"
+    return "Summary Solution"
+
+def _clean_url(url):
+    # Buang tanda baca penutup kalimat dan kurung markdown yang tidak berpasangan
+    url = url.rstrip('.,;:!*')
+    while url.endswith(')') and url.count(')') > url.count('('):
+        url = url[:-1].rstrip('.,;:!*')
+    return url
+
+def extract_product_records(text):
+    """Extract every product record from a message in a single scan
+
+    A record starts at a product header ("Produk:", "Nama Produk:",
+    "Product:") and takes the first price and URL that follow it. Messages
+    without any header are treated as one record named by
+    extract_product_name.
+
+    Args:
+        text (str): Message text, e.g. a price research report
+
+    Returns:
+        list: Dicts with 'name', 'price', 'url' and 'platform'; price, url
+            and platform are None when they were not found for a product
+    """
+    text = text.replace("*", "")
+    records = []
+    current = None
+    loose = {'price': None, 'url': None}
+
+    for match in RECORD_TOKEN_PATTERN.finditer(text):
+        if match.group('product'):
+            name = match.group('product').strip(' -|,')
+            if len(name) <= 2:
                 continue
-                
-    return None
\ No newline at end of file
+            current = {'name': name, 'price': None, 'url': None, 'platform': None}
+            records.append(current)
+            continue
+
+        target = current if current is not None else loose
+        if match.group('url'):
+            if target['url'] is None:
+                target['url'] = _clean_url(match.group('url'))
+        elif target['price'] is None:
+            target['price'] = rupiah_from_match(match)
+
+    if not records:
+        name = extract_product_name(text)
+        if not name:
+            return []
+        records.append({'name': name, **loose})
+
+    for record in records:
+        record['platform'] = detect_platform(record['url'])
+    return records
@@ -0,0 +1,364 @@
+import datetime
+import functools
+import io
+import logging
+import os
+import threading
+import time
+
+from knowledge_base_store import format_knowledge_base, load_knowledge_base
+from offering_evaluator import build_kb_index, evaluate_offerings, read_offering_sheet, resolve_offerings
+
+# Logika inti yang dipakai bersama oleh aplikasi Streamlit (main.py) dan API HTTP (api_server.py).
+# Modul ini tidak memanggil API Streamlit sehingga aman dipakai dari thread mana pun.
+
+logger = logging.getLogger(__name__)
+
+# Model Gemini bawaan untuk chat
+DEFAULT_MODEL = "gemini-2.5-flash"
+
+# Platform e-commerce yang datanya diambil lewat scraping live
+MARKET_PLATFORMS = ["Tokopedia", "Shopee"]
+
+# Define roles and their configurations
+ROLE = {
+    "Price Researcher": {
+        "system_prompt": """Kamu adalah seorang peneliti harga dengan tugas sebagai berikut:
+
+1. PENCARIAN HARGA:
+   - SELALU periksa dan gunakan data dari knowledge base TERLEBIH DAHULU
+   - Jika ada data yang cocok di knowledge base, berikan informasi tersebut sebagai referensi utama
+   - Jika tidak ada data yang cocok persis, berikan saran dari informasi yang relevan terutama yang bersumber dari e-commerce
+   - Untuk platform e-commerce, cari data real-time sebagai perbandingan
+
+2. PENGGUNAAN KNOWLEDGE BASE:
+   - SELALU periksa knowledge base terlebih dahulu
+   - Jika query terlalu umum, tampilkan semua produk relevan dari knowledge base
+   - Jika perlu detail tambahan, mulai dengan menunjukkan data yang tersedia
+   - Berikan panduan spesifik berdasarkan data di knowledge base
+   - Baru kemudian tanyakan detail tambahan jika diperlukan
+   
+3. ASUMSI TEKNIS:
+   - Hindari terlalu banyak bertanya tentang spesifikasi teknis
+   - Gunakan asumsi spesifikasi sesuai rekomendasi profesional
+   - Fokus pada perbandingan harga, bukan detail teknis
+
+3. REFERENSI:
+   - Sertakan link referensi untuk setiap harga yang direkomendasikan
+   - Prioritaskan link dari knowledge base jika tersedia
+   - Cantumkan platform sumber untuk setiap harga
+
+4. FORMAT LAPORAN:
+   - Berikan format poin yang berisi nama produk, harga, link referensi, dan justifikasi
+   - Tampilkan harga dalam format yang jelas (contoh: Rp 1.000.000)
+   - Rekomendasi harga terbaik adalah harga tertinggi yang memiliki rating paling banyak atau seminimalnya 1 rating
+   - Berikan justifikasi singkat untuk setiap rekomendasi""",
+        "icon": "💰",
+        "description": "Sebagai peneliti harga, saya akan mencari dan membandingkan harga produk dari berbagai sumber untuk memberikan rekomendasi harga terbaik."
+    },
+    "Offering Reviewer": {
+        "system_prompt": """Kamu adalah seorang reviewer penawaran harga dengan tugas sebagai berikut:
+
+1. ANALISIS PENAWARAN:
+   - Tinjau penawaran harga dari vendor secara menyeluruh
+   - Bandingkan dengan harga pasar di platform e-commerce
+   - Evaluasi kewajaran harga berdasarkan harga dari knowledge base dikali margin.
+   - Cara Evaluasi:
+       1. Harga dari knowledge base merupakan harga satuan
+       2. Hitung harga wajar mitra dengan mengalikan harga dari knowledge base dengan margin.
+       3. Jika harga penawaran lebih tinggi dibandingkan harga dari knowledge base dikali margin, maka status penawaran harga tidak wajar
+       4. Jika harga penawaran lebih rendah dibandingkan harga dari knowledge base dikali margin, maka status penawaran harga wajar.
+
+2. PERSYARATAN PELANGGAN:
+   - Pastikan penawaran memenuhi semua persyaratan pelanggan
+   - Identifikasi gap antara penawaran dan kebutuhan
+   - Berikan saran penyesuaian jika diperlukan
+
+3. ANALISIS KOMPETITIF:
+   - Bandingkan dengan harga kompetitor di pasar
+   - Evaluasi value proposition penawaran
+   - Pertimbangkan faktor diferensiasi
+
+4. REKOMENDASI:
+   - Berikan rekomendasi penerimaan/penolakan penawaran
+   - Sarankan poin negosiasi jika diperlukan
+   - Sertakan justifikasi untuk setiap rekomendasi""",
+        "icon": "📄",
+        "description": "Sebagai reviewer penawaran, saya akan mengevaluasi dan memberikan masukan tentang penawaran harga yang diajukan oleh vendor."
+    },
+}
+
+# Jumlah versi index knowledge base yang disimpan di memori
+KB_INDEX_CACHE_SIZE = 4
+
+# Lama cache konteks disimpan di sisi Gemini
+PREFIX_CACHE_TTL = datetime.timedelta(hours=1)
+
+# Daftarkan ulang sedikit lebih awal agar tidak memakai cache yang sudah kedaluwarsa di server
+LOCAL_CACHE_TTL = PREFIX_CACHE_TTL - datetime.timedelta(minutes=5)
+
+# Jumlah prefix prompt dan model ber-prefix yang disimpan di memori
+PROMPT_PREFIX_CACHE_SIZE = 32
+PREFIX_MODEL_CACHE_SIZE = 16
+
+# Cache hangat satu proses: knowledge base dimuat ulang hanya jika file berubah
+_kb_lock = threading.Lock()
+_kb_cache = {'knowledge_base': None}
+_kb_index_cache = {}
+
+# Prefix prompt dan model Gemini per (role, project, versi knowledge base), dipakai bersama semua sesi
+_prompt_lock = threading.Lock()
+_prompt_prefix_cache = {}
+_prefix_model_cache = {}
+
+def _store_bounded(cache, key, value, max_entries):
+    # Buang entri tertua jika cache penuh (dict menyimpan urutan masuk); dipanggil dengan lock cache dipegang
+    cache[key] = value
+    while len(cache) > max_entries:
+        del cache[next(iter(cache))]
+
+def get_knowledge_base():
+    """Knowledge base shared by all callers, reloaded when the file changes
+
+    Returns:
+        dict: Knowledge base with 'products' and 'version'
+    """
+    try:
+        version = os.stat("knowledge_base.xlsx").st_mtime_ns
+    except FileNotFoundError:
+        version = 0
+    with _kb_lock:
+        knowledge_base = _kb_cache['knowledge_base']
+        if knowledge_base is None or knowledge_base['version'] != version:
+            knowledge_base = load_knowledge_base()
+            _kb_cache['knowledge_base'] = knowledge_base
+        return knowledge_base
+
+def get_kb_index(kb_version, products):
+    """Offering evaluation index of the knowledge base, built once per version
+
+    Args:
+        kb_version (int): Version of the knowledge base, used as cache key
+        products (list): Knowledge base products
+
+    Returns:
+        dict: Index from build_kb_index
+    """
+    with _kb_lock:
+        kb_index = _kb_index_cache.get(kb_version)
+    if kb_index is None:
+        kb_index = build_kb_index(products)
+        with _kb_lock:
+            _store_bounded(_kb_index_cache, kb_version, kb_index, KB_INDEX_CACHE_SIZE)
+    return kb_index
+
+# SDK Gemini diimpor dan dikonfigurasi sekali, saat model pertama kali dibutuhkan
+@functools.cache
+def get_gemini():
+    """Import and configure the Gemini SDK once per process
+
+    Returns:
+        module: The configured google.generativeai module
+    """
+    import google.generativeai as genai
+
+    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+    return genai
+
+def build_prompt_prefix(role_prompt, project_name, kb_version, knowledge_base):
+    """Build the stable part of the system prompt
+
+    The prefix only changes when the role, project or knowledge base changes,
+    so it is cached on (role_prompt, project_name, kb_version) and the
+    knowledge base itself is not hashed.
+
+    Args:
+        role_prompt (str): System prompt of the selected role
+        project_name (str): Current project name
+        kb_version (int): Version of the loaded knowledge base
+        knowledge_base (dict): Knowledge base with a 'products' list
+
+    Returns:
+        str: Prefix containing role, project and knowledge base snapshot
+    """
+    key = (role_prompt, project_name, kb_version)
+    with _prompt_lock:
+        prefix = _prompt_prefix_cache.get(key)
+    if prefix is not None:
+        return prefix
+
+    prefix = role_prompt
+    prefix += f"\n\n=== PROJECT NAME ===\n{project_name}"
+    if knowledge_base and knowledge_base.get('products'):
+        prefix += "\n\n" + format_knowledge_base(knowledge_base)
+    prefix += """
+
+When answering:
+1. Please prioritize and take information from KNOWLEDGE BASE PRODUCTS and KNOWLEDGE BASE INFORMATION when available. Please ensure to give confirmation to user whether it's available or not
+2. Always include relevant product links from all available sources
+3. Live e-commerce data is collected separately; a market comparison will be appended after your answer when it is available
+"""
+    with _prompt_lock:
+        _store_bounded(_prompt_prefix_cache, key, prefix, PROMPT_PREFIX_CACHE_SIZE)
+    return prefix
+
+def get_prefix_model(model_name, role_name, project_name, kb_version, prefix):
+    """Get a Gemini model with the prompt prefix already attached
+
+    The prefix is registered once through Gemini context caching so later
+    turns only send the per-turn suffix. Models or prefixes that cannot be
+    cached (e.g. below the minimum token count) fall back to a model with
+    the prefix as system instruction, which is still built only once.
+    Models are kept for LOCAL_CACHE_TTL, shorter than the provider-side
+    cache, and then registered again.
+
+    Args:
+        model_name (str): Gemini model name
+        role_name (str): Selected role, part of the cache key
+        project_name (str): Current project name, part of the cache key
+        kb_version (int): Version of the loaded knowledge base, part of the cache key
+        prefix (str): Prefix from build_prompt_prefix
+
+    Returns:
+        tuple: (GenerativeModel, bool) where the flag tells whether the
+            provider-side context cache is used
+    """
+    key = (model_name, role_name, project_name, kb_version)
+    now = time.monotonic()
+    with _prompt_lock:
+        cached = _prefix_model_cache.get(key)
+    if cached is not None and now - cached[0] < LOCAL_CACHE_TTL.total_seconds():
+        return cached[1]
+
+    genai = get_gemini()
+    try:
+        cached_content = genai.caching.CachedContent.create(
+            model=model_name,
+            display_name=f"{role_name} - {project_name}"[:128],
+            system_instruction=prefix,
+            ttl=PREFIX_CACHE_TTL,
+        )
+        result = genai.GenerativeModel.from_cached_content(cached_content), True
+    except Exception as e:
+        logger.warning("Context caching unavailable, using local prefix cache: %s", e)
+        result = genai.GenerativeModel(model_name, system_instruction=prefix), False
+    with _prompt_lock:
+        # Entri kedaluwarsa dihapus dulu agar entri baru masuk di urutan terakhir
+        _prefix_model_cache.pop(key, None)
+        _store_bounded(_prefix_model_cache, key, (now, result), PREFIX_MODEL_CACHE_SIZE)
+    return result
+
+def find_kb_products(knowledge_base, product_name):
+    """Knowledge base products whose name contains the given product name"""
+    if not product_name:
+        return []
+    name = product_name.lower()
+    return [p for p in knowledge_base.get('products', []) if name in p['product_name'].lower()]
+
+def build_kb_context(knowledge_base, product_name, platforms):
+    """Build the knowledge base context blocks for a chat turn
+
+    Args:
+        knowledge_base (dict): Knowledge base with a 'products' list
+        product_name (str): Product extracted from the question, may be None
+        platforms (list): Selected platforms
+
+    Returns:
+        list: Context strings to add to the prompt
+    """
+    context_info = []
+    if not knowledge_base.get('products') or not product_name:
+        return context_info
+
+    # Cari produk yang cocok di knowledge base
+    matching_products = find_kb_products(knowledge_base, product_name)
+    if matching_products:
+        context_info.append("""
+        KNOWLEDGE BASE INFORMATION:
+        Ditemukan produk yang sesuai dalam knowledge base:
+        """)
+        for p in matching_products:
+            context_info.append(f"""
+            Nama: {p['product_name']}
+            Harga: Rp {float(p['nett_price']):,.2f}
+            Platform: {p['platform']}
+            URL: {p['url']}
+            ---
+            """)
+        logger.info("Found %d matching products in knowledge base.", len(matching_products))
+    else:
+        # Jika tidak ada yang cocok persis, rujuk semua data pada snapshot knowledge base
+        context_info.append("""
+        KNOWLEDGE BASE INFORMATION:
+        Tidak ditemukan produk yang persis sama. Gunakan semua data pada KNOWLEDGE BASE PRODUCTS sebagai referensi.
+        """)
+        logger.info("No exact match found in knowledge base. Referring to the full knowledge base snapshot.")
+
+    # Tambahkan informasi dari platform yang bersumber dari knowledge base
+    if "Summary Solution" in platforms:
+        if matching_products:
+            context_info.append("""
+            SUMMARY SOLUTION INFORMATION:
+            Found the following matching products in knowledge base:
+            """)
+            for p in matching_products:
+                context_info.append(f"""
+                Product: {p['product_name']}
+                Price: Rp {float(p['nett_price']):,.2f}
+                Platform: {p['platform']}
+                URL: {p['url']}
+                ---
+                """)
+        else:
+            context_info.append("""
+            SUMMARY SOLUTION INFORMATION:
+            No matching products found in knowledge base.
+            """)
+    return context_info
+
+def evaluate_offering_lines(products, margin, knowledge_base):
+    """Evaluate offering lines against the knowledge base
+
+    Args:
+        products (list): Dicts with 'product_name', 'quantity', 'unit_price'
+            and 'total_price'
+        margin (float): Acceptable price margin
+        knowledge_base (dict): Knowledge base with 'products' and 'version'
+
+    Returns:
+        pd.DataFrame: Evaluated lines from evaluate_offerings
+    """
+    kb_index = get_kb_index(knowledge_base.get('version', 0), knowledge_base['products'])
+    return evaluate_offerings(products, kb_index, margin)
+
+def resolve_offering_workbook(file_bytes, knowledge_base):
+    """Read an offering workbook and resolve its lines against the knowledge base
+
+    Args:
+        file_bytes (bytes): Content of an offering workbook (.xlsx)
+        knowledge_base (dict): Knowledge base with 'products' and 'version'
+
+    Returns:
+        pd.DataFrame: Result of resolve_offerings, to be passed to apply_margin
+
+    Raises:
+        ValueError: If the file does not follow the offering template
+    """
+    offering_lines = read_offering_sheet(io.BytesIO(file_bytes))
+    kb_index = get_kb_index(knowledge_base.get('version', 0), knowledge_base['products'])
+    return resolve_offerings(offering_lines, kb_index)
+
+def research_max_price(product_name, margin=0.2):
+    """Highest price for a product across e-commerce platforms and the knowledge base
+
+    Args:
+        product_name (str): The name of the product to search for
+        margin (float): Margin applied to every price
+
+    Returns:
+        dict: Result of scrapers.get_max_product_price, or None
+    """
+    # Modul scraping (Selenium, Crawlbase, BeautifulSoup) baru dimuat saat dibutuhkan
+    import scrapers
+
+    return scrapers.get_max_product_price(product_name, margin)
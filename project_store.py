@@ -0,0 +1,154 @@
+import contextlib
+import json
+import os
+import sqlite3
+import time
+import uuid
+
+# Database SQLite berisi riwayat chat dan hasil riset per pemilik (owner) dan project
+PROJECT_STORE_PATH = os.getenv("PROJECT_STORE_PATH", "projects.db")
+
+# Hasil scraping dianggap kedaluwarsa setelah batas ini karena harga pasar berubah
+RESEARCH_CACHE_TTL_S = float(os.getenv("RESEARCH_CACHE_TTL_S", str(24 * 3600)))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    owner TEXT NOT NULL,
+    project TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    evaluation TEXT,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_owner_project ON messages (owner, project, id);
+CREATE TABLE IF NOT EXISTS research_cache (
+    owner TEXT NOT NULL,
+    project TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    created REAL NOT NULL,
+    PRIMARY KEY (owner, project, kind, key)
+);
+"""
+
+_initialized = set()
+
+@contextlib.contextmanager
+def _connect():
+    # Satu koneksi per pemanggilan: aman dipakai dari thread sesi maupun thread scraping
+    conn = sqlite3.connect(PROJECT_STORE_PATH, timeout=30)
+    try:
+        if PROJECT_STORE_PATH not in _initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            _initialized.add(PROJECT_STORE_PATH)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+def _upper_id(before_id):
+    # Tanpa batas: lebih besar dari id mana pun (INTEGER SQLite maksimal 2^63 - 1)
+    return 2 ** 63 - 1 if before_id is None else before_id
+
+def new_owner():
+    """Id for a new owner of projects, e.g. one per browser"""
+    return uuid.uuid4().hex
+
+def add_message(owner, project, role, content, evaluation=None):
+    """Store a chat message of a project
+
+    Args:
+        owner (str): Owner from new_owner
+        project (str): Project name
+        role (str): "user" or "assistant"
+        content (str): Markdown content
+        evaluation (str, optional): Evaluation table as JSON
+
+    Returns:
+        int: Id of the stored message, increasing with every message
+    """
+    with _connect() as conn:
+        return conn.execute(
+            "INSERT INTO messages (owner, project, role, content, evaluation, created) VALUES (?, ?, ?, ?, ?, ?)",
+            (owner, project, role, content, evaluation, time.time())
+        ).lastrowid
+
+def count_messages(owner, project, before_id=None):
+    """Number of stored messages of a project, optionally only those older than before_id"""
+    with _connect() as conn:
+        return conn.execute(
+            "SELECT COUNT(*) FROM messages WHERE owner = ? AND project = ? AND id < ?",
+            (owner, project, _upper_id(before_id))
+        ).fetchone()[0]
+
+def load_messages(owner, project, before_id=None, limit=None):
+    """Latest stored messages of a project older than before_id, oldest first
+
+    Pages are addressed by message id instead of position, so messages
+    stored meanwhile by another session do not shift them.
+
+    Args:
+        owner (str): Owner from new_owner
+        project (str): Project name
+        before_id (int, optional): Only messages with a smaller id; None for the newest
+        limit (int, optional): Maximum number of messages; None for all
+
+    Returns:
+        list: Dicts with 'id', 'role', 'content' and 'evaluation' (JSON or None)
+    """
+    with _connect() as conn:
+        rows = conn.execute(
+            "SELECT id, role, content, evaluation FROM messages WHERE owner = ? AND project = ? AND id < ? "
+            "ORDER BY id DESC LIMIT ?",
+            (owner, project, _upper_id(before_id), -1 if limit is None else limit)
+        ).fetchall()
+    return [
+        {'id': message_id, 'role': role, 'content': content, 'evaluation': evaluation}
+        for message_id, role, content, evaluation in reversed(rows)
+    ]
+
+def get_research(owner, project, kind, key, ttl_s=RESEARCH_CACHE_TTL_S):
+    """Cached research result of a project, or None if missing or expired
+
+    Args:
+        owner (str): Owner from new_owner
+        project (str): Project name
+        kind (str): Kind of result, e.g. "scrape.Tokopedia"
+        key (str): Lookup key, e.g. the normalized product name
+        ttl_s (float): Maximum age in seconds, None for no limit
+
+    Returns:
+        Any: The JSON-decoded result
+    """
+    with _connect() as conn:
+        row = conn.execute(
+            "SELECT value, created FROM research_cache WHERE owner = ? AND project = ? AND kind = ? AND key = ?",
+            (owner, project, kind, key)
+        ).fetchone()
+    if row is None or (ttl_s is not None and time.time() - row[1] > ttl_s):
+        return None
+    return json.loads(row[0])
+
+def put_research(owner, project, kind, key, value):
+    """Cache a JSON-serializable research result for a project"""
+    with _connect() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO research_cache (owner, project, kind, key, value, created) VALUES (?, ?, ?, ?, ?, ?)",
+            (owner, project, kind, key, json.dumps(value, ensure_ascii=False), time.time())
+        )
+
+def count_research(owner, project):
+    """Number of cached research results of a project"""
+    with _connect() as conn:
+        return conn.execute(
+            "SELECT COUNT(*) FROM research_cache WHERE owner = ? AND project = ?", (owner, project)
+        ).fetchone()[0]
+
+def clear_project(owner, project):
+    """Delete the stored messages and cached research of a project of one owner"""
+    with _connect() as conn:
+        conn.execute("DELETE FROM messages WHERE owner = ? AND project = ?", (owner, project))
+        conn.execute("DELETE FROM research_cache WHERE owner = ? AND project = ?", (owner, project))
@@ -0,0 +1,188 @@
+import collections
+import contextvars
+import cProfile
+import glob
+import os
+import threading
+import time
+
+import numpy as np
+import streamlit as st
+
+# Profiling aktif secara default jika RERUN_PROFILE=1, bisa juga dinyalakan dari sidebar
+PROFILE_BY_DEFAULT = os.getenv("RERUN_PROFILE", "0").lower() in ("1", "true", "yes")
+
+# Folder dump cProfile rerun paling lambat (buka dengan snakeviz atau pstats)
+PROFILE_DIR = os.getenv("RERUN_PROFILE_DIR", "profiles")
+
+# Jumlah rerun terakhir yang disimpan untuk histogram
+PROFILE_WINDOW = 500
+
+# Jumlah dump cProfile rerun paling lambat yang disimpan
+MAX_PROFILE_DUMPS = 10
+
+_current_rerun = contextvars.ContextVar("current_rerun", default=None)
+
+# cProfile hanya bisa aktif satu kali dalam satu proses; catat rerun mana yang sedang memakainya
+_profiler_lock = threading.Lock()
+_capture = {'profiler': None, 'thread': None}
+
+def _release_abandoned_capture():
+    with _profiler_lock:
+        owner = _capture['thread']
+        if owner is not None and (owner is threading.current_thread() or not owner.is_alive()):
+            # Rerun sebelumnya terhenti (st.rerun, st.stop atau error) sebelum finish_rerun
+            _capture['profiler'].disable()
+            _capture.update(profiler=None, thread=None)
+
+def _start_capture():
+    with _profiler_lock:
+        if _capture['thread'] is not None:
+            return None
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Profiler lain sedang aktif di proses ini, lewati capture untuk rerun ini
+            return None
+        _capture.update(profiler=profiler, thread=threading.current_thread())
+        return profiler
+
+def _stop_capture(profiler):
+    with _profiler_lock:
+        profiler.disable()
+        if _capture['profiler'] is profiler:
+            _capture.update(profiler=None, thread=None)
+
+@st.cache_resource
+def get_rerun_history():
+    """Rolling window of profiled reruns shared by all sessions"""
+    return collections.deque(maxlen=PROFILE_WINDOW)
+
+def start_rerun(enabled, capture=False):
+    """Start timing a script rerun
+
+    Args:
+        enabled (bool): Whether profiling is on for this rerun
+        capture (bool): Also run cProfile so slow reruns can be dumped
+    """
+    _release_abandoned_capture()
+    if not enabled:
+        _current_rerun.set(None)
+        return
+
+    profiler = _start_capture() if capture else None
+    now = time.perf_counter()
+    _current_rerun.set({
+        'timestamp': time.time(),
+        'sections': {},
+        'profiler': profiler,
+        '_start': now,
+        '_section': "setup",
+        '_section_start': now,
+    })
+
+def section(name):
+    """Close the current script section and start the next one
+
+    The script is profiled as consecutive sections, so a call marks where
+    one logical block ends and the next begins. Does nothing when
+    profiling is off.
+
+    Args:
+        name (str): Name of the section that starts here
+    """
+    rerun = _current_rerun.get()
+    if rerun is None:
+        return
+    now = time.perf_counter()
+    sections = rerun['sections']
+    sections[rerun['_section']] = sections.get(rerun['_section'], 0.0) + (now - rerun['_section_start']) * 1000
+    rerun['_section'] = name
+    rerun['_section_start'] = now
+
+def finish_rerun():
+    """Finish timing the rerun, record it and dump its profile if it is among the slowest
+
+    Reruns interrupted by st.rerun() or st.stop() never reach this call and
+    are not recorded.
+
+    Returns:
+        dict: Recorded rerun ('timestamp', 'total_ms', 'sections' in ms), or
+            None when profiling is off
+    """
+    rerun = _current_rerun.get()
+    if rerun is None:
+        return None
+    section(None)
+    _current_rerun.set(None)
+
+    profiler = rerun['profiler']
+    if profiler is not None:
+        _stop_capture(profiler)
+
+    record = {
+        'timestamp': rerun['timestamp'],
+        'total_ms': round((time.perf_counter() - rerun['_start']) * 1000, 2),
+        'sections': {name: round(ms, 2) for name, ms in rerun['sections'].items()},
+    }
+    if profiler is not None:
+        record['profile'] = _dump_if_slow(profiler, record['total_ms'])
+    get_rerun_history().append(record)
+    return record
+
+def _dump_if_slow(profiler, total_ms):
+    # Nama file diawali durasi, sehingga dump tercepat mudah ditemukan dan dihapus
+    dumps = sorted(glob.glob(os.path.join(PROFILE_DIR, "rerun-*.prof")))
+    durations = [float(os.path.basename(path).split("-")[1].rstrip("ms")) for path in dumps]
+    if len(dumps) >= MAX_PROFILE_DUMPS and total_ms <= min(durations):
+        return None
+
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"rerun-{total_ms:010.1f}ms-{time.strftime('%Y%m%d%H%M%S')}.prof")
+        profiler.dump_stats(path)
+        for old_path, _ in sorted(zip(dumps, durations), key=lambda item: item[1])[:max(len(dumps) + 1 - MAX_PROFILE_DUMPS, 0)]:
+            os.remove(old_path)
+        return path
+    except OSError as e:
+        print(f"Unable to write rerun profile: {str(e)}")
+        return None
+
+def summarize_reruns(records):
+    """Compute p50/p95/max per section and for the whole rerun
+
+    Args:
+        records (iterable): Rerun records from finish_rerun
+
+    Returns:
+        dict: Section name -> {'p50': float, 'p95': float, 'max': float},
+            slowest p95 first, with the whole rerun under '(total)'
+    """
+    durations = collections.defaultdict(list)
+    for record in records:
+        durations['(total)'].append(record['total_ms'])
+        for name, ms in record['sections'].items():
+            durations[name].append(ms)
+
+    summary = {}
+    for name, values in durations.items():
+        values = np.array(values, dtype=float)
+        p50, p95 = np.percentile(values, [50, 95])
+        summary[name] = {'p50': round(float(p50), 1), 'p95': round(float(p95), 1), 'max': round(float(values.max()), 1)}
+    return dict(sorted(summary.items(), key=lambda item: item[1]['p95'], reverse=True))
+
+def rerun_histogram(records, bins=20):
+    """Histogram of total rerun durations
+
+    Args:
+        records (iterable): Rerun records from finish_rerun
+        bins (int): Number of buckets
+
+    Returns:
+        dict: Lower edge of each bucket in ms -> number of reruns
+    """
+    totals = np.array([record['total_ms'] for record in records], dtype=float)
+    counts, edges = np.histogram(totals, bins=bins)
+    return {round(float(low), 1): int(count) for low, count in zip(edges[:-1], counts)}
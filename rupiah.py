@@ -0,0 +1,157 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# Pengali untuk singkatan nominal Bahasa Indonesia; "M" berarti miliar, bukan million
+SUFFIX_MULTIPLIERS = {
+    'rb': 1e3, 'ribu': 1e3, 'k': 1e3,
+    'jt': 1e6, 'juta': 1e6,
+    'm': 1e9, 'miliar': 1e9, 'milyar': 1e9,
+}
+
+DOT_THOUSANDS = r'\d{1,3}(?:\.\d{3})+(?:,\d+)?'  # 1.500.000 atau 1.500.000,50
+COMMA_THOUSANDS = r'\d{1,3}(?:,\d{3})+(?:\.\d+)?'  # 1,500,000 atau 1,500,000.50
+PLAIN = r'\d+(?:[.,]\d+)?'  # 1500000, 1500000,50 atau 1,2 (jt)
+
+SUFFIXES = r'juta|jt|ribu|rb|miliar|milyar|k|m'
+
+# Angka diikuti singkatan opsional; lookahead [jrkm] melewati pencarian singkatan jika tidak mungkin cocok.
+# Angka yang masih berlanjut dengan pemisah dan digit ("1.234.567.89") atau singkatan yang diikuti digit
+# ("1 m2") ambigu dan tidak dibaca sebagian
+_AMOUNT = (
+    r'(?:(?P<dot_thousands>' + DOT_THOUSANDS + r')|(?P<comma_thousands>' + COMMA_THOUSANDS + r')|(?P<plain>' + PLAIN + r'))'
+    r'(?![.,]?\d)'
+    r'(?:(?=\s*[jrkm])\s*(?P<suffix>' + SUFFIXES + r')\b)?'
+    r'(?!\s*(?:' + SUFFIXES + r')\d)'
+)
+
+# Nominal dengan penanda mata uang, untuk teks bebas (jawaban model, halaman produk)
+RUPIAH_PATTERN = re.compile(r'(?:Rp\.?|IDR)\s*' + _AMOUNT, re.IGNORECASE)
+
+# Nominal tanpa penanda mata uang, untuk sel tabel; tidak diambil dari tengah kata seperti "RAP2200",
+# dan angka persen (diskon "25%") dilewati
+BARE_AMOUNT_PATTERN = re.compile(r'(?<![\w.,])' + _AMOUNT + r'(?!\s*%)', re.IGNORECASE)
+
+def _is_comma_decimal(comma_thousands, suffix):
+    # "Rp33,577jt" berarti 33,577 juta: dengan singkatan, satu koma adalah desimal
+    return bool(suffix) and comma_thousands.count(",") == 1 and "." not in comma_thousands
+
+def rupiah_from_match(match):
+    """Amount of a match of RUPIAH_PATTERN or BARE_AMOUNT_PATTERN
+
+    Patterns that embed RUPIAH_PATTERN.pattern can pass their matches too;
+    the 'dot_thousands', 'comma_thousands', 'plain' and 'suffix' groups
+    must not be reused by the embedding pattern.
+    """
+    dot_thousands, comma_thousands, plain, suffix = match.group('dot_thousands', 'comma_thousands', 'plain', 'suffix')
+    if dot_thousands:
+        amount = dot_thousands.replace(".", "").replace(",", ".")
+    elif comma_thousands and not _is_comma_decimal(comma_thousands, suffix):
+        amount = comma_thousands.replace(",", "")
+    else:
+        amount = (comma_thousands or plain).replace(",", ".")
+    value = float(amount)
+    if suffix:
+        value *= SUFFIX_MULTIPLIERS[suffix.lower()]
+    return value
+
+def parse_rupiah(value, require_currency=False):
+    """Parse a Rupiah amount from a number or text
+
+    Accepts "Rp 1.500.000", "Rp1.500.000,50", "IDR 1,500,000", "1500000",
+    "Rp1,2jt", "850rb" and "Rp 1,5 M"; before a suffix a single comma is a
+    decimal comma ("Rp33,577jt"). Ambiguous amounts, like malformed
+    separators ("Rp 1.234.567.89") or a suffix followed by a digit
+    ("Rp 1 m2"), yield None rather than part of the number. Text with several amounts, like a
+    range ("Rp 1.500.000 - Rp 2.000.000") or a discounted listing
+    ("Rp1.500.000 Rp2.000.000 25%"), yields the first amount: the lower
+    bound of the range or the current price. Amounts with "Rp"/"IDR" are
+    preferred over bare numbers in the same text.
+
+    Args:
+        value (str, int or float): Cell value or text containing a price
+        require_currency (bool): Only accept amounts marked with Rp/IDR,
+            for free text that also contains model numbers and quantities
+
+    Returns:
+        float: Parsed amount or None if not found
+    """
+    if not isinstance(value, str):
+        if isinstance(value, (int, float, np.number)) and not isinstance(value, bool) and not np.isnan(value):
+            return float(value)
+        return None
+
+    if require_currency:
+        match = RUPIAH_PATTERN.search(value)
+        return rupiah_from_match(match) if match else None
+
+    # Jalur cepat untuk sel yang hanya berisi angka
+    text = value.strip()
+    if text.isascii() and text.isdigit():
+        return float(text)
+    match = RUPIAH_PATTERN.search(text) or BARE_AMOUNT_PATTERN.search(text)
+    return rupiah_from_match(match) if match else None
+
+def parse_rupiah_series(values, require_currency=False):
+    """Parse a whole column of Rupiah amounts, vectorized
+
+    Same rules as parse_rupiah. Numeric columns are returned as they are;
+    each distinct text is parsed only once, so columns with repeated
+    prices stay fast at millions of rows. In mixed columns, values that
+    are neither text nor numbers (e.g. True/False) become NaN.
+
+    Args:
+        values (pd.Series or list): Cell values or texts containing prices
+        require_currency (bool): Only accept amounts marked with Rp/IDR
+
+    Returns:
+        pd.Series: Float amounts, NaN where no amount was found
+
+    Raises:
+        ValueError: If the column is neither text, numeric nor mixed
+            (object), e.g. a boolean or datetime column
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values, dtype=object)
+    dtype = series.dtype
+    if pd.api.types.is_bool_dtype(dtype) or not (
+        pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype)
+    ):
+        raise ValueError(f"Cannot parse Rupiah amounts from a column of type {dtype}")
+    if pd.api.types.is_numeric_dtype(dtype):
+        return series.astype(float)
+
+    # Kolom campuran (teks dan angka dari Excel) dipisah: angka tidak perlu diparse
+    is_text = np.fromiter((isinstance(v, str) for v in series), dtype=bool, count=len(series))
+    numbers = np.full(len(series), np.nan)
+    if not is_text.all():
+        others = series[~is_text]
+        # True/False bukan nominal, meski bool turunan int
+        not_bool = np.fromiter((not isinstance(v, (bool, np.bool_)) for v in others), dtype=bool, count=len(others))
+        numbers[~is_text] = pd.to_numeric(others.where(not_bool), errors='coerce').to_numpy(dtype=float)
+
+    codes, uniques = pd.factorize(series.where(is_text))
+    texts = pd.Series(uniques, dtype=object)
+    parts = texts.str.extract(RUPIAH_PATTERN)
+    if not require_currency:
+        missing = parts[['dot_thousands', 'comma_thousands', 'plain']].isna().all(axis=1)
+        if missing.any():
+            parts.loc[missing] = texts[missing].str.extract(BARE_AMOUNT_PATTERN)
+
+    # Paling banyak satu dari tiga kolom format terisi per baris
+    parts = parts.astype(object)
+    dot_thousands, comma_thousands, suffix = parts['dot_thousands'], parts['comma_thousands'], parts['suffix']
+    comma_decimal = (
+        suffix.notna() & (comma_thousands.str.count(",") == 1)
+        & ~comma_thousands.str.contains(".", regex=False, na=True)
+    )
+    normalized = parts['plain'].str.replace(",", ".", regex=False)
+    normalized = normalized.fillna(dot_thousands.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+    normalized = normalized.fillna(comma_thousands.where(~comma_decimal).str.replace(",", "", regex=False))
+    normalized = normalized.fillna(comma_thousands.where(comma_decimal).str.replace(",", ".", regex=False))
+    multiplier = suffix.str.lower().map(SUFFIX_MULTIPLIERS).fillna(1.0)
+    parsed = (pd.to_numeric(normalized, errors='coerce') * multiplier).to_numpy(dtype=float)
+
+    # Kode -1 (bukan teks) menunjuk ke NaN di akhir array
+    text_values = np.append(parsed, np.nan)[codes]
+    return pd.Series(np.where(is_text, text_values, numbers), index=series.index, dtype=float)
@@ -0,0 +1,312 @@
+import functools
+import os
+import re
+
+from bs4 import BeautifulSoup
+from crawlbase import CrawlingAPI
+
+from pricing_core import find_kb_products, get_knowledge_base
+from rupiah import parse_rupiah
+
+# Client Crawlbase dibuat sekali dan dipakai bersama oleh semua sesi dan thread scraping.
+# Tidak memakai st.cache_resource karena dipanggil dari thread background.
+@functools.cache
+def get_crawling_api():
+    return CrawlingAPI({"token": os.getenv("CRAWLING_API_KEY")})
+
+# Fungsi cari url produk di Tokopedia dengan nama produk dan review lebih dari 1, pilih yang memiliki harga tertinggi dengan output berupa url dari produk tersebut
+def scrape_tokopedia_search(query):
+    # Selenium hanya diimpor saat pencarian Tokopedia benar-benar dijalankan
+    from selenium import webdriver
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.chrome.service import Service
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    url = f"https://www.tokopedia.com/search?q={query.replace(' ', '+')}"
+
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless=new")  # jalan tanpa buka browser
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+
+    driver.get(url)
+
+    products = []
+    items = driver.find_elements(By.CSS_SELECTOR, "div[data-testid='divSRPContentProducts'] article")
+
+    for item in items:
+        try:
+            name = item.find_element(By.CSS_SELECTOR, "div.prd_link-product-name").text
+            price_text = item.find_element(By.CSS_SELECTOR, "div.prd_link-product-price").text
+            sold_text = item.find_element(By.CSS_SELECTOR, "span.prd_label-integrity").text
+            link = item.find_element(By.CSS_SELECTOR, "a").get_attribute("href")
+
+            # harga pertama = harga setelah diskon
+            price = parse_rupiah(price_text)
+            if price is None:
+                raise ValueError(f"no price in {price_text!r}")
+
+            # cari angka sold
+            sold_match = re.search(r"(\d+)", sold_text.replace(".", ""))
+            sold = int(sold_match.group(1)) if sold_match else 0
+
+            products.append({
+                "name": name,
+                "price": price,
+                "sold": sold,
+                "link": link
+            })
+        except Exception as e:
+            print(f"Unable to parse Tokopedia item: {str(e)}")
+
+    driver.quit()
+
+    # filter produk yang sold > 0
+    filtered = [p for p in products if p["sold"] > 0]
+
+    if not filtered:
+        return None
+
+    # ambil produk dengan harga tertinggi
+    highest = max(filtered, key=lambda x: x["price"])
+    
+    # return URL saja karena itu yang dibutuhkan untuk scraping detail produk
+    return highest["link"]
+
+# Fungsi cari url produk di Shopee dengan nama produk dan review lebih dari 1, pilih yang memiliki harga tertinggi
+def find_shopee_product_url(product_name, min_reviews=1):
+    search_url = f"https://shopee.co.id/search?keyword={product_name}"
+    options = {
+        'ajax_wait': 'true',
+        'page_wait': '5000'
+    }
+    response = get_crawling_api().get(search_url, options)
+
+    if response.get('headers', {}).get('pc_status') == '200':
+        html_content = response.get('body', b'').decode('utf-8')
+        soup = BeautifulSoup(html_content, 'html.parser')
+
+        # Find product links with more than min_reviews reviews
+        products = soup.select('div[data-sqe="item"]')
+        highest_price_product = None
+        highest_price = 0
+
+        for product in products:
+            reviews_count_text = product.select_one('div[data-sqe="rating"]').text.strip()
+            reviews_count = int(reviews_count_text.split()[0].replace('.', '').replace(',', '')) if reviews_count_text else 0
+            
+            if reviews_count >= min_reviews:
+                price_text = product.select_one('span[data-sqe="price"]').text.strip()
+                price_value = parse_rupiah(price_text)
+                if price_value is not None and price_value > highest_price:
+                    highest_price = price_value
+                    highest_price_product = product.select_one('a')['href']
+        
+        return highest_price_product
+    
+    print("No product found with the specified criteria.")
+    return None
+
+# Fungsi crawlbase untuk mendapatkan informasi harga pada halaman produk Tokopedia
+def scrape_tokopedia_product_page(url):
+    options = {
+        'ajax_wait': 'true',
+        'page_wait': '5000'
+    }
+    response = get_crawling_api().get(url, options)
+
+    if response.get('headers', {}).get('pc_status') == '200':
+        html_content = response.get('body', b'').decode('utf-8')
+        soup = BeautifulSoup(html_content, 'html.parser')
+
+        # Extract product details
+        product_name = soup.select_one('h1[data-testid="lblPDPDetailProductName"]').text.strip()
+        price_text = soup.select_one('div[data-testid="lblPDPDetailProductPrice"]').text.strip()
+        price_value = parse_rupiah(price_text)
+        if price_value is None:
+            print(f"Unable to parse product price: {price_text!r}")
+            return None
+        elem = soup.select_one('p.css-19y0pwk-unf-heading.e1qvo2ff8')
+        if elem:
+            text = elem.text.strip()
+        # contoh: "15 rating • 6 ulasan"
+            match = re.findall(r'\d+', text)
+            rating_count = int(match[0])
+
+        return {
+            "name": product_name,
+            "price": price_value,
+            "rating_count": rating_count,
+            "url": url
+        }
+    
+    print("Failed to scrape the product page.")
+    return None
+
+# Fungsi crawlbase untuk mendapatkan informasi harga pada halaman produk Shopee
+def scrape_shopee_product_page(url):
+    options = {
+        'ajax_wait': 'true',
+        'page_wait': '5000'
+    }
+    response = get_crawling_api().get(url, options)
+
+    if response.get('headers', {}).get('pc_status') == '200':
+        html_content = response.get('body', b'').decode('utf-8')
+        soup = BeautifulSoup(html_content, 'html.parser')
+
+        # Extract product details
+        product_name = soup.select_one('div[data-sqe="name"]').text.strip()
+        price_text = soup.select_one('div[data-sqe="price"]').text.strip()
+        price_value = parse_rupiah(price_text)
+        if price_value is None:
+            print(f"Unable to parse product price: {price_text!r}")
+            return None
+        reviews_count_text = soup.select_one('div[data-sqe="rating"]').text.strip()
+        reviews_count = int(reviews_count_text.split()[0].replace('.', '').replace(',', '')) if reviews_count_text else 0
+
+        return {
+            "name": product_name,
+            "price": price_value,
+            "reviews_count": reviews_count,
+            "url": url
+        }
+    
+    print("Failed to scrape the product page.")
+    return None
+
+# Fungsi mencari produk dan scraping halaman produknya di satu platform e-commerce
+def scrape_platform_product(platform, product_name):
+    """
+    Find a product on a single e-commerce platform and scrape its product page.
+
+    Args:
+        platform (str): "Tokopedia" or "Shopee".
+        product_name (str): The name of the product to search for.
+
+    Returns:
+        dict: 'name', 'price', 'url' and 'rating_count' (Tokopedia) or
+            'reviews_count' (Shopee), or None if nothing was found.
+    """
+    if platform == "Tokopedia":
+        product_url = scrape_tokopedia_search(product_name)
+        return scrape_tokopedia_product_page(product_url) if product_url else None
+    if platform == "Shopee":
+        product_url = find_shopee_product_url(product_name)
+        return scrape_shopee_product_page(product_url) if product_url else None
+    raise ValueError(f"Unknown platform: {platform}")
+
+#Fungsi mendapatkan harga produk tertinggi dari beberapa e-commerce
+def get_max_product_price(product_name, margin=0.2):
+    """
+    Get the maximum vendor price for a product across multiple e-commerce platforms.
+    
+    Args:
+        product_name (str): The name of the product to search for.
+        margin (float): The acceptable price margin for products.
+    
+    Returns:
+        dict: A dictionary containing the platform and the maximum price found.
+    """
+    # Cari produk di Tokopedia
+    tokopedia_data = scrape_platform_product("Tokopedia", product_name)
+    if tokopedia_data:
+        tokopedia_data['platform'] = 'Tokopedia'
+        tokopedia_data['price'] *= (1 + margin)  # Apply margin
+
+    # Cari produk di Shopee
+    shopee_data = scrape_platform_product("Shopee", product_name)
+    if shopee_data:
+        shopee_data['platform'] = 'Shopee'
+        shopee_data['price'] *= (1 + margin)  # Apply margin
+
+    # Search for product in knowledge base
+    summary_solution_data = None
+    kb_matches = find_kb_products(get_knowledge_base(), product_name)
+    if kb_matches:
+        product = kb_matches[0]
+        summary_solution_data = {
+            "name": product['product_name'],
+            "price": float(product['nett_price']),
+            "platform": product['platform'],
+            "url": product['url']
+        }
+        summary_solution_data['price'] *= (1 + margin)  # Apply margin
+    
+
+    # Bandingkan harga dan pilih yang tertinggi
+    max_price_data = None
+    if tokopedia_data and shopee_data and summary_solution_data:
+        max_price_data = tokopedia_data if tokopedia_data['price'] > shopee_data['price'] and tokopedia_data['price'] > summary_solution_data['price'] else shopee_data if shopee_data['price'] > summary_solution_data['price'] else summary_solution_data
+    elif tokopedia_data:
+        max_price_data = tokopedia_data
+    elif shopee_data:
+        max_price_data = shopee_data
+    elif summary_solution_data:
+        max_price_data = summary_solution_data
+
+    return max_price_data
+
+# Fungsi untuk format hasil analisis harga vendor
+def format_vendor_price_analysis(analysis):
+    """
+    Format the vendor price analysis for display.
+    
+    Args:
+        analysis (dict): The analysis result containing platform and price.
+    
+    Returns:
+        str: Formatted string for display.
+    """
+    if not analysis:
+        return "No vendor prices found."
+    
+    platform = analysis['platform']
+    price = analysis['price']
+    
+    entry = f"### Vendor Price Analysis\n"
+    entry += f"Platform: {platform}\n"
+    entry += f"Price: Rp{price:,}\n"
+    entry += f"URL: {analysis['url']}\n"
+    entry += f"Product Name: {analysis['name']}\n"
+    entry += f"Reviews Count: {analysis.get('reviews_count', 'N/A')}\n"
+    if platform == "Tokopedia":
+        entry += f"Rating Count: {analysis.get('rating_count', 'N/A')}\n"
+    elif platform == "Shopee":
+        entry += f"Reviews Count: {analysis.get('reviews_count', 'N/A')}\n"
+    else:
+        entry += "Platform not recognized.\n"
+
+# Jumlah ulasan/rating yang ditampilkan di blok konteks per platform: (label, key hasil scraping)
+PLATFORM_CONTEXT_COUNTS = {
+    "Tokopedia": ("Rating Count", 'rating_count'),
+    "Shopee": ("Reviews", 'reviews_count'),
+}
+
+# Fungsi scraping satu platform e-commerce menjadi blok konteks untuk prompt
+def fetch_platform_context(platform, product_name):
+    """
+    Scrape live marketplace data for a product on a single platform.
+
+    Runs on a worker thread, so it must not call any Streamlit API.
+
+    Args:
+        platform (str): "Tokopedia" or "Shopee".
+        product_name (str): The name of the product to search for.
+
+    Returns:
+        str: Context block for the prompt, or None if nothing was found.
+    """
+    if platform not in PLATFORM_CONTEXT_COUNTS:
+        return None
+    product_data = scrape_platform_product(platform, product_name)
+    if not product_data:
+        return None
+    count_label, count_key = PLATFORM_CONTEXT_COUNTS[platform]
+    return f"""
+                {platform.upper()} PRODUCT INFORMATION:
+                Product: {product_data['name']}
+                Price: Rp {product_data['price']:,.2f}
+                {count_label}: {product_data[count_key]}
+                URL: {product_data['url']}
+                """
@@ -0,0 +1,112 @@
+import io
+import os
+
+import pandas as pd
+
+import project_store
+
+# Jumlah pesan terakhir yang disimpan di memori sesi dan dikirim sebagai konteks ke model
+HISTORY_WINDOW = int(os.getenv("HISTORY_WINDOW", "40"))
+
+# Jumlah pesan yang ditampilkan per halaman riwayat
+HISTORY_PAGE_SIZE = 10
+
+def _decode(message):
+    if message['evaluation'] is None:
+        del message['evaluation']
+    else:
+        message['evaluation'] = pd.read_json(io.StringIO(message['evaluation']), orient='split')
+    return message
+
+def new_history(owner, project):
+    """Open the chat history of a project for a session
+
+    Only the latest HISTORY_WINDOW messages are loaded into memory; older
+    ones stay in the project store and are read page by page when shown.
+
+    Args:
+        owner (str): Owner of the project, from project_store.new_owner
+        project (str): Project name
+
+    Returns:
+        dict: 'owner', 'project' and 'recent' (latest messages in memory,
+            each with its store 'id')
+    """
+    recent = [_decode(m) for m in project_store.load_messages(owner, project, limit=HISTORY_WINDOW)]
+    return {'owner': owner, 'project': project, 'recent': recent}
+
+def _store_message(history, message):
+    evaluation = message.get('evaluation')
+    message['id'] = project_store.add_message(
+        history['owner'], history['project'], message['role'], message['content'],
+        evaluation.to_json(orient='split', index=False) if evaluation is not None else None
+    )
+
+def append_message(history, role, content, evaluation=None, pending=False):
+    """Add a message to the history and store it in the project
+
+    A pending message (e.g. a welcome message) is only kept in memory, with
+    'id' None. It is stored together with the next message that is not
+    pending, so opening a project does not create it in the store.
+
+    Args:
+        history (dict): History from new_history
+        role (str): "user" or "assistant"
+        content (str): Markdown content
+        evaluation (pd.DataFrame, optional): Evaluation table shown with the message
+        pending (bool): Keep the message in memory until the next stored message
+    """
+    message = {'id': None, 'role': role, 'content': content}
+    if evaluation is not None:
+        message['evaluation'] = evaluation
+    if not pending:
+        # Pesan tertunda selalu berada di akhir riwayat, jadi disimpan lebih dulu agar urutan id tetap benar
+        for earlier in history['recent']:
+            if earlier['id'] is None:
+                _store_message(history, earlier)
+        _store_message(history, message)
+    history['recent'].append(message)
+    # Pesan lama dilepas dari memori; tetap tersedia di penyimpanan project
+    del history['recent'][:-HISTORY_WINDOW]
+
+def message_count(history):
+    """Total number of messages of the project, including other sessions' messages and pending ones"""
+    pending = sum(1 for message in history['recent'] if message['id'] is None)
+    return project_store.count_messages(history['owner'], history['project']) + pending
+
+def recent_messages(history):
+    """Messages held in memory, oldest first"""
+    return history['recent']
+
+def last_message(history):
+    """Most recent message, or None for an empty history"""
+    return history['recent'][-1] if history['recent'] else None
+
+def latest_messages(history, limit=None):
+    """Latest messages of the history, read from the project store where needed
+
+    Older messages are read by id, before the oldest message in memory,
+    so pages stay consistent while other sessions add messages. Pending
+    messages come after every stored one; when the oldest message in
+    memory is pending, all stored messages are older.
+
+    Args:
+        history (dict): History from new_history
+        limit (int, optional): Maximum number of messages; None for all
+
+    Returns:
+        list: Message dicts with 'id', 'role', 'content' and optional
+            'evaluation', oldest first
+    """
+    recent = history['recent']
+    if limit is not None and limit <= len(recent):
+        return recent[len(recent) - limit:]
+    before_id = recent[0]['id'] if recent else None
+    older = project_store.load_messages(
+        history['owner'], history['project'], before_id, None if limit is None else limit - len(recent)
+    )
+    return [_decode(m) for m in older] + recent
+
+def count_older_messages(history, message):
+    """Number of stored messages of the project older than the given message (all of them for a pending one)"""
+    return project_store.count_messages(history['owner'], history['project'], before_id=message['id'])
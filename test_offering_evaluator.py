@@ -0,0 +1,48 @@
+import math
+
+from offering_evaluator import build_kb_index, evaluate_offerings
+
+KB = [
+    {'product_name': "Ruijie RG-RAP2200", 'nett_price': 1_000_000.0, 'platform': "Summary Solution", 'url': "https://example.com/rap2200"},
+    {'product_name': "", 'nett_price': 5.0, 'platform': "Summary Solution", 'url': "https://example.com/blank"},
+]
+
+def test_blank_product_name_is_unmatched():
+    kb_index = build_kb_index(KB)
+    evaluated = evaluate_offerings(
+        [{'product_name': None, 'quantity': 1, 'unit_price': 10}, {'name': "x"}, {'product_name': "  ", 'quantity': 1}],
+        kb_index, 0.2
+    )
+    assert not evaluated['matched'].any()
+    assert evaluated['status'].isna().all()
+
+def test_missing_total_has_no_status():
+    kb_index = build_kb_index(KB)
+    evaluated = evaluate_offerings(
+        [
+            {'product_name': "Ruijie RG-RAP2200", 'quantity': 1, 'unit_price': 1_100_000},
+            {'product_name': "Ruijie RG-RAP2200", 'quantity': None, 'unit_price': 1_100_000},
+            {'product_name': "Ruijie RG-RAP2200", 'quantity': 2},
+        ],
+        kb_index, 0.2
+    )
+    assert evaluated['matched'].all()
+    assert evaluated['status'][0] == "Wajar"
+    assert evaluated['status'][1:].isna().all()
+    assert math.isnan(evaluated['max_price'][1])
+
+def test_partial_token_matches_by_substring():
+    kb_index = build_kb_index(KB)
+    evaluated = evaluate_offerings(
+        [{'product_name': "rap22", 'quantity': 1, 'unit_price': 1_100_000}, {'product_name': "rap23", 'quantity': 1}],
+        kb_index, 0.2
+    )
+    assert evaluated['kb_product_name'][0] == "Ruijie RG-RAP2200"
+    assert evaluated['match_type'][0] == "substring"
+    assert not evaluated['matched'][1]
+
+if __name__ == "__main__":
+    test_blank_product_name_is_unmatched()
+    test_missing_total_has_no_status()
+    test_partial_token_matches_by_substring()
+    print("offering_evaluator tests passed")
@@ -0,0 +1,28 @@
+import math
+
+import pandas as pd
+
+from rupiah import parse_rupiah, parse_rupiah_series
+
+AMBIGUOUS = ["Rp 1 m2", "Rp 1,5 m2", "Rp 1.234.567.89"]
+
+def test_ambiguous_amounts_are_rejected():
+    assert parse_rupiah("Rp 5 m") == 5e9
+    for text in AMBIGUOUS:
+        assert parse_rupiah(text) is None, text
+    assert parse_rupiah_series(AMBIGUOUS).isna().all()
+
+def test_bool_values_are_not_amounts():
+    try:
+        parse_rupiah_series(pd.Series([True, False]))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("bool column was parsed")
+    parsed = parse_rupiah_series(["Rp 1.500.000", True, 2])
+    assert parsed[0] == 1_500_000 and math.isnan(parsed[1]) and parsed[2] == 2
+
+if __name__ == "__main__":
+    test_ambiguous_amounts_are_rejected()
+    test_bool_values_are_not_amounts()
+    print("rupiah tests passed")
@@ -1,4 +1,4 @@
-from main import scrape_tokopedia_search
+from scrapers import scrape_tokopedia_search
 
 queries = [
     "Ruijie Reyee RG-RAP2200",
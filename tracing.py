@@ -0,0 +1,122 @@
+import contextlib
+import contextvars
+import glob
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+
+# Folder ekspor trace (format Chrome trace, bisa dibuka di chrome://tracing atau ui.perfetto.dev)
+TRACE_DIR = os.getenv("TRACE_DIR", "traces")
+
+# Jumlah file trace terbaru yang disimpan
+MAX_TRACE_FILES = 100
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)
+_span_ids = itertools.count(1)
+
+def _now_us():
+    return time.time_ns() // 1000
+
+@contextlib.contextmanager
+def span(name, **attributes):
+    """Time a pipeline stage as a nested span
+
+    Does nothing outside of trace(). Attributes can be added while the span
+    is open through the yielded dict.
+
+    Args:
+        name (str): Stage name
+        **attributes: Initial span attributes
+
+    Yields:
+        dict: Attributes of the span
+    """
+    trace_data = _current_trace.get()
+    if trace_data is None:
+        yield attributes
+        return
+
+    span_id = next(_span_ids)
+    parent_id = _current_span.get()
+    token = _current_span.set(span_id)
+    start = _now_us()
+    try:
+        yield attributes
+    except Exception as e:
+        attributes['error'] = str(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        trace_data['events'].append({
+            'name': name,
+            'ph': 'X',
+            'ts': start,
+            'dur': _now_us() - start,
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'args': {
+                'span_id': span_id,
+                'parent_id': parent_id,
+                **{k: v if isinstance(v, (int, float, bool, type(None))) else str(v) for k, v in attributes.items()},
+            },
+        })
+
+@contextlib.contextmanager
+def trace(name, **attributes):
+    """Trace one chat turn and export it when finished
+
+    Args:
+        name (str): Name of the root span
+        **attributes: Root span attributes
+
+    Yields:
+        dict: Trace info; 'file' is the path the trace is exported to on exit
+    """
+    trace_id = uuid.uuid4().hex
+    trace_data = {
+        'trace_id': trace_id,
+        'events': [],
+        'file': os.path.join(TRACE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{trace_id[:8]}.json"),
+    }
+    token = _current_trace.set(trace_data)
+    try:
+        with span(name, **attributes):
+            yield trace_data
+    finally:
+        _current_trace.reset(token)
+        export_trace(trace_data)
+
+def submit_with_context(executor, func, *args):
+    """Submit work to an executor so its spans nest under the current span"""
+    ctx = contextvars.copy_context()
+    return executor.submit(ctx.run, func, *args)
+
+def export_trace(trace_data):
+    """Write a trace as Chrome trace JSON and prune old trace files
+
+    Args:
+        trace_data (dict): Trace collected by trace()
+
+    Returns:
+        bool: True if the trace was written
+    """
+    try:
+        os.makedirs(TRACE_DIR, exist_ok=True)
+        with open(trace_data['file'], "w", encoding="utf-8") as f:
+            json.dump({
+                'traceEvents': sorted(trace_data['events'], key=lambda e: e['ts']),
+                'displayTimeUnit': 'ms',
+                'otherData': {'trace_id': trace_data['trace_id']},
+            }, f)
+
+        old_files = sorted(glob.glob(os.path.join(TRACE_DIR, "*.json")))[:-MAX_TRACE_FILES]
+        for old_file in old_files:
+            os.remove(old_file)
+        return True
+    except OSError as e:
+        print(f"Unable to export trace: {str(e)}")
+        return False
@@ -0,0 +1,174 @@
+import collections
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import streamlit as st
+
+# Lokasi log metrik per giliran chat (JSONL, hanya ditambah)
+METRICS_LOG_PATH = os.path.join("metrics", "turn_metrics.jsonl")
+
+# Jumlah giliran terakhir yang dipakai untuk panel p50/p95
+METRICS_WINDOW = 200
+
+# Harga per 1 juta token (USD) per model Gemini, untuk biaya per giliran.
+# Token dari context cache dihitung dengan harga 'cached_input' dan tidak ikut harga 'input'.
+MODEL_PRICES_PER_M = {
+    'gemini-2.5-flash': {'input': 0.30, 'cached_input': 0.03, 'output': 2.50},
+    'gemini-1.5-flash': {'input': 0.075, 'cached_input': 0.01875, 'output': 0.30},
+}
+
+# Metrik yang ditampilkan pada panel sidebar
+PANEL_FIELDS = {
+    'ttft_s': "TTFT (s)",
+    'total_s': "Total latency (s)",
+    'tokens_per_s': "Tokens/sec",
+    'prompt_tokens': "Prompt tokens",
+    'response_tokens': "Response tokens",
+    'kb_context_chars': "KB context (chars)",
+    'cost_usd': "Cost (USD)",
+}
+
+# Deque dari get_recent_metrics dipakai bersama oleh semua sesi (thread), jadi akses selalu lewat lock ini
+_recent_lock = threading.Lock()
+
+def start_turn(project_name, role_name, model_name):
+    """Start recording metrics for a chat turn
+
+    Args:
+        project_name (str): Current project name
+        role_name (str): Selected role
+        model_name (str): Gemini model answering the turn
+
+    Returns:
+        dict: Metrics record to fill during the turn
+    """
+    return {
+        'timestamp': time.time(),
+        'project': project_name,
+        'role': role_name,
+        'model': model_name,
+        'prompt_tokens': 0,
+        'response_tokens': 0,
+        'cached_tokens': 0,
+        'kb_context_chars': 0,
+        'scrape_s': {},
+        '_start': time.perf_counter(),
+        '_first_token': None,
+    }
+
+def mark_first_token(metrics):
+    """Record time-to-first-token, only the first call has effect"""
+    if metrics['_first_token'] is None:
+        metrics['_first_token'] = time.perf_counter()
+
+def add_usage(metrics, response):
+    """Add token usage of a finished (streamed) Gemini response"""
+    usage = getattr(response, "usage_metadata", None)
+    if not usage:
+        return
+    metrics['prompt_tokens'] += usage.prompt_token_count or 0
+    metrics['response_tokens'] += usage.candidates_token_count or 0
+    metrics['cached_tokens'] += getattr(usage, "cached_content_token_count", 0) or 0
+
+def turn_cost(model_name, prompt_tokens, cached_tokens, response_tokens):
+    """Cost of a turn in USD from its token counts
+
+    Returns:
+        float: Cost in USD, or None when the model has no known price
+    """
+    prices = MODEL_PRICES_PER_M.get(model_name)
+    if prices is None:
+        return None
+    uncached = max(prompt_tokens - cached_tokens, 0)
+    cost = (uncached * prices['input'] + cached_tokens * prices['cached_input']
+            + response_tokens * prices['output']) / 1_000_000
+    return round(cost, 6)
+
+def timed_call(func, *args):
+    """Run func and return (result, elapsed seconds), used for background scrapes"""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+@st.cache_resource
+def get_recent_metrics():
+    """Rolling window of recent turn metrics shared by all sessions
+
+    Loaded once from the metrics log, afterwards kept up to date by
+    finish_turn so the log is never re-read on reruns. Read it through
+    snapshot_recent_metrics, other sessions may append at the same time.
+    """
+    recent = collections.deque(maxlen=METRICS_WINDOW)
+    try:
+        with open(METRICS_LOG_PATH, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    recent.append(json.loads(line))
+    except FileNotFoundError:
+        pass
+    return recent
+
+def finish_turn(metrics):
+    """Finalize a turn and append it to the metrics log
+
+    Args:
+        metrics (dict): Record from start_turn
+
+    Returns:
+        dict: The finalized record as written to the log
+    """
+    end = time.perf_counter()
+    total_s = end - metrics['_start']
+    first_token = metrics['_first_token']
+    ttft_s = first_token - metrics['_start'] if first_token is not None else None
+    generation_s = end - first_token if first_token is not None else 0
+
+    record = {k: v for k, v in metrics.items() if not k.startswith('_')}
+    record['ttft_s'] = round(ttft_s, 4) if ttft_s is not None else None
+    record['total_s'] = round(total_s, 4)
+    record['tokens_per_s'] = round(metrics['response_tokens'] / generation_s, 2) if generation_s > 0 else None
+    record['cost_usd'] = turn_cost(
+        metrics['model'], metrics['prompt_tokens'], metrics['cached_tokens'], metrics['response_tokens']
+    )
+
+    try:
+        os.makedirs(os.path.dirname(METRICS_LOG_PATH), exist_ok=True)
+        with open(METRICS_LOG_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+    except OSError as e:
+        print(f"Unable to write turn metrics: {str(e)}")
+
+    recent = get_recent_metrics()
+    with _recent_lock:
+        recent.append(record)
+    return record
+
+def snapshot_recent_metrics():
+    """Copy of the recent turn metrics, safe to iterate while other sessions append
+
+    Returns:
+        list: Turn metric records, oldest first
+    """
+    recent = get_recent_metrics()
+    with _recent_lock:
+        return list(recent)
+
+def summarize_metrics(records):
+    """Compute p50/p95 for the panel fields
+
+    Args:
+        records (iterable): Turn metric records
+
+    Returns:
+        dict: Field label -> {'p50': float, 'p95': float}
+    """
+    summary = {}
+    for field, label in PANEL_FIELDS.items():
+        values = np.array([r[field] for r in records if r.get(field) is not None], dtype=float)
+        if values.size:
+            p50, p95 = np.percentile(values, [50, 95])
+            summary[label] = {'p50': round(float(p50), 2), 'p95': round(float(p95), 2)}
+    return summary